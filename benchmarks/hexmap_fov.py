@@ -0,0 +1,35 @@
+"""Time field-of-view queries on a generated map.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_fov import main; main()"
+
+Purely in-memory: no database rows are read or written.
+"""
+
+import random
+import time
+
+from world.hexfov import HexFieldOfView
+from world.hexgen import TERRAINS, WorldGenerator
+from world.hexmap import CubeCoord, HexMap
+
+SIDE = 300
+OBSERVERS = 500
+RADII = (5, 10, 15)
+
+
+def main(side=SIDE, observers=OBSERVERS, radii=RADII):
+    hm = HexMap.compact(TERRAINS)
+    WorldGenerator(4, workers=1).generate_into(hm, 0, 0, side - 1, side - 1)
+    rng = random.Random(5)
+    origins = [CubeCoord.from_axial(rng.randrange(side), rng.randrange(side)) for _ in range(observers)]
+    for radius in radii:
+        fov = HexFieldOfView(hm)
+        start = time.perf_counter()
+        fov.visible_many(origins, radius)
+        cold = (time.perf_counter() - start) / observers
+        start = time.perf_counter()
+        fov.visible_many(origins, radius)
+        warm = (time.perf_counter() - start) / observers
+        print(f"radius {radius:>2}: {cold * 1e3:6.3f}ms per observer cold, {warm * 1e6:5.2f}us cached")
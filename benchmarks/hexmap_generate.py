@@ -0,0 +1,35 @@
+"""Time procedural generation of square hex regions.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_generate import main; main()"
+
+Generates into compact in-memory maps; no database rows are touched.
+"""
+
+import time
+from collections import Counter
+
+from world.hexgen import TERRAINS, WorldGenerator
+from world.hexmap import HexMap
+
+SIDES = (316, 1000)
+
+
+def main(sides=SIDES, seed=1):
+    for side in sides:
+        generator = WorldGenerator(seed)
+        start = time.perf_counter()
+        mix = Counter()
+        for _r, codes in generator.rows(0, 0, side - 1, side - 1):
+            mix.update(codes)
+        rows_time = time.perf_counter() - start
+        hm = HexMap.compact(TERRAINS)
+        start = time.perf_counter()
+        generator.generate_into(hm, 0, 0, side - 1, side - 1)
+        fill_time = time.perf_counter() - start
+        share = ", ".join(f"{TERRAINS[code]} {n / side / side:.0%}" for code, n in mix.most_common())
+        print(
+            f"{side * side:>9,} hexes ({generator.workers} workers): rows {rows_time:6.2f}s, "
+            f"generate_into {fill_time:6.2f}s\n    {share}"
+        )
@@ -0,0 +1,82 @@
+"""Measure streaming map imports: decode speed, memory and per-batch stalls.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_import import main; main()"
+
+A `side` x `side` palette PNG is written to a temporary file and decoded
+in full, tracking peak Python memory; then `batches` batches are stored
+inside a transaction that is rolled back. The time per stored batch is
+how long the reactor is busy between two batches of a background import.
+"""
+
+import os
+import random
+import struct
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+from django.db import transaction
+
+from world.heximport import DEFAULT_BATCH_SIZE, PNG_SIGNATURE, TERRAIN_COLORS, next_batch, read_png, store_batch
+
+SIDE = 708  # ~500k hexes
+BATCHES = 20
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def write_png(path, side, seed=1):
+    """Write a blotchy `side` x `side` palette image of the default terrain colors."""
+    rng = random.Random(seed)
+    colors = [bytes.fromhex(color[1:]) for color in TERRAIN_COLORS]
+    raw = bytearray()
+    index = 0
+    for _y in range(side):
+        raw.append(0)
+        for _x in range(side):
+            if rng.random() < 0.05:
+                index = rng.randrange(len(colors))
+            raw.append(index)
+    with open(path, "wb") as handle:
+        handle.write(PNG_SIGNATURE)
+        handle.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 3, 0, 0, 0)))
+        handle.write(_chunk(b"PLTE", b"".join(colors)))
+        handle.write(_chunk(b"IDAT", zlib.compress(bytes(raw))))
+        handle.write(_chunk(b"IEND", b""))
+
+
+def main(side=SIDE, batches=BATCHES, batch_size=DEFAULT_BATCH_SIZE):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.png")
+        write_png(path, side)
+        print(f"source: {side * side} pixels, {os.path.getsize(path) / 1024:.0f}KB")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = sum(1 for _row in read_png(path))
+        elapsed = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"decode: {count} hexes in {elapsed:.2f}s ({count / elapsed / 1e3:.0f}k/s), peak {peak / 1024:.0f}KB")
+
+        rows = read_png(path)
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                stored = 0
+                for _n in range(batches):
+                    stored += store_batch(next_batch(rows, batch_size))
+                per_batch = (time.perf_counter() - start) / batches
+                print(f"store:  {per_batch * 1e3:.1f}ms per batch of {batch_size} ({stored / per_batch / batches / 1e3:.1f}k hexes/s)")
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,39 @@
+"""Time the integrity scan over a large world.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_integrity import main; main()"
+
+Runs inside a transaction that is rolled back, so the benchmark leaves
+nothing behind.
+"""
+
+import time
+
+from django.db import connection, reset_queries, transaction
+
+from benchmarks.hexmap_load import populate
+from world.integrity import scan
+
+WORLD = 100_000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(world=WORLD):
+    try:
+        with transaction.atomic():
+            populate(world)
+            connection.force_debug_cursor = True
+            reset_queries()
+            start = time.perf_counter()
+            report = scan()
+            elapsed = time.perf_counter() - start
+            queries = len(connection.queries)
+            connection.force_debug_cursor = False
+            print(f"scan: {report.tiles} tiles in {elapsed:.2f}s, {queries} queries, {report.issue_count} issues")
+            raise _Rollback
+    except _Rollback:
+        pass
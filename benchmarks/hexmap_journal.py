@@ -0,0 +1,61 @@
+"""Compare journal appends with direct `save_all` writes for a terrain script.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_journal import main; main()"
+
+Runs inside a transaction that is rolled back, and the journal lives in a
+temporary directory, so the benchmark leaves nothing behind.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from django.db import transaction
+
+from benchmarks.hexmap_load import TERRAINS, populate
+from world.hexjournal import JournaledHexMap
+from world.hexmap import HexMap
+
+WORLD = 100_000
+ROUNDS = 20
+EDITS = 500
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _script(hm, rng, coords, rounds, edits):
+    """Edit `edits` tiles and save, `rounds` times; return mean seconds per save."""
+    total = 0.0
+    for _round in range(rounds):
+        for coord in rng.sample(coords, edits):
+            hm.add_tile(coord, rng.choice(TERRAINS))
+        start = time.perf_counter()
+        hm.save_all()
+        total += time.perf_counter() - start
+    return total / rounds
+
+
+def main(world=WORLD, rounds=ROUNDS, edits=EDITS):
+    try:
+        with transaction.atomic(), tempfile.TemporaryDirectory() as tmp:
+            populate(world)
+            rng = random.Random(1)
+            direct = HexMap.load_all()
+            coords = [coord for coord, _data in direct.tiles()]
+            per_save = _script(direct, rng, coords, rounds, edits)
+            print(f"save_all:       {per_save * 1e3:8.2f}ms per save of {edits} edits")
+
+            journaled = JournaledHexMap.open(os.path.join(tmp, "world.journal"))
+            per_save = _script(journaled, rng, coords, rounds, edits)
+            print(f"journal append: {per_save * 1e3:8.2f}ms per save of {edits} edits (fsync on)")
+            start = time.perf_counter()
+            touched = journaled.compact()
+            print(f"compact:        {time.perf_counter() - start:8.3f}s for {touched} tiles")
+            raise _Rollback
+    except _Rollback:
+        pass
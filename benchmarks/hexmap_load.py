@@ -0,0 +1,63 @@
+"""Benchmark `HexMap.load_all` on worlds of increasing size.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_load import main; main()"
+
+Each world is inserted in bulk inside a transaction that is rolled back once
+the measurement is done, so the benchmark leaves the database untouched.
+"""
+
+import time
+
+from django.db import transaction
+
+from world.hexmap import HexMap
+from world.hexstore import insert_tiles
+
+SIZES = (10_000, 100_000, 1_000_000)
+TERRAINS = ("plain", "forest", "hills", "mountain", "swamp", "coast")
+
+
+class _Rollback(Exception):
+    pass
+
+
+def world_coords(count):
+    """Yield `count` cube coordinates filling a square of axial space."""
+    side = int(count ** 0.5) + 1
+    produced = 0
+    for q in range(side):
+        for r in range(side):
+            if produced >= count:
+                return
+            yield q, r, -q - r
+            produced += 1
+
+
+def populate(count):
+    """Insert `count` tiles through the bulk store, cycling through terrains."""
+    insert_tiles({c: TERRAINS[(c[0] + c[1]) % len(TERRAINS)] for c in world_coords(count)})
+
+
+def bench_load(count):
+    """Return seconds taken by `HexMap.load_all` on a world of `count` tiles."""
+    elapsed = 0.0
+    try:
+        with transaction.atomic():
+            populate(count)
+            start = time.perf_counter()
+            hm = HexMap.load_all()
+            elapsed = time.perf_counter() - start
+            if len(hm) != count:
+                raise RuntimeError(f"expected {count} tiles, loaded {len(hm)}")
+            raise _Rollback
+    except _Rollback:
+        pass
+    return elapsed
+
+
+def main(sizes=SIZES):
+    for count in sizes:
+        elapsed = bench_load(count)
+        print(f"load_all {count:>9,} tiles: {elapsed:8.3f}s ({count / max(elapsed, 1e-9):,.0f} tiles/s)")
@@ -0,0 +1,52 @@
+"""Time minimap rendering for many players on a generated map.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_minimap import main; main()"
+
+Purely in-memory: no database rows are read or written.
+"""
+
+import random
+import time
+
+from world.hexgen import TERRAINS, WorldGenerator
+from world.hexmap import CubeCoord, HexMap
+from world.hexminimap import MinimapRenderer
+
+SIDE = 400
+PLAYERS = 2000
+SPREAD = 40
+RADIUS = 8
+
+
+def main(side=SIDE, players=PLAYERS, spread=SPREAD, radius=RADIUS):
+    hm = HexMap.compact(TERRAINS)
+    WorldGenerator(2, workers=1).generate_into(hm, 0, 0, side - 1, side - 1)
+    rng = random.Random(9)
+    base = side // 2
+    centers = [
+        CubeCoord.from_axial(base + rng.randrange(spread), base + rng.randrange(spread)) for _ in range(players)
+    ]
+    renderer = MinimapRenderer(hm)
+    start = time.perf_counter()
+    for center in centers:
+        renderer.render(center, radius)
+    elapsed = (time.perf_counter() - start) / players
+    print(
+        f"{players} players in a {spread}x{spread} area: {elapsed * 1e6:.1f}us per render, "
+        f"{renderer.view_builds} views and {renderer.fragment_builds} fragments built"
+    )
+    start = time.perf_counter()
+    for center in centers:
+        renderer.render(center, radius)
+    print(f"repeat: {(time.perf_counter() - start) / players * 1e6:.2f}us per render")
+    hm.add_tile(CubeCoord.from_axial(base + 1, base + 1), "mountain")
+    builds = renderer.fragment_builds
+    start = time.perf_counter()
+    for center in centers:
+        renderer.render(center, radius)
+    print(
+        f"after one edit: {(time.perf_counter() - start) / players * 1e6:.2f}us per render, "
+        f"{renderer.fragment_builds - builds} fragment rebuilt"
+    )
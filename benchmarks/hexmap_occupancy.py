@@ -0,0 +1,40 @@
+"""Time area queries against the hex occupancy index.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_occupancy import main; main()"
+
+A private index is built once from the database (nothing is written) and
+then filled with synthetic beings, one room per occupied hex.
+"""
+
+import random
+import time
+
+from world.hexstore import HexOccupancyIndex
+
+SIDE = 1000
+BEINGS = 20_000
+QUERIES = 10_000
+RADII = (3, 10, 30)
+FIRST_ID = 10**9
+
+
+def main(side=SIDE, beings=BEINGS, queries=QUERIES, radii=RADII):
+    index = HexOccupancyIndex()
+    index.build()
+    rng = random.Random(3)
+    start = time.perf_counter()
+    for offset in range(beings):
+        q, r = rng.randrange(side), rng.randrange(side)
+        index.move(FIRST_ID + offset, FIRST_ID + q * side + r, (q, r, -q - r))
+    moves = (time.perf_counter() - start) / beings
+    print(f"{beings} beings indexed, {moves * 1e6:.2f}us per move")
+    centers = [(rng.randrange(side), rng.randrange(side), 0) for _ in range(queries)]
+    for radius in radii:
+        found = 0
+        start = time.perf_counter()
+        for center in centers:
+            found += len(index.ids_within(center, radius))
+        elapsed = (time.perf_counter() - start) / queries
+        print(f"radius {radius:>2}: {elapsed * 1e6:7.2f}us per query, {found / queries:.2f} beings found on average")
@@ -0,0 +1,43 @@
+"""Benchmark chunk paging of `PagedHexMap` against a stored world.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_paging import main; main()"
+
+The world is inserted inside a transaction that is rolled back afterwards.
+"""
+
+import random
+import time
+
+from django.db import transaction
+
+from benchmarks.hexmap_load import _Rollback, populate
+from world.hexmap import CubeCoord
+from world.hexpaging import PagedHexMap
+
+COUNT = 250_000
+WALKS = 200
+
+
+def main(count=COUNT, walks=WALKS):
+    side = int(count ** 0.5)
+    rng = random.Random(3)
+    try:
+        with transaction.atomic():
+            populate(count)
+            hm = PagedHexMap(max_bytes=256 * 1024)
+            start = time.perf_counter()
+            for _ in range(walks):
+                q, r = rng.randrange(side), rng.randrange(side)
+                hm.within_radius(CubeCoord.from_axial(q, r), 5)
+            elapsed = time.perf_counter() - start
+            storage = hm.storage
+            print(
+                f"{walks} random area queries: {elapsed:6.3f}s, {storage.loads} chunk loads "
+                f"({elapsed / max(storage.loads, 1) * 1e3:6.2f}ms each), {storage.evictions} evictions, "
+                f"{len(storage.resident_chunks())}/{storage.max_chunks} chunks resident"
+            )
+            raise _Rollback
+    except _Rollback:
+        pass
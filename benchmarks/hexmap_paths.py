@@ -0,0 +1,46 @@
+"""Time HexPathfinder queries on a filled map.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_paths import main; main()"
+
+Purely in-memory: no database rows are read or written.
+"""
+
+import random
+import time
+
+from benchmarks.hexmap_queries import build
+from world.hexmap import HexMap
+from world.hexpath import HexPathfinder
+
+COUNT = 250_000
+QUERIES = 500
+SPANS = (10, 30, 60)
+
+
+def main(count=COUNT, queries=QUERIES, spans=SPANS):
+    hm = build(HexMap.compact, count)
+    side = int(count ** 0.5)
+    rng = random.Random(7)
+    for span in spans:
+        finder = HexPathfinder(hm)
+        pairs = []
+        for _ in range(queries):
+            q, r = rng.randrange(side - span), rng.randrange(side - span)
+            pairs.append(((q, r, -q - r), (q + span, r, -q - r - span)))
+        start = time.perf_counter()
+        for a, b in pairs:
+            finder.find_path(a, b)
+        cold = (time.perf_counter() - start) / queries
+        start = time.perf_counter()
+        for a, b in pairs:
+            finder.find_path(a, b)
+        warm = (time.perf_counter() - start) / queries
+        print(f"span {span:>3}: find_path cold {cold * 1e3:7.3f}ms, cached {warm * 1e6:6.2f}us")
+    finder = HexPathfinder(hm)
+    start = time.perf_counter()
+    for _ in range(queries):
+        q, r = rng.randrange(side), rng.randrange(side)
+        finder.nearest([(q, r, -q - r)], {"swamp"})
+    print(f"nearest swamp: {(time.perf_counter() - start) / queries * 1e6:7.1f}us")
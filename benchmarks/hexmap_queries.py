@@ -0,0 +1,46 @@
+"""Time the HexMap spatial queries on a filled map.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_queries import main; main()"
+
+Purely in-memory: no database rows are read or written.
+"""
+
+import time
+
+from benchmarks.hexmap_load import TERRAINS, world_coords
+from benchmarks.hexmap_storage import BACKENDS
+from world.hexmap import CubeCoord
+
+COUNT = 1_000_000
+RADII = (1, 3, 5, 10)
+CENTERS = 2_000
+
+
+def build(factory, count):
+    hm = factory()
+    for q, r, _s in world_coords(count):
+        hm.add_tile(CubeCoord.from_axial(q, r), TERRAINS[(q + r) % len(TERRAINS)])
+    hm.mark_clean()
+    return hm
+
+
+def main(count=COUNT, radii=RADII):
+    side = int(count ** 0.5)
+    step = max(1, side // int(CENTERS ** 0.5))
+    centers = [CubeCoord.from_axial(q, r) for q in range(0, side, step) for r in range(0, side, step)]
+    for name, factory in BACKENDS.items():
+        hm = build(factory, count)
+        for radius in radii:
+            start = time.perf_counter()
+            for center in centers:
+                hm.within_radius(center, radius)
+            single = (time.perf_counter() - start) / len(centers)
+            start = time.perf_counter()
+            hm.count_within_radius(centers, radius)
+            batch = (time.perf_counter() - start) / len(centers)
+            print(
+                f"{name:>5} radius {radius:>2}: within_radius {single * 1e6:8.1f}us, "
+                f"count_within_radius {batch * 1e6:8.1f}us per center"
+            )
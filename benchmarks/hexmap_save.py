@@ -0,0 +1,58 @@
+"""Benchmark `HexMap.save_all` after editing a few tiles of a large world.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_save import main; main()"
+
+The world is inserted in bulk inside a transaction that is rolled back once
+the measurement is done, so the benchmark leaves the database untouched.
+"""
+
+import random
+import time
+
+from django.db import transaction
+
+from benchmarks.hexmap_load import TERRAINS, populate
+from world.hexmap import CubeCoord, HexMap
+
+SIZES = (10_000, 100_000, 1_000_000)
+EDITS = 300
+REMOVALS = 20
+
+
+class _Rollback(Exception):
+    pass
+
+
+def bench_resave(count, edits=EDITS, removals=REMOVALS, seed=0):
+    """Return seconds taken to re-save a `count` tile world after small edits."""
+    rng = random.Random(seed)
+    elapsed = 0.0
+    try:
+        with transaction.atomic():
+            populate(count)
+            hm = HexMap.load_all()
+            coords = rng.sample([coord for coord, _data in hm.tiles()], edits + removals)
+            for coord in coords[:edits]:
+                hm.add_tile(coord, rng.choice(TERRAINS))
+            for coord in coords[edits:]:
+                hm.remove_tile(coord)
+            for i in range(removals):
+                hm.add_tile(CubeCoord(-1 - i, 0, 1 + i), "ocean")
+            start = time.perf_counter()
+            hm.save_all()
+            elapsed = time.perf_counter() - start
+            raise _Rollback
+    except _Rollback:
+        pass
+    return elapsed
+
+
+def main(sizes=SIZES):
+    for count in sizes:
+        elapsed = bench_resave(count)
+        print(
+            f"save_all {count:>9,} tiles, {EDITS} edits, {REMOVALS} removals, "
+            f"{REMOVALS} additions: {elapsed:8.3f}s"
+        )
@@ -0,0 +1,45 @@
+"""Time writing, mapping and reading back a binary hex snapshot.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_snapshot import main; main()"
+
+Purely in-memory plus a temporary file: no database rows are touched.
+"""
+
+import os
+import tempfile
+import time
+
+from benchmarks.hexmap_queries import build
+from world.hexmap import CubeCoord, HexMap
+from world.hexsnapshot import HexSnapshot, read_snapshot, write_snapshot
+
+SIZES = (100_000, 1_000_000)
+
+
+def main(sizes=SIZES):
+    for count in sizes:
+        hm = build(HexMap.compact, count)
+        handle, path = tempfile.mkstemp(suffix=".hexsnap")
+        os.close(handle)
+        try:
+            start = time.perf_counter()
+            write_snapshot(hm, path)
+            write_time = time.perf_counter() - start
+            start = time.perf_counter()
+            with HexSnapshot(path) as snapshot:
+                open_time = time.perf_counter() - start
+                start = time.perf_counter()
+                for q in range(1000):
+                    snapshot.get(CubeCoord.from_axial(q % 100, q // 10))
+                get_time = (time.perf_counter() - start) / 1000
+            start = time.perf_counter()
+            read_snapshot(path)
+            read_time = time.perf_counter() - start
+            print(
+                f"{count:>9,} tiles, {os.path.getsize(path) / 1e6:6.1f} MB: write {write_time:6.3f}s, "
+                f"open {open_time * 1e3:6.3f}ms, get {get_time * 1e6:5.1f}us, to_hexmap {read_time:6.3f}s"
+            )
+        finally:
+            os.remove(path)
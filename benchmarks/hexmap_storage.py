@@ -0,0 +1,59 @@
+"""Compare memory and speed of the HexMap storage backends.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.hexmap_storage import main; main()"
+
+Purely in-memory: no database rows are read or written.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from benchmarks.hexmap_load import TERRAINS, world_coords
+from world.hexmap import CubeCoord, HexMap
+
+SIZES = (10_000, 100_000, 1_000_000)
+BACKENDS = {
+    "dict": HexMap,
+    "array": HexMap.compact,
+}
+
+
+def bench_backend(factory, count):
+    """Return (bytes, add seconds, get seconds, neighbors seconds) for one backend."""
+    coords = [CubeCoord.from_axial(q, r) for q, r, _s in world_coords(count)]
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    hm = factory()
+    for coord in coords:
+        hm.add_tile(coord, TERRAINS[(coord.q + coord.r) % len(TERRAINS)])
+    hm.mark_clean()
+    add_time = time.perf_counter() - start
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for coord in coords:
+        hm.get_tile(coord)
+    get_time = time.perf_counter() - start
+
+    sample = coords[:: max(1, count // 10_000)]
+    start = time.perf_counter()
+    for coord in sample:
+        for neighbor in hm.neighbors(coord):
+            hm.get_tile(neighbor)
+    neighbor_time = (time.perf_counter() - start) / len(sample)
+    return size, add_time, get_time, neighbor_time
+
+
+def main(sizes=SIZES):
+    for count in sizes:
+        for name, factory in BACKENDS.items():
+            size, add_time, get_time, neighbor_time = bench_backend(factory, count)
+            print(
+                f"{name:>5} {count:>9,} tiles: {size / 1e6:8.2f} MB ({size / count:6.1f} B/tile), "
+                f"add {add_time:6.3f}s, get {get_time:6.3f}s, neighbors {neighbor_time * 1e6:6.2f}us/tile"
+            )
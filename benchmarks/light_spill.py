@@ -0,0 +1,52 @@
+"""Time light changes spilling through a corridor of rooms.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.light_spill import main; main()"
+
+Builds a line of `rooms` rooms joined by exits both ways inside a
+transaction that is rolled back, and flickers a lamp in the middle one.
+Every room's light has been counted first, so each change only updates
+the rooms within the spill radius.
+"""
+
+import time
+
+from django.db import transaction
+from evennia import create_object
+
+from world.lightspill import spill_graph
+from world.living.perception import EphemeralLight
+
+ROOMS = 500
+REPEATS = 2000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(rooms=ROOMS, repeats=REPEATS):
+    try:
+        with transaction.atomic():
+            line = [create_object("typeclasses.rooms.Room", key=f"Corridor {n}", nohome=True) for n in range(rooms)]
+            for here, there in zip(line, line[1:]):
+                create_object("typeclasses.exits.Exit", key="east", location=here, destination=there, home=here)
+                create_object("typeclasses.exits.Exit", key="west", location=there, destination=here, home=there)
+            lamp = create_object("typeclasses.objects.Object", key="lamp", location=line[rooms // 2], home=line[0])
+            light = EphemeralLight(lamp, 0)
+
+            start = time.perf_counter()
+            spill_graph.reset()
+            for room in line:
+                room.get_light_level()
+            count = time.perf_counter() - start
+            start = time.perf_counter()
+            for n in range(repeats):
+                light.level = 40 + n % 2 * 20
+            change = (time.perf_counter() - start) / repeats
+            lit = sum(1 for room in line if room.get_light_level())
+            print(f"{rooms} rooms: first count {count * 1e3:7.1f}ms, change {change * 1e6:6.2f}us, {lit} rooms lit")
+            raise _Rollback
+    except _Rollback:
+        pass
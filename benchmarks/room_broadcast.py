@@ -0,0 +1,53 @@
+"""Time a room broadcast split by sight in a crowded room.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.room_broadcast import main; main()"
+
+Builds a tavern of `occupants` characters and `items` loose objects inside
+a transaction that is rolled back. Outgoing messages are dropped so only
+the split and rendering are timed.
+"""
+
+import time
+from unittest.mock import patch
+
+from django.db import transaction
+from evennia import create_object
+
+from world.living.perception import broadcast, split_by_sight
+
+OCCUPANTS = 100
+ITEMS = 200
+REPEATS = 50
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(occupants=OCCUPANTS, items=ITEMS, repeats=REPEATS):
+    try:
+        with transaction.atomic():
+            tavern = create_object("typeclasses.rooms.Room", key="Tavern", nohome=True)
+            people = [
+                create_object("typeclasses.characters.Character", key=f"Patron {n}", location=tavern, home=tavern)
+                for n in range(occupants)
+            ]
+            for i in range(items):
+                create_object("typeclasses.objects.Object", key=f"item {i}", location=tavern, home=tavern)
+            contents = tavern.contents
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                split_by_sight(tavern, contents)
+            split = (time.perf_counter() - start) / repeats
+            with patch.object(type(people[0]), "msg"):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    broadcast(tavern, "$You() $conj(wave).", "You hear rustling.", from_obj=people[0])
+                sent = (time.perf_counter() - start) / repeats
+            print(f"{occupants} occupants, {items} items: split {split * 1e6:8.1f}us, broadcast {sent * 1e3:6.2f}ms")
+            raise _Rollback
+    except _Rollback:
+        pass
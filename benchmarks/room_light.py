@@ -0,0 +1,56 @@
+"""Compare the cached room light level with a full recount in a busy room.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.room_light import main; main()"
+
+Builds a tavern of `occupants` characters carrying `items` objects each
+(one in ten lit) inside a transaction that is rolled back.
+"""
+
+import time
+
+from django.db import transaction
+from evennia import create_object
+
+from world.living.perception import LightManager
+
+OCCUPANTS = 50
+ITEMS = 10
+REPEATS = 2000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(occupants=OCCUPANTS, items=ITEMS, repeats=REPEATS):
+    try:
+        with transaction.atomic():
+            tavern = create_object("typeclasses.rooms.Room", key="Tavern", nohome=True)
+            people = []
+            for n in range(occupants):
+                person = create_object("typeclasses.characters.Character", key=f"Patron {n}", location=tavern, home=tavern)
+                people.append(person)
+                for i in range(items):
+                    item = create_object("typeclasses.objects.Object", key=f"item {i}", location=person, home=tavern)
+                    if i == 0 and n % 10 == 0:
+                        LightManager(item, 5)
+            level = tavern.get_light_level()
+
+            start = time.perf_counter()
+            for _ in range(repeats // 100):
+                tavern._accumulate_contained_light()
+            recount = (time.perf_counter() - start) / (repeats // 100)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                tavern.get_light_level()
+            cached = (time.perf_counter() - start) / repeats
+            start = time.perf_counter()
+            for person in people:
+                person.vision.can_see
+            can_see = (time.perf_counter() - start) / len(people)
+            print(f"light {level}: recount {recount * 1e6:8.1f}us, cached {cached * 1e6:6.2f}us, can_see {can_see * 1e6:6.2f}us")
+            raise _Rollback
+    except _Rollback:
+        pass
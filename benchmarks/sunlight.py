@@ -0,0 +1,48 @@
+"""Time outdoor room light lookups against the shared sunlight clock.
+
+Run from the game directory:
+
+    evennia shell -c "from benchmarks.sunlight import main; main()"
+
+Builds `rooms` outdoor rooms inside a transaction that is rolled back and
+reads each one's sunlight the old way (game time and ramp per call) and
+through the clock.
+"""
+
+import time
+
+from django.db import transaction
+from evennia import create_object
+
+from world.sunlight import sunlight_clock
+
+ROOMS = 2000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(rooms=ROOMS):
+    try:
+        with transaction.atomic():
+            outdoors = [
+                create_object("typeclasses.rooms.ExternalRoom", key=f"Field {n}", nohome=True) for n in range(rooms)
+            ]
+            start = time.perf_counter()
+            for room in outdoors:
+                room.compute_sunlight_level()
+            direct = (time.perf_counter() - start) / rooms
+            sunlight_clock.reset()
+            refreshes = sunlight_clock.refreshes
+            start = time.perf_counter()
+            for room in outdoors:
+                room.get_sunlight_level()
+            shared = (time.perf_counter() - start) / rooms
+            print(
+                f"{rooms} rooms: per-call {direct * 1e6:6.2f}us, clock {shared * 1e6:6.2f}us, "
+                f"{sunlight_clock.refreshes - refreshes} game time read(s)"
+            )
+            raise _Rollback
+    except _Rollback:
+        pass
@@ -6,7 +6,7 @@ Commands describe the input the account can do to the game.
 """
 
 from evennia.commands.default.muxcommand import MuxCommand as BaseCommand
-from world.living.perception import MsgObj
+from world.living.perception import broadcast
 from world.utils import DisplayNameWrapper
 
 # from evennia import default_cmds
@@ -60,9 +60,10 @@ class Command(BaseCommand):
             kwargs["mapping"] = wrapped_mapping
 
         if sound:
-            kwargs["msg_obj"] = MsgObj(visual=msg_content, sound=sound).to_dict()
-
-        self.caller.location.msg_contents(msg_content, **kwargs)
+            # Those who can't see the room only hear the sound.
+            broadcast(self.caller.location, msg_content, sound, **kwargs)
+        else:
+            self.caller.location.msg_contents(msg_content, **kwargs)
 
 # -------------------------------------------------------------
 #
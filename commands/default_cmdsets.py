@@ -19,7 +19,7 @@ from .skills import CmdSkills, CmdCreateSkill, CmdSetSkill
 from .resources import CmdCreateResource
 from .time import CmdSetDateTime, CmdSetTime
 from .external import CmdMakeExternal
-from .hex import CmdSetHex, CmdWeather
+from .hex import CmdImportMap, CmdIntegrity, CmdMap, CmdSetHex, CmdWeather
 from .weight import CmdSetWeight
 from world.physical.commands import CmdFill, CmdEmpty, CmdStore
 
@@ -41,6 +41,9 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         # Builder utilities
         self.add(CmdSetHex())
         self.add(CmdWeather())
+        self.add(CmdMap())
+        self.add(CmdImportMap())
+        self.add(CmdIntegrity())
         self.add(CmdSetWeight())
         self.add(CmdSkills())
         self.add(CmdFill())
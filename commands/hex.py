@@ -1,7 +1,15 @@
-"""Hex map commands for linking rooms to macro hex tiles and querying weather."""
+"""Hex map commands for linking rooms to macro hex tiles, querying weather,
+viewing the map and checking its integrity."""
 
+import os
+import time
+
+from django.conf import settings
 from evennia.commands.default.muxcommand import MuxCommand
 
+from world import heximport, integrity
+from world.hexworld import minimap
+
 
 class CmdSetHex(MuxCommand):
     """Link the current room to a hex tile by cube coordinates.
@@ -66,3 +74,151 @@ class CmdWeather(MuxCommand):
             caller.msg(f"Weather here is {wx} (hex {tile.dbref} q={q}, r={r}, s={s}).")
         else:
             caller.msg(f"Weather here is {wx}.")
+
+
+class CmdMap(MuxCommand):
+    """Show a map of the hexes around you.
+
+    Usage:
+      map [radius]
+
+    The radius defaults to 5 hexes and is capped at 12.
+    """
+
+    key = "map"
+    locks = "cmd:all()"
+    help_category = "General"
+
+    default_radius = 5
+    max_radius = 12
+
+    def func(self):
+        caller = self.caller
+        room = caller.location
+        coords = room.get_hex_coords() if hasattr(room, "get_hex_coords") else None
+        if coords is None:
+            caller.msg("You can't make out any map from here.")
+            return
+        radius = self.default_radius
+        if self.args:
+            try:
+                radius = int(self.args.strip())
+            except ValueError:
+                caller.msg("Usage: map [radius]")
+                return
+        radius = max(1, min(radius, self.max_radius))
+        caller.msg(minimap().render(coords, radius))
+
+
+class CmdImportMap(MuxCommand):
+    """Import hex terrain from a CSV file or palette image.
+
+    Usage:
+      @importmap <file>
+      @importmap <file.png> = <index or #rrggbb>:<terrain>[, ...]
+
+    CSV files hold `q,r,terrain` rows. Each pixel of a palette PNG becomes one
+    hex, its terrain picked by palette index or color; pixels with no terrain
+    are skipped. Relative paths are read from the game directory. Existing
+    tiles are updated and tiles not in the file are kept. The import runs in
+    the background and reports its progress.
+    """
+
+    key = "@importmap"
+    locks = "cmd:perm(Developer)"
+    help_category = "Building"
+
+    # Seconds between progress reports.
+    report_interval = 5
+    _running = False
+
+    def func(self):
+        caller = self.caller
+        if not self.lhs:
+            caller.msg("Usage: @importmap <file> [= <index or #rrggbb>:<terrain>, ...]")
+            return
+        if CmdImportMap._running:
+            caller.msg("A map import is already running.")
+            return
+        path = os.path.join(getattr(settings, "GAME_DIR", "."), os.path.expanduser(self.lhs.strip()))
+        if not os.path.isfile(path):
+            caller.msg(f"No such file: {path}")
+            return
+        try:
+            palette = heximport.parse_palette(self.rhs) if self.rhs else None
+            rows = heximport.open_source(path, palette)
+        except ValueError as err:
+            caller.msg(f"Can't import {path}: {err}")
+            return
+
+        started = time.monotonic()
+        last_report = started
+
+        def progress(total):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= self.report_interval:
+                last_report = now
+                caller.msg(f"Imported {total} hexes so far ({now - started:.0f}s).")
+
+        def finished(total):
+            CmdImportMap._running = False
+            caller.msg(f"Imported {total} hexes from {path} in {time.monotonic() - started:.1f}s.")
+
+        def failed(failure):
+            CmdImportMap._running = False
+            caller.msg(f"Map import from {path} stopped: {failure.getErrorMessage()}")
+
+        CmdImportMap._running = True
+        caller.msg(f"Importing hexes from {path} in the background...")
+        heximport.import_in_background(rows, progress=progress).addCallbacks(finished, failed)
+
+
+class CmdIntegrity(MuxCommand):
+    """Check hexes, room links and resource tags for broken references.
+
+    Usage:
+      @integrity
+      @integrity/repair
+
+    Reports rooms linked to deleted hexes, hexes with missing or wrong
+    coordinate tags, duplicate hexes and resources whose kind tag is out of
+    date. With /repair, fixes them all in one transaction: duplicate hexes
+    are merged into the one most rooms link to and broken room links are
+    removed.
+    """
+
+    key = "@integrity"
+    switch_options = ("repair",)
+    locks = "cmd:perm(Builder)"
+    help_category = "Building"
+
+    # Ids listed per kind of problem.
+    max_examples = 10
+
+    def func(self):
+        caller = self.caller
+        started = time.monotonic()
+        report = integrity.scan()
+        lines = [f"Scanned {report.tiles} hexes and {report.resources} resources in {time.monotonic() - started:.1f}s."]
+        examples = (
+            list(report.broken_rooms),
+            report.missing_tags,
+            list(report.mismatched_tags),
+            [tile_id for ids in report.duplicates.values() for tile_id in ids],
+            list(report.resource_tags),
+        )
+        for line, ids in zip(report.summary(), examples):
+            if ids:
+                shown = ", ".join(f"#{obj_id}" for obj_id in ids[: self.max_examples])
+                more = f" (+{len(ids) - self.max_examples} more)" if len(ids) > self.max_examples else ""
+                line = f"{line}: {shown}{more}"
+            lines.append(line)
+        if not report:
+            lines.append("No problems found.")
+        elif "repair" in self.switches:
+            integrity.repair(report)
+            lines.append(f"Repaired {report.issue_count} problems.")
+        else:
+            lines.append("Use @integrity/repair to fix them.")
+        caller.msg("\n".join(lines))
@@ -38,13 +38,21 @@ def at_server_start():
     except Exception:
         pass
 
+    from world.sunlight import sunlight_clock
+
+    sunlight_clock.start()
+
 
 def at_server_stop():
     """
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from world.living.perception import flush_lights
+    from world.sunlight import sunlight_clock
+
+    sunlight_clock.stop()
+    flush_lights()
 
 
 def at_server_reload_start():
@@ -9,6 +9,10 @@ for allowing Characters to traverse the exit to its destination.
 
 from evennia.objects.objects import DefaultExit
 from evennia import AttributeProperty
+from evennia.typeclasses.attributes import ModelAttributeBackend
+from evennia.utils.utils import lazy_property
+
+from world.lightspill import DEFAULT_SPILL, SpillAttributeHandler, spill_graph
 
 from .objects import ObjectParent
 
@@ -18,6 +22,40 @@ class Exit(ObjectParent, DefaultExit):
 
     # Persistent Character Attribute-style property so it can be changed with @set
     tiredness_cost = AttributeProperty(default=0)
+    # Fraction (0..1) of the light in this exit's room that shows at its destination
+    light_spill = AttributeProperty(default=DEFAULT_SPILL)
+
+    @lazy_property
+    def attributes(self):
+        # Changing light_spill, even with @set, updates the spill graph.
+        return SpillAttributeHandler(self, ModelAttributeBackend)
+
+    @property
+    def destination(self):
+        return DefaultExit.destination.fget(self)
+
+    @destination.setter
+    def destination(self, value):
+        # Relinking (e.g. @link) moves where this exit spills light.
+        DefaultExit.destination.fset(self, value)
+        spill_graph.update_exit(self)
+
+    @destination.deleter
+    def destination(self):
+        DefaultExit.destination.fdel(self)
+        spill_graph.update_exit(self)
+
+    def at_object_creation(self):
+        super().at_object_creation()
+        spill_graph.update_exit(self)
+
+    def at_object_delete(self):
+        spill_graph.remove_exit(self.id)
+        return super().at_object_delete()
+
+    def at_post_move(self, source_location, move_type="move", **kwargs):
+        super().at_post_move(source_location, move_type=move_type, **kwargs)
+        spill_graph.update_exit(self)
 
     def at_post_traverse(self, traversing_object, source_location, **kwargs):
         """Increase tiredness when traversed based on `tiredness_cost`."""
@@ -1,11 +1,33 @@
 """Evennia typeclass representing a hex tile for macro world attributes."""
 
-from evennia import create_object, search_tag
+from evennia import create_object
+from evennia.objects.models import ObjectDB
 from evennia.objects.objects import DefaultObject
 
 from .objects import ObjectParent
 
 
+def _coord_index():
+    """Return the process-wide coord index (imported lazily to avoid a cycle)."""
+    from world.hexstore import coord_index
+
+    return coord_index
+
+
+def _room_index():
+    """Return the process-wide hex -> rooms index (imported lazily to avoid a cycle)."""
+    from world.hexstore import room_index
+
+    return room_index
+
+
+def _tile_changed(q: int, r: int, terrain: str | None = None, removed: bool = False) -> None:
+    """Tell the shared world map about a stored change (imported lazily to avoid a cycle)."""
+    from world.hexworld import tile_changed
+
+    tile_changed(q, r, terrain, removed)
+
+
 class HexTile(ObjectParent, DefaultObject):
     """A non-movable object representing a hex tile on the world map.
 
@@ -19,13 +41,24 @@ class HexTile(ObjectParent, DefaultObject):
     def _coord_tag(q: int, r: int, s: int) -> tuple[str, str]:
         return (f"{q},{r},{s}", "hexcoord")
 
+    @classmethod
+    def get_id_by_coords(cls, q: int, r: int, s: int) -> int | None:
+        """Return the id of the tile at (q, r, s) from the in-process coord index."""
+        return _coord_index().get(q, r, s)
+
     @classmethod
     def get_by_coords(cls, q: int, r: int, s: int):
-        tag, cat = cls._coord_tag(q, r, s)
-        res = search_tag(tag, category=cat)
-        # Filter to only this typeclass
-        res = [obj for obj in res if obj.is_typeclass(cls, exact=False)]
-        return res[0] if res else None
+        tile_id = cls.get_id_by_coords(q, r, s)
+        if tile_id is None:
+            return None
+        try:
+            obj = ObjectDB.objects.get(id=tile_id)
+        except ObjectDB.DoesNotExist:
+            obj = None
+        if not isinstance(obj, cls):
+            _coord_index().discard(q, r, s, tile_id)
+            return None
+        return obj
 
     @classmethod
     def get_or_create_by_coords(cls, q: int, r: int, s: int, terrain: str | None = None):
@@ -44,11 +77,28 @@ class HexTile(ObjectParent, DefaultObject):
             obj.db.terrain = str(terrain)
         tag, cat = cls._coord_tag(q, r, s)
         obj.tags.add(tag, category=cat)
+        _coord_index().add(q, r, s, obj.id)
+        _tile_changed(q, r, obj.db.terrain)
         return obj, True
 
+    def at_object_delete(self):
+        q, r, s = self.get_coords()
+        _coord_index().discard(q, r, s, self.id)
+        _room_index().discard_tile(self.id)
+        _tile_changed(q, r, removed=True)
+        return super().at_object_delete()
+
     # Convenience accessors
+    def get_rooms(self) -> list:
+        """Return the rooms linked to this hex."""
+        from world.hexstore import rooms_in_hexes
+
+        return rooms_in_hexes([self.get_coords()])
+
     def get_coords(self) -> tuple[int, int, int]:
         return int(self.db.q or 0), int(self.db.r or 0), int(self.db.s or 0)
 
     def set_terrain(self, terrain: str):
         self.db.terrain = str(terrain)
+        q, r, _s = self.get_coords()
+        _tile_changed(q, r, self.db.terrain)
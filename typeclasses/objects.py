@@ -14,6 +14,7 @@ from world.equipment.holding import HoldableMixin
 from world.physical.weight import WeightMixin
 from world.living.food import FoodMixin
 from world.physical.container import ContainerMixin
+from world.living.perception import carried_light, light_of, move_light, spread_light
 
 
 class ObjectParent:
@@ -36,6 +37,22 @@ class ObjectParent:
         result = self.search(*args, quiet=True, **kwargs)
         return result[0] if result else None
 
+    # Keep the cached light of the rooms around us current (see `Room.get_light_level`).
+    def at_object_receive(self, moved_obj, source_location, move_type="move", **kwargs):
+        super().at_object_receive(moved_obj, source_location, move_type=move_type, **kwargs)
+        if source_location is None:
+            # Moves from somewhere else were settled when leaving it.
+            spread_light(self, light_of(moved_obj), carried_light(moved_obj))
+
+    def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
+        super().at_object_leave(moved_obj, target_location, move_type=move_type, **kwargs)
+        move_light(self, target_location, light_of(moved_obj), carried_light(moved_obj))
+
+    def at_object_delete(self):
+        # Contents are moved out (and accounted for) after this hook.
+        spread_light(self.location, -light_of(self))
+        return super().at_object_delete()
+
 
 class Object(WeightMixin, ObjectParent, DefaultObject):
     """
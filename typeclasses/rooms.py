@@ -5,14 +5,20 @@ Rooms are simple containers that has no location of their own.
 
 """
 
+from functools import partial
+
+from evennia.objects.models import ObjectDB
 from evennia.objects.objects import DefaultRoom
+from evennia.utils.utils import lazy_property
 from evennia.contrib.base_systems import custom_gametime as gametime
-import evennia
 from world.physical.liquid import LiquidContainerMixin
 
 # Hex tile typeclass
 from .hextile import HexTile
-from world.living.perception import LightManager
+from world.hexstore import objects_by_id, occupancy_index, occupants_within, room_index, rooms_in_hexes
+from world.lightspill import spill_graph
+from world.living.perception import LIGHT_DEPTH, EphemeralLight, PerceptionMixin, SightIndex, light_of
+from world.sunlight import DEFAULT_SCHEDULE, sunlight_clock, sunlight_level
 
 from .objects import ObjectParent
 
@@ -28,11 +34,14 @@ class Room(LiquidContainerMixin, ObjectParent, DefaultRoom):
     properties and methods available on all Objects.
     """
 
+    # A room's own light (a LightManager on the room) counts towards its level.
+    lights_itself = True
+
     # --- Hex linkage ---------------------------------------------------------
     def set_hex_by_coords(self, q: int, r: int, s: int):
         """Link this room to a hex tile identified by cube coords.
 
-        Stores the `HexTile.id` in an Evennia Attribute `hex_id` (category
+        Stores the tile's dbref in an Evennia Attribute `hex_dbref` (category
         "environment"). Creates the `HexTile` if it does not exist.
         """
         # q + r + s must be 0 for valid cube coords; enforce lightly here
@@ -40,52 +49,81 @@ class Room(LiquidContainerMixin, ObjectParent, DefaultRoom):
             raise ValueError("Hex cube coords must satisfy q + r + s == 0")
 
         tile, _created = HexTile.get_or_create_by_coords(q, r, s, terrain="plain")
-        # Store dbref to make it easy to resolve later in-game
-        self.attributes.add("hex_dbref", tile.dbref, category="environment")
+        self._link_hex(tile)
         return tile
 
     def set_hex(self, tile: HexTile):
         """Link this room to an existing `HexTile` instance."""
         if not isinstance(tile, HexTile):
             raise TypeError("tile must be a HexTile instance")
-        self.attributes.add("hex_dbref", tile.dbref, category="environment")
+        self._link_hex(tile)
         return tile
 
+    def _link_hex(self, tile: HexTile) -> None:
+        # Store dbref to make it easy to resolve later in-game
+        self.attributes.add("hex_dbref", tile.dbref, category="environment")
+        room_index.link(self.id, tile.id)
+        self._cache_hex(tile)
+        occupancy_index.relink_room(self.id, self.ndb.hex_coords)
+
+    @staticmethod
+    def rooms_in_hexes(coords) -> list:
+        """Return every room linked to any of the hexes at `coords` ((q, r, s) tuples)."""
+        return rooms_in_hexes(coords)
+
+    def occupants_within(self, radius: int) -> list:
+        """Return the living beings within `radius` hexes of this room's hex."""
+        coords = self.get_hex_coords()
+        return occupants_within(coords, radius) if coords is not None else []
+
+    def at_object_delete(self):
+        room_index.link(self.id, None)
+        occupancy_index.relink_room(self.id, None)
+        return super().at_object_delete()
+
+    def _cache_hex(self, tile: HexTile | None) -> None:
+        """Keep the resolved tile and its coords in memory (non-persistent)."""
+        self.ndb.hex_tile = tile
+        self.ndb.hex_coords = tile.get_coords() if tile is not None else None
+        self.ndb.hex_resolved = True
+
+    def refresh_hex_cache(self) -> None:
+        """Drop the cached hex link so it is resolved again on next access."""
+        self.ndb.hex_tile = None
+        self.ndb.hex_coords = None
+        self.ndb.hex_resolved = False
+
     def get_hex_tile(self) -> HexTile | None:
-        """Return the linked `HexTile` or None if not linked."""
-        dbref = self.attributes.get("hex_dbref", category="environment", default=None)
-        if not dbref:
-            return None
-        objs = evennia.search_object(dbref)
-        return objs[0] if objs else None
+        """Return the linked `HexTile` or None if not linked.
+
+        The tile is resolved through the room index once and then served
+        from memory until the link changes or the tile is deleted.
+        """
+        if self.ndb.hex_resolved:
+            tile = self.ndb.hex_tile
+            if tile is None or tile.pk:
+                return tile
+            self.refresh_hex_cache()
+        tile_id = room_index.tile_id(self.id)
+        tiles = objects_by_id([tile_id]) if tile_id is not None else []
+        tile = tiles[0] if tiles else None
+        self._cache_hex(tile)
+        return tile
 
     def get_hex_coords(self) -> tuple[int, int, int] | None:
         """Return (q, r, s) for the linked hex or None if not linked."""
-        tile = self.get_hex_tile()
-        if tile is None:
+        if self.get_hex_tile() is None:
             return None
-        return (int(tile.db.q or 0), int(tile.db.r or 0), int(tile.db.s or 0))
+        return self.ndb.hex_coords
 
     # --- Lighting ------------------------------------------------------------
-    def _accumulate_contained_light(self, max_depth: int = 2) -> int:
-        """Sum light contributions from contents up to a limited depth.
+    def _accumulate_contained_light(self, max_depth: int = LIGHT_DEPTH) -> int:
+        """Sum the light of contents up to a limited depth, uncapped.
 
         Args:
-            max_depth: Maximum recursion depth into contents. Depth 0 means only
-                this object (room) itself; depth 1 includes direct contents; depth 2
-                includes contents of contents, etc.
+            max_depth: Maximum recursion depth into contents. Depth 1 means
+                direct contents only, depth 2 includes contents of contents, etc.
         """
-        def light_of(obj) -> int:
-            try:
-                val = int(getattr(obj, "get_light_level")(looker=None))
-            except Exception:
-                try:
-                    # Fallback to Attribute-based default
-                    val = int(getattr(getattr(obj, "db", object()), "light_level", 0) or 0)
-                except Exception:
-                    val = 0
-            return max(0, min(val, 100))
-
         total = 0
         visited: set[int] = set()
 
@@ -93,30 +131,140 @@ class Room(LiquidContainerMixin, ObjectParent, DefaultRoom):
             nonlocal total
             if depth > max_depth:
                 return
-            for obj in getattr(container, "contents", []) or []:
-                try:
-                    obj_id = int(getattr(obj, "id", 0))
-                except Exception:
-                    obj_id = 0
-                if obj_id and obj_id in visited:
+            for obj in container.contents:
+                if obj.id in visited:
                     continue
-                if obj_id:
-                    visited.add(obj_id)
+                visited.add(obj.id)
                 total += light_of(obj)
                 recurse(obj, depth + 1)
 
-        # Only sum from the contents; ambient from the room itself is handled separately
         recurse(self, 1)
-        return max(0, min(total, 100))
+        return total
+
+    def adjust_light(self, delta: int) -> None:
+        """Apply a change in contained light to the cached total, if any.
+
+        The change also reaches the rooms this one spills light into.
+        """
+        total = self.ndb.light_total
+        if total is None:
+            return
+        self._update_light("light_total", total + delta)
+        for room_id, factor in spill_graph.targets(self.id).items():
+            room = ObjectDB.get_cached_instance(room_id)
+            if room is not None and hasattr(room, "adjust_spill"):
+                room.adjust_spill(delta * factor)
+
+    def adjust_spill(self, delta: float) -> None:
+        """Apply a change in light spilled in from nearby rooms, if counted."""
+        spill = self.ndb.light_spill
+        if spill is not None:
+            self._update_light("light_spill", spill + delta)
+
+    def _update_light(self, key: str, value) -> None:
+        """Store a cached light figure, telling beings whose sight it changed."""
+        # Built here too, for beings that were in the room before anyone arrived
+        # (e.g. after a reload).
+        watched = bool(self.sight_index())
+        before = self.get_light_level() if watched else None
+        setattr(self.ndb, key, value)
+        if watched:
+            self.at_light_change(before, self.get_light_level())
+
+    def reset_light_cache(self) -> None:
+        """Forget the cached light totals; they are recounted on next access."""
+        self.ndb.light_total = None
+        self.ndb.light_spill = None
+        self._reset_spill_targets()
+
+    def _reset_spill_targets(self) -> None:
+        """Make the rooms this one spills into recount their spilled light."""
+        for room_id in spill_graph.targets(self.id):
+            room = ObjectDB.get_cached_instance(room_id)
+            if room is not None:
+                room.ndb.light_spill = None
+
+    def own_light(self) -> int:
+        """Uncapped light of this room and its contents, counted once then kept current."""
+        total = self.ndb.light_total
+        if total is None:
+            total = self._accumulate_contained_light()
+            if self.lights_itself:
+                total += light_of(self)
+            self.ndb.light_total = total
+            # Without a total, changes here (e.g. while this room was out of
+            # the idmapper cache) never reached the rooms it spills into.
+            self._reset_spill_targets()
+        return total
+
+    def spilled_light(self) -> float:
+        """Light reaching this room through exits from rooms nearby."""
+        spill = self.ndb.light_spill
+        if spill is None:
+            sources = spill_graph.sources(self.id)
+            spill = sum(
+                room.own_light() * sources[room.id] for room in objects_by_id(sources) if hasattr(room, "own_light")
+            )
+            self.ndb.light_spill = spill
+        return spill
 
     def get_light_level(self, looker=None) -> int:
         """Ambient light level from contained light sources (no sunlight).
 
         Internal rooms have no sunlight contribution by default; they are only
-        lit by objects (e.g., torches) present in the room or held/carried by
-        occupants.
+        lit by their own light level (see `LightManager`), by objects (e.g.,
+        torches) present in the room or held/carried by occupants, and by what
+        spills in through exits from lit rooms nearby (see `world.lightspill`).
+        All of it is counted once and then kept current as objects move and
+        light levels change, so this is a cached lookup.
+        """
+        total = self.own_light() + int(round(self.spilled_light()))
+        return max(0, min(total, 100))
+
+    # --- Sight ---------------------------------------------------------------
+    def sight_index(self) -> SightIndex:
+        """The beings in this room by light threshold, built on first use.
+
+        That is the first arrival or light change, whichever comes first.
+        Building it also counts the room's light, so later changes to it
+        have a level to be compared against.
         """
-        return self._accumulate_contained_light(max_depth=2)
+        index = self.ndb.sight_index
+        if index is None:
+            index = self.ndb.sight_index = SightIndex()
+            for obj in self.contents:
+                if isinstance(obj, PerceptionMixin):
+                    index.add(obj)
+            self.get_light_level()
+        return index
+
+    def update_sight(self, obj) -> None:
+        """Re-sort `obj` after its light threshold changed."""
+        if self.ndb.sight_index is not None:
+            self.ndb.sight_index.add(obj)
+
+    def at_light_change(self, before: int, after: int) -> None:
+        """Tell the beings whose sight the change from `before` to `after` light crossed."""
+        index = self.ndb.sight_index
+        if index is None or before == after:
+            return
+        for obj, sees in index.crossed(before, after):
+            if obj.location != self:
+                # Moved or deleted without hooks.
+                index.remove(obj)
+                continue
+            obj.at_sight_change(sees)
+
+    def at_object_receive(self, moved_obj, source_location, move_type="move", **kwargs):
+        super().at_object_receive(moved_obj, source_location, move_type=move_type, **kwargs)
+        if isinstance(moved_obj, PerceptionMixin):
+            self.sight_index().add(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
+        # Leave the index first: whoever walks off with the light doesn't see it go out.
+        if self.ndb.sight_index is not None:
+            self.ndb.sight_index.remove(moved_obj)
+        super().at_object_leave(moved_obj, target_location, move_type=move_type, **kwargs)
 
     # --- Macro attributes via hex -------------------------------------------
     def get_hex_weather(self) -> str:
@@ -144,22 +292,34 @@ class Room(LiquidContainerMixin, ObjectParent, DefaultRoom):
         return terrain_to_weather.get(terrain, "clear")
 
 
+# Outdoor rooms with beings to tell about sunlight changes, by sun schedule and id.
+_sunlit_rooms: dict[tuple, dict] = {}
+
+
+def _sunlight_changed(schedule, before: int, after: int) -> None:
+    for room in list(_sunlit_rooms.get(schedule, {}).values()):
+        room.at_sunlight_change(before, after)
+
+
 class ExternalRoom(Room):
     """Outdoor room whose sunlight level follows game time.
 
     Sunlight is an integer 0..100 where 0 is night and 100 is midday.
-    It ramps during dawn and dusk hours.
+    It ramps during dawn and dusk hours. Every outdoor room reads it from
+    the shared `world.sunlight.sunlight_clock`, which computes it once per
+    in-game minute.
     """
 
     # Dawn/Dusk configuration (in-game hours)
-    DAWN_START_HOUR: int = 5
-    DAWN_END_HOUR: int = 7
-    DUSK_START_HOUR: int = 18
-    DUSK_END_HOUR: int = 20
+    DAWN_START_HOUR, DAWN_END_HOUR, DUSK_START_HOUR, DUSK_END_HOUR = DEFAULT_SCHEDULE
+    # Sunlight is this room's own light, added in get_light_level; older
+    # versions also stored it as a 'light_level' Attribute, which is ignored.
+    lights_itself = False
 
-    @property
+    @lazy_property
     def light(self):
-        return LightManager(self, 100)
+        # Computed from the sunlight clock; never stored.
+        return EphemeralLight(self, compute=self.get_sunlight_level)
 
     def at_object_creation(self):
         super().at_object_creation()
@@ -173,30 +333,58 @@ class ExternalRoom(Room):
         year, month, day, hour, minute, second = gametime.custom_gametime(absolute=True)
         return float(hour) + float(minute) / 60.0 + float(second) / 3600.0
 
+    @property
+    def sun_schedule(self) -> tuple[int, int, int, int]:
+        return (self.DAWN_START_HOUR, self.DAWN_END_HOUR, self.DUSK_START_HOUR, self.DUSK_END_HOUR)
+
     def compute_sunlight_level(self) -> int:
         """Compute sunlight level 0..100 from game time with dawn/dusk ramps."""
-        t = self._current_game_time_hours()
-        dawn_start = float(self.DAWN_START_HOUR)
-        dawn_end = float(self.DAWN_END_HOUR)
-        dusk_start = float(self.DUSK_START_HOUR)
-        dusk_end = float(self.DUSK_END_HOUR)
-
-        if t < dawn_start or t >= dusk_end:
-            return 0
-        if dawn_start <= t < dawn_end:
-            # Linear ramp 0 -> 100 across dawn window
-            frac = (t - dawn_start) / max(dawn_end - dawn_start, 1e-6)
-            return int(round(100.0 * max(0.0, min(frac, 1.0))))
-        if dusk_start <= t < dusk_end:
-            # Linear ramp 100 -> 0 across dusk window
-            frac = (t - dusk_start) / max(dusk_end - dusk_start, 1e-6)
-            return int(round(100.0 * (1.0 - max(0.0, min(frac, 1.0)))))
-        # Daytime outside ramps -> full brightness
-        return 100
+        return sunlight_level(self._current_game_time_hours(), self.sun_schedule)
 
     def get_sunlight_level(self) -> int:
-        """Return the current sunlight level 0..100, computed on demand."""
-        return self.compute_sunlight_level()
+        """Return the current sunlight level 0..100 from the shared sunlight clock."""
+        return sunlight_clock.level(self.sun_schedule)
+
+    # --- Sight -------------------------------------------------------------
+    def at_init(self):
+        super().at_init()
+        # Follow the sun from the first load, so beings already here (e.g.
+        # after a reload) hear about dusk and dawn before anyone arrives.
+        self._follow_sun()
+
+    def _follow_sun(self) -> None:
+        schedule = self.sun_schedule
+        if schedule not in _sunlit_rooms:
+            _sunlit_rooms[schedule] = {}
+            sunlight_clock.subscribe(partial(_sunlight_changed, schedule), schedule)
+        _sunlit_rooms[schedule][self.id] = self
+
+    def _stop_following_sun(self) -> None:
+        self.ndb.sight_index = None
+        _sunlit_rooms.get(self.sun_schedule, {}).pop(self.id, None)
+
+    def sight_index(self):
+        index = super().sight_index()
+        self._follow_sun()
+        return index
+
+    def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
+        super().at_object_leave(moved_obj, target_location, move_type=move_type, **kwargs)
+        if self.ndb.sight_index is not None and not self.ndb.sight_index:
+            # Nobody left to tell; stop following the sun until someone arrives.
+            self._stop_following_sun()
+
+    def at_object_delete(self):
+        _sunlit_rooms.get(self.sun_schedule, {}).pop(self.id, None)
+        return super().at_object_delete()
+
+    def at_sunlight_change(self, before: int, after: int) -> None:
+        """Pass a change in sunlight on as a change in this room's light."""
+        if not self.sight_index():
+            self._stop_following_sun()
+            return
+        contained = super().get_light_level()
+        self.at_light_change(min(before + contained, 100), min(after + contained, 100))
 
     def get_light_level(self, looker=None) -> int:
         """Ambient light including sunlight and contained light sources.
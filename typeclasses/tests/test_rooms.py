@@ -0,0 +1,398 @@
+"""
+Tests for room hex linkage.
+"""
+from unittest.mock import patch
+from evennia.utils.test_resources import EvenniaTest
+from evennia import create_object
+from typeclasses.hextile import HexTile
+from typeclasses.rooms import _sunlit_rooms, _sunlight_changed
+from world.hexstore import coord_index, occupancy_index, occupants_in_hexes, room_index
+from world.living.people import Person
+from world.lightspill import spill_graph
+from world.living.perception import EphemeralLight, LightManager
+from world.sunlight import DEFAULT_SCHEDULE
+
+
+class TestRoomHexCache(EvenniaTest):
+    """Test suite for the cached hex link on rooms."""
+
+    def setUp(self):
+        super().setUp()
+        coord_index.reset()
+        room_index.reset()
+        self.room = create_object("typeclasses.rooms.Room", key="Field")
+
+    def test_unlinked_room(self):
+        """Test an unlinked room reports no hex."""
+        self.assertIsNone(self.room.get_hex_tile())
+        self.assertIsNone(self.room.get_hex_coords())
+        self.assertEqual(self.room.get_hex_weather(), "clear")
+
+    def test_set_hex_by_coords_caches_tile(self):
+        """Test linking by coords resolves without further queries."""
+        tile = self.room.set_hex_by_coords(1, -1, 0)
+        tile.set_terrain("forest")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.room.get_hex_tile(), tile)
+            self.assertEqual(self.room.get_hex_coords(), (1, -1, 0))
+            self.assertEqual(self.room.get_hex_weather(), "overcast")
+
+    def test_resolves_from_attribute_once(self):
+        """Test a room with a stored link resolves it on first access only."""
+        tile = self.room.set_hex_by_coords(0, 1, -1)
+        self.room.refresh_hex_cache()
+
+        self.assertEqual(self.room.get_hex_tile(), tile)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.room.get_hex_coords(), (0, 1, -1))
+
+    def test_set_hex_replaces_cache(self):
+        """Test relinking updates the cached tile and coords."""
+        self.room.set_hex_by_coords(0, 0, 0)
+        other, _ = HexTile.get_or_create_by_coords(2, -1, -1, terrain="swamp")
+        self.room.set_hex(other)
+
+        self.assertEqual(self.room.get_hex_tile(), other)
+        self.assertEqual(self.room.get_hex_coords(), (2, -1, -1))
+        self.assertEqual(self.room.get_hex_weather(), "humid")
+
+    def test_deleted_tile_clears_cache(self):
+        """Test a deleted tile is no longer returned."""
+        tile = self.room.set_hex_by_coords(0, 0, 0)
+        tile.delete()
+
+        self.assertIsNone(self.room.get_hex_tile())
+        self.assertIsNone(self.room.get_hex_coords())
+
+
+class TestHexRoomIndex(EvenniaTest):
+    """Test suite for the hex -> rooms reverse index."""
+
+    def setUp(self):
+        super().setUp()
+        coord_index.reset()
+        room_index.reset()
+        self.field = create_object("typeclasses.rooms.Room", key="Field")
+        self.barn = create_object("typeclasses.rooms.Room", key="Barn")
+        self.cave = create_object("typeclasses.rooms.Room", key="Cave")
+        self.tile = self.field.set_hex_by_coords(0, 0, 0)
+        self.barn.set_hex(self.tile)
+        self.cave.set_hex_by_coords(3, -3, 0)
+
+    def test_rooms_in_one_hex(self):
+        """Test a tile lists every room linked to it."""
+        self.assertEqual(set(self.tile.get_rooms()), {self.field, self.barn})
+
+    def test_rooms_in_many_hexes(self):
+        """Test a set of hexes resolves in one lookup, skipping unknown hexes."""
+        rooms = self.field.rooms_in_hexes([(0, 0, 0), (3, -3, 0), (9, -9, 0)])
+        self.assertEqual(set(rooms), {self.field, self.barn, self.cave})
+
+    def test_built_from_stored_links(self):
+        """Test the index is rebuilt from the hex_dbref attributes."""
+        room_index.reset()
+        self.assertEqual(set(self.tile.get_rooms()), {self.field, self.barn})
+        self.assertFalse(room_index.room_ids([12345]))
+
+    def test_relink_moves_room(self):
+        """Test relinking a room moves it to the new hex."""
+        self.barn.set_hex_by_coords(3, -3, 0)
+        self.assertEqual(self.tile.get_rooms(), [self.field])
+        self.assertEqual(set(self.field.rooms_in_hexes([(3, -3, 0)])), {self.barn, self.cave})
+
+    def test_deletion_updates_index(self):
+        """Test deleted rooms and tiles drop out of the index."""
+        self.barn.delete()
+        self.assertEqual(self.tile.get_rooms(), [self.field])
+        tile_id = self.tile.id
+        self.tile.delete()
+        self.assertFalse(room_index.room_ids([tile_id]))
+
+
+class TestHexOccupancy(EvenniaTest):
+    """Test suite for the per-hex occupancy index."""
+
+    def setUp(self):
+        super().setUp()
+        coord_index.reset()
+        room_index.reset()
+        occupancy_index.reset()
+        self.field = create_object("typeclasses.rooms.Room", key="Field")
+        self.barn = create_object("typeclasses.rooms.Room", key="Barn")
+        self.cave = create_object("typeclasses.rooms.Room", key="Cave")
+        self.field.set_hex_by_coords(0, 0, 0)
+        self.barn.set_hex_by_coords(1, -1, 0)
+        self.cave.set_hex_by_coords(5, -5, 0)
+        self.alice = create_object("typeclasses.characters.Character", key="Alice", location=self.field)
+        self.bob = create_object("typeclasses.characters.Character", key="Bob", location=self.cave)
+        self.rock = create_object("typeclasses.objects.Object", key="rock", location=self.field)
+
+    def test_built_from_db(self):
+        """Test the index finds living beings in linked rooms, not items."""
+        self.assertEqual(set(self.field.occupants_within(1)), {self.alice})
+        self.assertEqual(set(self.field.occupants_within(5)), {self.alice, self.bob})
+        self.assertEqual(occupants_in_hexes([(5, -5, 0), (9, -9, 0)]), [self.bob])
+
+    def test_moves_update_index(self):
+        """Test moving between rooms and off the map is tracked without queries."""
+        occupancy_index.build()
+        self.bob.move_to(self.barn, quiet=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(occupancy_index.ids_within((0, 0, 0), 1), {self.alice.id, self.bob.id})
+        limbo = create_object("typeclasses.rooms.Room", key="Limbo")
+        self.alice.move_to(limbo, quiet=True)
+        self.assertEqual(self.field.occupants_within(1), [self.bob])
+
+    def test_relink_and_delete(self):
+        """Test occupants follow their room to a new hex and leave when deleted."""
+        occupancy_index.build()
+        self.cave.set_hex_by_coords(0, 1, -1)
+        self.assertEqual(set(self.field.occupants_within(1)), {self.alice, self.bob})
+        self.bob.delete()
+        self.assertEqual(self.field.occupants_within(1), [self.alice])
+
+    def test_stale_entry_is_replaced(self):
+        """Test a move made without hooks is corrected when the being is looked up."""
+        occupancy_index.build()
+        self.alice.move_to(self.cave, quiet=True, move_hooks=False)
+        self.assertEqual(self.field.occupants_within(0), [])
+        self.assertEqual(set(self.cave.occupants_within(0)), {self.alice, self.bob})
+
+
+class TestRoomLight(EvenniaTest):
+    """Test suite for the cached room light total."""
+
+    def setUp(self):
+        super().setUp()
+        self.tavern = create_object("typeclasses.rooms.Room", key="Tavern")
+        self.cellar = create_object("typeclasses.rooms.Room", key="Cellar")
+        self.patron = create_object("typeclasses.characters.Character", key="Patron", location=self.tavern)
+        self.torch = create_object("typeclasses.objects.Object", key="torch", location=self.tavern)
+        LightManager(self.torch, 30)
+
+    def assertLight(self, room, level):
+        self.assertEqual(room.get_light_level(), level)
+        room.reset_light_cache()
+        self.assertEqual(room.get_light_level(), level)
+
+    def test_cached(self):
+        """Test the light level and sight checks need no walk once counted."""
+        self.assertEqual(self.tavern.get_light_level(), 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tavern.get_light_level(), 30)
+            self.assertTrue(self.patron.vision.can_see)
+
+    def test_follows_moves(self):
+        """Test light follows sources picked up, carried off, bagged and put down."""
+        self.tavern.get_light_level()
+        self.cellar.get_light_level()
+        self.torch.move_to(self.patron, quiet=True)
+        self.assertLight(self.tavern, 30)
+        self.patron.move_to(self.cellar, quiet=True)
+        self.assertLight(self.tavern, 0)
+        self.assertLight(self.cellar, 30)
+
+        bag = create_object("typeclasses.objects.Object", key="bag", location=self.patron)
+        self.torch.move_to(bag, quiet=True)
+        self.assertLight(self.cellar, 0)
+        bag.move_to(self.cellar, quiet=True)
+        self.assertLight(self.cellar, 30)
+        bag.move_to(self.tavern, quiet=True)
+        self.assertLight(self.cellar, 0)
+        self.assertLight(self.tavern, 30)
+
+    def test_follows_level_changes(self):
+        """Test light level changes reach the room, also from carried sources."""
+        self.torch.move_to(self.patron, quiet=True)
+        self.tavern.get_light_level()
+        lamp = create_object("typeclasses.objects.Object", key="lamp", location=self.tavern)
+        lamp.light = LightManager(lamp, 50)
+        self.assertLight(self.tavern, 80)
+        self.torch.light = LightManager(self.torch, 40)
+        lamp.light.level = 0
+        self.assertLight(self.tavern, 40)
+        lamp.light.level = 90
+        self.assertLight(self.tavern, 100)
+        self.assertEqual(self.tavern.ndb.light_total, 130)
+
+    def test_self_lit_room(self):
+        """Test a room's own light level counts and follows changes."""
+        self.cellar.get_light_level()
+        self.cellar.light = LightManager(self.cellar, 40)
+        self.assertLight(self.cellar, 40)
+        self.torch.move_to(self.cellar, quiet=True)
+        self.cellar.light.level = 20
+        self.assertLight(self.cellar, 50)
+
+    def test_follows_deletion(self):
+        """Test deleted sources, and sources carried by deleted objects, stop lighting."""
+        self.tavern.get_light_level()
+        self.torch.move_to(self.patron, quiet=True)
+        lamp = create_object("typeclasses.objects.Object", key="lamp", location=self.tavern)
+        LightManager(lamp, 20)
+        lamp.delete()
+        self.assertLight(self.tavern, 30)
+        self.patron.home = self.cellar
+        self.patron.delete()
+        self.assertLight(self.tavern, 0)
+
+    def test_outdoor_reads_are_free(self):
+        """Test reading an outdoor room's light and sunlight writes nothing."""
+        field = create_object("typeclasses.rooms.ExternalRoom", key="Field")
+        field.get_light_level()
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                field.light.level
+                field.get_light_level()
+                field.get_sunlight_level()
+        self.assertFalse(field.tags.has("light_source", category="vision"))
+
+
+class TestSightChanges(EvenniaTest):
+    """Test suite for telling beings when the light crosses their threshold."""
+
+    def setUp(self):
+        super().setUp()
+        self.tavern = create_object("typeclasses.rooms.Room", key="Tavern")
+        self.torch = create_object("typeclasses.objects.Object", key="torch", location=self.tavern)
+        self.torch.light = LightManager(self.torch, 30)
+        self.owl, self.patron, self.mole = (
+            create_object("typeclasses.characters.Character", key=key, location=self.tavern)
+            for key in ("Owl", "Patron", "Mole")
+        )
+        self.owl.vision.light_threshold = 5
+        self.mole.vision.light_threshold = 50
+        # As after a reload: nobody has walked in yet.
+        self.tavern.ndb.sight_index = None
+        self.tavern.get_light_level()
+        patcher = patch.object(Person, "at_sight_change", autospec=True)
+        self.sight_change = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changes(self):
+        calls = [(call.args[0].key, call.args[1]) for call in self.sight_change.call_args_list]
+        self.sight_change.reset_mock()
+        return sorted(calls)
+
+    def test_only_crossed_thresholds_hear(self):
+        """Test dimming and brightening tell only those whose sight changed."""
+        self.torch.light.level = 10
+        self.assertEqual(self.changes(), [("Patron", False)])
+        self.torch.light.level = 60
+        self.assertEqual(self.changes(), [("Mole", True), ("Patron", True)])
+        self.torch.light.level = 55
+        self.assertEqual(self.changes(), [])
+
+    def test_torch_leaving(self):
+        """Test a torch carried off darkens the room for those left behind only."""
+        self.torch.move_to(self.patron, quiet=True)
+        self.assertEqual(self.changes(), [])
+        cellar = create_object("typeclasses.rooms.Room", key="Cellar")
+        self.patron.move_to(cellar, quiet=True)
+        self.assertEqual(self.changes(), [("Owl", False)])
+
+    def test_threshold_change_resorts(self):
+        """Test a changed threshold moves the being in the index."""
+        self.mole.vision.light_threshold = 25
+        self.torch.light.level = 20
+        self.assertEqual(self.changes(), [("Mole", False)])
+
+    def test_dusk(self):
+        """Test outdoor rooms with beings in them follow the sunlight."""
+        field = create_object("typeclasses.rooms.ExternalRoom", key="Field")
+        self.patron.move_to(field, quiet=True)
+        self.assertIn(field.id, _sunlit_rooms[DEFAULT_SCHEDULE])
+        _sunlight_changed(DEFAULT_SCHEDULE, 100, 0)
+        self.assertEqual(self.changes(), [("Patron", False)])
+        self.patron.move_to(self.tavern, quiet=True)
+        self.assertNotIn(field.id, _sunlit_rooms[DEFAULT_SCHEDULE])
+
+    def test_dusk_after_reload(self):
+        """Test beings already in a loaded outdoor room hear about the sunlight."""
+        field = create_object("typeclasses.rooms.ExternalRoom", key="Field")
+        self.patron.move_to(field, quiet=True)
+        field.ndb.sight_index = None
+        _sunlit_rooms[DEFAULT_SCHEDULE].pop(field.id)
+        field.at_init()
+        _sunlight_changed(DEFAULT_SCHEDULE, 100, 0)
+        self.assertEqual(self.changes(), [("Patron", False)])
+        empty = create_object("typeclasses.rooms.ExternalRoom", key="Meadow")
+        empty.at_init()
+        _sunlight_changed(DEFAULT_SCHEDULE, 0, 100)
+        self.assertNotIn(empty.id, _sunlit_rooms[DEFAULT_SCHEDULE])
+
+
+class TestLightSpill(EvenniaTest):
+    """Test suite for light spilling through exits."""
+
+    def setUp(self):
+        super().setUp()
+        self.yard, self.hall, self.cellar, self.attic = (
+            create_object("typeclasses.rooms.Room", key=key) for key in ("Yard", "Hall", "Cellar", "Attic")
+        )
+        door = create_object("typeclasses.exits.Exit", key="door", location=self.yard, destination=self.hall)
+        door.light_spill = 0.5
+        create_object("typeclasses.exits.Exit", key="down", location=self.hall, destination=self.cellar)
+        create_object("typeclasses.exits.Exit", key="up", location=self.cellar, destination=self.attic)
+        spill_graph.reset()
+        self.campfire = create_object("typeclasses.objects.Object", key="campfire", location=self.yard)
+        LightManager(self.campfire, 40)
+
+    def levels(self):
+        return [room.get_light_level() for room in (self.yard, self.hall, self.cellar, self.attic)]
+
+    def test_spills_within_radius(self):
+        """Test light weakens through each exit and stops after two of them."""
+        self.assertEqual(self.levels(), [40, 20, 5, 0])
+
+    def test_incremental(self):
+        """Test a change in one room reaches its neighbours without recounting."""
+        self.levels()
+        with self.assertNumQueries(0):
+            EphemeralLight(self.campfire, 80)
+            self.assertEqual(self.levels(), [80, 40, 10, 0])
+        self.campfire.move_to(self.hall, quiet=True)
+        self.assertEqual(self.levels(), [0, 80, 20, 5])
+        for room in (self.yard, self.hall, self.cellar, self.attic):
+            room.reset_light_cache()
+        self.assertEqual(self.levels(), [0, 80, 20, 5])
+
+    def test_exit_changes(self):
+        """Test the graph follows new exits and changed spill fractions."""
+        self.levels()
+        self.yard.exits[0].light_spill = 1.0
+        self.assertEqual(self.levels(), [40, 40, 10, 0])
+        self.yard.exits[0].attributes.add("light_spill", 0.5)
+        self.assertEqual(self.levels(), [40, 20, 5, 0])
+        gate = create_object("typeclasses.exits.Exit", key="gate", location=self.yard, destination=self.attic)
+        self.assertEqual(self.levels(), [40, 20, 5, 10])
+        gate.destination = self.cellar
+        self.assertEqual(self.levels(), [40, 20, 10, 2])
+
+    def test_exit_changes_stay_local(self):
+        """Test an exit change leaves the spill of rooms far from it alone."""
+        far, farther = (create_object("typeclasses.rooms.Room", key=key) for key in ("Far", "Farther"))
+        create_object("typeclasses.exits.Exit", key="path", location=far, destination=farther)
+        self.levels()
+        farther.get_light_level()
+        self.yard.exits[0].light_spill = 1.0
+        self.assertTrue(spill_graph.is_built)
+        self.assertIsNotNone(farther.ndb.light_spill)
+        self.assertEqual(self.levels(), [40, 40, 10, 0])
+        self.yard.exits[0].delete()
+        self.assertIsNotNone(farther.ndb.light_spill)
+        self.assertEqual(self.levels(), [40, 0, 0, 0])
+
+    def test_only_exits_spill(self):
+        """Test objects that merely have a destination pass on no light."""
+        create_object("typeclasses.objects.Object", key="portal", location=self.yard, destination=self.attic)
+        spill_graph.reset()
+        self.assertEqual(self.levels(), [40, 20, 5, 0])
+
+    def test_recounted_source(self):
+        """Test neighbours recount their spill when a source loses its cached total."""
+        self.levels()
+        self.yard.ndb.light_total = None
+        EphemeralLight(self.campfire, 80)
+        self.assertEqual(self.levels(), [80, 40, 10, 0])
@@ -0,0 +1,131 @@
+"""Features on the edges between hexes: roads, rivers, fords and cliffs.
+
+Every edge is shared by two hexes. It is stored once, on its "owning" hex:
+the hex it leaves in one of the first three `AXIAL_DIRECTIONS`. Each hex
+owns three edges and keeps their feature flags packed into a single int
+(one byte per edge), so a region's edges are one dict lookup per hex and a
+tile's edges persist as one small Attribute.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+from world.hexgrid import AXIAL_DIRECTIONS
+
+ROAD = 1
+RIVER = 2
+FORD = 4
+CLIFF = 8
+FEATURES = {"road": ROAD, "river": RIVER, "ford": FORD, "cliff": CLIFF}
+
+# Attribute holding a tile's packed edge flags.
+EDGE_ATTRIBUTE = "edges"
+
+_DIRECTION = {offset: index for index, offset in enumerate(AXIAL_DIRECTIONS)}
+
+
+def edge_slot(q: int, r: int, direction: int) -> tuple[int, int, int]:
+    """Return `(owner_q, owner_r, slot)` of the edge leaving (q, r) in `direction`."""
+    if direction < 3:
+        return q, r, direction
+    dq, dr = AXIAL_DIRECTIONS[direction]
+    return q + dq, r + dr, direction - 3
+
+
+def direction_between(a, b) -> int:
+    """Index into `AXIAL_DIRECTIONS` of the step from hex `a` to adjacent hex `b`."""
+    direction = _DIRECTION.get((b[0] - a[0], b[1] - a[1]))
+    if direction is None:
+        raise ValueError(f"{tuple(a)} and {tuple(b)} are not adjacent")
+    return direction
+
+
+def feature_flags(names) -> int:
+    """Combine feature names (see `FEATURES`) into flags."""
+    flags = 0
+    for name in names:
+        try:
+            flags |= FEATURES[name]
+        except KeyError:
+            raise ValueError(f"unknown edge feature {name!r}") from None
+    return flags
+
+
+class HexEdges:
+    """Feature flags on hex edges, packed per owning hex."""
+
+    def __init__(self) -> None:
+        self._packed: dict[tuple[int, int], int] = {}
+
+    def get(self, q: int, r: int, direction: int) -> int:
+        """Flags on the edge leaving (q, r) in `direction`."""
+        oq, or_, slot = edge_slot(q, r, direction)
+        return (self._packed.get((oq, or_), 0) >> (slot * 8)) & 0xFF
+
+    def set(self, q: int, r: int, direction: int, flags: int) -> bool:
+        """Set the flags on an edge; return True if they changed."""
+        if not 0 <= flags <= 0xFF:
+            raise ValueError("edge flags must fit in one byte")
+        oq, or_, slot = edge_slot(q, r, direction)
+        key = (oq, or_)
+        old = self._packed.get(key, 0)
+        new = (old & ~(0xFF << (slot * 8))) | (flags << (slot * 8))
+        if new == old:
+            return False
+        if new:
+            self._packed[key] = new
+        else:
+            del self._packed[key]
+        return True
+
+    def packed(self, q: int, r: int) -> int:
+        """All three owned edges of (q, r) as one int, as persisted."""
+        return self._packed.get((q, r), 0)
+
+    def set_packed(self, q: int, r: int, value: int) -> None:
+        if value:
+            self._packed[(q, r)] = value
+        else:
+            self._packed.pop((q, r), None)
+
+    def owners(self) -> Iterator[tuple[int, int]]:
+        """Axial coords of every hex owning at least one featured edge."""
+        return iter(list(self._packed))
+
+    def items(self) -> Iterator[tuple[int, int, int, int]]:
+        """Yield `(q, r, direction, flags)` for every featured edge, from its owner."""
+        for (q, r), packed in list(self._packed.items()):
+            for slot in range(3):
+                flags = (packed >> (slot * 8)) & 0xFF
+                if flags:
+                    yield q, r, slot, flags
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, int, int]]:
+        """Yield `(q, r, direction, flags)` for featured edges touching a hex in the inclusive box."""
+        packed = self._packed
+        # Owners of edges touching the box lie at most one step outside it.
+        oq_min, or_min, or_max = q_min - 1, r_min - 1, r_max + 1
+        if (q_max - oq_min + 1) * (or_max - or_min + 1) < len(packed):
+            owners = [
+                (q, r)
+                for r in range(or_min, or_max + 1)
+                for q in range(oq_min, q_max + 1)
+                if (q, r) in packed
+            ]
+        else:
+            owners = [(q, r) for q, r in packed if oq_min <= q <= q_max and or_min <= r <= or_max]
+        for q, r in owners:
+            inside = q_min <= q <= q_max and r_min <= r <= r_max
+            value = packed[(q, r)]
+            for slot in range(3):
+                flags = (value >> (slot * 8)) & 0xFF
+                if not flags:
+                    continue
+                dq, dr = AXIAL_DIRECTIONS[slot]
+                if inside or (q_min <= q + dq <= q_max and r_min <= r + dr <= r_max):
+                    yield q, r, slot, flags
+
+    def __len__(self) -> int:
+        """Number of hexes owning featured edges."""
+        return len(self._packed)
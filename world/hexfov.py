@@ -0,0 +1,160 @@
+"""Elevation-aware field of view over a `world.hexmap.HexMap`.
+
+A hex is visible from an origin when nothing between them rises above the
+sight line from the observer's eye (origin elevation plus `eye_height`)
+to the hex's surface. Hexes are processed outward in spiral order, and
+each inherits the steepest horizon seen so far along its line of sight
+from the hex just before it on that line (precomputed per radius by
+`sight_table`). A whole field of view costs one step per hex rather than
+one line walk per hex.
+
+Elevation comes from a per-tile layer: any mapping of axial `(q, r)` to a
+number, or a callable `(q, r) -> number`. Without one, the map's own
+"elevation" layer is used where set, and a representative elevation is
+derived from the tile's terrain elsewhere.
+
+Results are cached per `(origin, radius)` in a bounded LRU that is dropped
+when the map's `revision` changes; call `clear_cache` after editing an
+external elevation layer.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterable, Mapping, Optional, Union
+
+from world.hexgrid import cube_round, spiral_offsets
+from world.hexmap import CubeCoord, HexMap
+
+TERRAIN_ELEVATION: dict[str, float] = {
+    "ocean": 0,
+    "coast": 1,
+    "swamp": 1,
+    "plain": 2,
+    "plains": 2,
+    "desert": 2,
+    "forest": 2,
+    "tundra": 3,
+    "hills": 5,
+    "mountain": 10,
+}
+DEFAULT_EYE_HEIGHT = 1.0
+DEFAULT_CACHE_SIZE = 4096
+
+ElevationLayer = Union[Mapping[tuple[int, int], float], Callable[[int, int], float]]
+
+
+class HexFieldOfView:
+    """Line-of-sight and field-of-view queries over one HexMap.
+
+    Args:
+        hexmap: The map; only hexes on it can be seen.
+        elevation: Per-tile elevation layer; the map's own if omitted.
+        eye_height: Observer height above the origin hex.
+        cache_size: Maximum number of cached fields of view.
+    """
+
+    def __init__(
+        self,
+        hexmap: HexMap,
+        elevation: Optional[ElevationLayer] = None,
+        eye_height: float = DEFAULT_EYE_HEIGHT,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        self.hexmap = hexmap
+        self.eye_height = eye_height
+        if elevation is None:
+            self._elevation = self._terrain_elevation
+        elif callable(elevation):
+            self._elevation = elevation
+        else:
+            self._elevation = lambda q, r: elevation.get((q, r), 0)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_revision = hexmap.revision
+        self.hits = 0
+        self.misses = 0
+
+    def _terrain_elevation(self, q: int, r: int) -> float:
+        layer = self.hexmap.layer("elevation")
+        if layer is not None:
+            value = layer.get(q, r)
+            if value is not None:
+                return value
+        return TERRAIN_ELEVATION.get(self.hexmap.storage.get(q, r), 0)
+
+    def elevation(self, coord: CubeCoord) -> float:
+        return self._elevation(coord[0], coord[1])
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._cache_revision = self.hexmap.revision
+
+    # --- Queries ---
+    def visible(self, origin: CubeCoord, radius: int) -> frozenset[CubeCoord]:
+        """Hexes on the map visible from `origin` within `radius`, origin included."""
+        if self._cache_revision != self.hexmap.revision:
+            self.clear_cache()
+        key = (origin[0], origin[1], radius)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = self._compute(origin[0], origin[1], radius)
+        self._cache[key] = result
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def visible_many(self, origins: Iterable[CubeCoord], radius: int) -> dict[CubeCoord, frozenset[CubeCoord]]:
+        """Batch `visible` for many observers; shared origins are computed once."""
+        return {origin: self.visible(origin, radius) for origin in origins}
+
+    def can_see(self, origin: CubeCoord, target: CubeCoord) -> bool:
+        """True if `target` is visible from `origin`."""
+        distance = HexMap.distance(origin, target)
+        return target in self.visible(origin, distance)
+
+    def _compute(self, oq: int, or_: int, radius: int) -> frozenset[CubeCoord]:
+        storage = self.hexmap.storage
+        if not storage.has(oq, or_):
+            return frozenset()
+        elevation_of = self._elevation
+        has = storage.has
+        eye = elevation_of(oq, or_) + self.eye_height
+        table = sight_table(radius)
+        # blocking[i]: steepest slope seen up to and including spiral hex i.
+        blocking = [float("-inf")] * len(table)
+        visible = [CubeCoord.from_axial(oq, or_)]
+        for index in range(1, len(table)):
+            dq, dr, distance, parent = table[index]
+            q, r = oq + dq, or_ + dr
+            present = has(q, r)
+            slope = ((elevation_of(q, r) if present else 0) - eye) / distance
+            prior = blocking[parent]
+            blocking[index] = slope if slope > prior else prior
+            if present and slope >= prior:
+                visible.append(CubeCoord.from_axial(q, r))
+        return frozenset(visible)
+
+
+@lru_cache(maxsize=64)
+def sight_table(radius: int) -> tuple[tuple[int, int, int, int], ...]:
+    """`(dq, dr, distance, parent)` per spiral offset within `radius`.
+
+    `parent` is the spiral index of the hex one step back along the line
+    from the origin; the tiny nudge keeps lines along hex edges on a
+    consistent side.
+    """
+    offsets = spiral_offsets(radius).axial
+    position = {offset: index for index, offset in enumerate(offsets)}
+    table = [(0, 0, 0, 0)]
+    for dq, dr in offsets[1:]:
+        distance = max(abs(dq), abs(dr), abs(dq + dr))
+        step = (distance - 1) / distance
+        pq, pr, _ps = cube_round(dq * step + 1e-6, dr * step + 1e-6)
+        table.append((dq, dr, distance, position[(pq, pr)]))
+    return tuple(table)
@@ -0,0 +1,192 @@
+"""Deterministic procedural terrain for hex regions.
+
+Elevation and moisture come from fractal value noise seeded by
+`WorldGenerator.seed`, sampled at each hex centre, and are classified into
+the same terrain strings used by `HexTile`, `Room.get_hex_weather` and the
+pathfinder. The same seed and region always produce the same terrain, on
+any machine and with any number of worker processes.
+
+Noise is evaluated a whole row of hexes at a time: lattice values along the
+row are hashed once per octave and every hex in the row is then a few
+multiply-adds over plain lists. Regions of `POOL_THRESHOLD` hexes or more
+are split into row bands and generated in a process pool.
+
+`generate_into` fills a HexMap; `generate_to_store` streams bands straight
+into the `HexTile` store without building a map at all.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+from django.db import transaction
+
+from world.hexmap import STORE_LISTENERS, CubeCoord, HexMap
+from world.hexstore import write_changes
+
+# Codes produced by the generator, index into this tuple.
+TERRAINS = ("ocean", "coast", "desert", "plain", "forest", "swamp", "hills", "mountain", "tundra")
+_CODE = {name: code for code, name in enumerate(TERRAINS)}
+
+POOL_THRESHOLD = 200_000
+BAND_ROWS = 64
+SQRT3_2 = math.sqrt(3) / 2
+
+
+def _lattice(ix: int, iy: int, seed: int) -> float:
+    """Hash a lattice point to [0, 1)."""
+    h = (ix * 374761393 + iy * 668265263 + seed * 2246822519) & 0xFFFFFFFF
+    h = ((h ^ (h >> 13)) * 1274126177) & 0xFFFFFFFF
+    return (h ^ (h >> 16)) / 4294967296.0
+
+
+def noise_row(q_min: int, q_max: int, r: int, seed: int, scale: float, octaves: int) -> list[float]:
+    """Fractal value noise in [0, 1) for hexes q_min..q_max of row r."""
+    count = q_max - q_min + 1
+    total = [0.0] * count
+    amplitude = 1.0
+    norm = 0.0
+    frequency = 1.0 / scale
+    for octave in range(octaves):
+        octave_seed = seed * 31 + octave
+        y = r * SQRT3_2 * frequency
+        iy = math.floor(y)
+        ty = y - iy
+        sy = ty * ty * (3 - 2 * ty)
+        half_r = r / 2
+        base = math.floor((q_min + half_r) * frequency)
+        span = math.floor((q_max + half_r) * frequency) - base + 2
+        row0 = [_lattice(base + i, iy, octave_seed) for i in range(span)]
+        row1 = [_lattice(base + i, iy + 1, octave_seed) for i in range(span)]
+        # Blend the two lattice rows once, then interpolate along x.
+        blended = [a + (b - a) * sy for a, b in zip(row0, row1)]
+        for i in range(count):
+            # Computed from q alone so a hex gets the same value in any region.
+            x = (q_min + i + half_r) * frequency
+            ix = math.floor(x)
+            tx = x - ix
+            sx = tx * tx * (3 - 2 * tx)
+            j = ix - base
+            left = blended[j]
+            total[i] += (left + (blended[j + 1] - left) * sx) * amplitude
+        norm += amplitude
+        amplitude *= 0.5
+        frequency *= 2.0
+    return [value / norm for value in total]
+
+
+def classify(elevation: float, moisture: float) -> int:
+    """Terrain code for an elevation/moisture pair, both in [0, 1)."""
+    if elevation < 0.38:
+        return _CODE["ocean"]
+    if elevation < 0.42:
+        return _CODE["coast"]
+    if elevation > 0.72:
+        return _CODE["tundra"] if moisture > 0.6 else _CODE["mountain"]
+    if elevation > 0.62:
+        return _CODE["hills"]
+    if moisture < 0.35:
+        return _CODE["desert"]
+    if moisture < 0.5:
+        return _CODE["plain"]
+    if moisture < 0.65:
+        return _CODE["forest"]
+    return _CODE["swamp"]
+
+
+def _generate_band(args) -> list[tuple[int, bytes]]:
+    """Worker: terrain codes for rows r_start..r_end of the region."""
+    seed, scale, octaves, q_min, q_max, r_start, r_end = args
+    rows = []
+    for r in range(r_start, r_end + 1):
+        elevation = noise_row(q_min, q_max, r, seed, scale, octaves)
+        moisture = noise_row(q_min, q_max, r, seed + 7919, scale * 1.5, octaves)
+        rows.append((r, bytes(map(classify, elevation, moisture))))
+    return rows
+
+
+class WorldGenerator:
+    """Generates terrain for axial boxes of hexes.
+
+    Args:
+        seed: Any int; the same seed always yields the same world.
+        scale: Size, in hexes, of the largest noise features.
+        octaves: Number of noise layers summed for detail.
+        workers: Process count for large regions (default: CPU count).
+    """
+
+    def __init__(self, seed: int = 0, scale: float = 48.0, octaves: int = 4, workers: Optional[int] = None) -> None:
+        self.seed = int(seed)
+        self.scale = float(scale)
+        self.octaves = int(octaves)
+        self.workers = workers or os.cpu_count() or 1
+
+    def rows(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, bytes]]:
+        """Yield `(r, codes)` for each row of the inclusive axial box, in order.
+
+        `codes[i]` is the `TERRAINS` index of hex `(q_min + i, r)`.
+        """
+        bands = [
+            (self.seed, self.scale, self.octaves, q_min, q_max, start, min(start + BAND_ROWS - 1, r_max))
+            for start in range(r_min, r_max + 1, BAND_ROWS)
+        ]
+        area = (q_max - q_min + 1) * (r_max - r_min + 1)
+        if self.workers > 1 and area >= POOL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for band in pool.map(_generate_band, bands):
+                    yield from band
+        else:
+            for band in bands:
+                yield from _generate_band(band)
+
+    def terrain_at(self, coord: CubeCoord) -> str:
+        """Terrain of a single hex, matching what `rows` produces for it."""
+        (_r, codes), = _generate_band((self.seed, self.scale, self.octaves, coord[0], coord[0], coord[1], coord[1]))
+        return TERRAINS[codes[0]]
+
+    def generate_into(self, hexmap: HexMap, q_min: int, r_min: int, q_max: int, r_max: int) -> int:
+        """Add generated tiles for the box to `hexmap`; return how many were written.
+
+        Tiles go through `add_tile`, so they are dirty and `save_all`
+        persists them with the usual batched writes.
+        """
+        add_tile = hexmap.add_tile
+        from_axial = CubeCoord.from_axial
+        count = 0
+        for r, codes in self.rows(q_min, r_min, q_max, r_max):
+            for i, code in enumerate(codes):
+                add_tile(from_axial(q_min + i, r), TERRAINS[code])
+            count += len(codes)
+        return count
+
+    @transaction.atomic
+    def generate_to_store(self, q_min: int, r_min: int, q_max: int, r_max: int, batch_rows: int = BAND_ROWS) -> int:
+        """Write generated tiles for the box straight into the `HexTile` store.
+
+        Rows are written in batches as they are generated, so memory stays
+        bounded by one batch. Missing tiles are inserted and existing ones
+        get the generated terrain. `hexmap.STORE_LISTENERS` hear about each
+        batch, so live maps such as the shared world map follow along.
+        """
+        count = 0
+        pending = {}
+        for index, (r, codes) in enumerate(self.rows(q_min, r_min, q_max, r_max), start=1):
+            for i, code in enumerate(codes):
+                q = q_min + i
+                pending[(q, r, -q - r)] = TERRAINS[code]
+            if index % batch_rows == 0:
+                count += self._store_batch(pending)
+                pending = {}
+        if pending:
+            count += self._store_batch(pending)
+        return count
+
+    @staticmethod
+    def _store_batch(tiles: dict) -> int:
+        write_changes(tiles)
+        for listener in STORE_LISTENERS:
+            listener(None, tiles, [])
+        return len(tiles)
@@ -0,0 +1,122 @@
+"""Pure hex-grid geometry on axial/cube coordinates.
+
+Shape queries (disk, ring, spiral) are answered from offset tables that are
+computed once per radius and shared. `HexOffsets` also caches the flattened
+form of its offsets for a given array width, so that the array storage
+backend can test a whole disk with plain index arithmetic.
+
+Coordinates are plain `(q, r, s)` triples here; `world.hexmap` wraps them
+in `CubeCoord`.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Iterator, Sequence
+
+AXIAL_DIRECTIONS: tuple[tuple[int, int], ...] = ((1, -1), (1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1))
+
+
+class HexOffsets:
+    """An immutable table of axial `(dq, dr)` offsets around an origin.
+
+    `extent` is the largest |dq| or |dr| in the table; a center at least that
+    far from the edges of an array can be tested without bounds checks.
+    """
+
+    __slots__ = ("axial", "extent", "_flat")
+
+    def __init__(self, axial: Sequence[tuple[int, int]]) -> None:
+        self.axial: tuple[tuple[int, int], ...] = tuple(axial)
+        self.extent = max((max(abs(dq), abs(dr)) for dq, dr in self.axial), default=0)
+        self._flat: dict[int, tuple[int, ...]] = {}
+
+    def flat(self, width: int) -> tuple[int, ...]:
+        """Return the offsets as row-major index deltas for an array `width` wide."""
+        flat = self._flat.get(width)
+        if flat is None:
+            flat = self._flat[width] = tuple(dr * width + dq for dq, dr in self.axial)
+        return flat
+
+    def __len__(self) -> int:
+        return len(self.axial)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(self.axial)
+
+
+def _check_radius(radius: int) -> None:
+    if radius < 0:
+        raise ValueError("radius must be >= 0")
+
+
+@lru_cache(maxsize=64)
+def ring_offsets(radius: int) -> HexOffsets:
+    """Offsets of the hexes exactly `radius` steps away, walking the ring."""
+    _check_radius(radius)
+    if radius == 0:
+        return HexOffsets(((0, 0),))
+    dq, dr = AXIAL_DIRECTIONS[4]
+    q, r = dq * radius, dr * radius
+    ring = []
+    for step_q, step_r in AXIAL_DIRECTIONS:
+        for _ in range(radius):
+            ring.append((q, r))
+            q += step_q
+            r += step_r
+    return HexOffsets(ring)
+
+
+@lru_cache(maxsize=64)
+def spiral_offsets(radius: int) -> HexOffsets:
+    """Offsets within `radius`, ordered center first then ring by ring."""
+    _check_radius(radius)
+    spiral = []
+    for k in range(radius + 1):
+        spiral.extend(ring_offsets(k).axial)
+    return HexOffsets(spiral)
+
+
+@lru_cache(maxsize=64)
+def disk_offsets(radius: int) -> HexOffsets:
+    """Offsets within `radius`, in row-major (r, then q) order."""
+    _check_radius(radius)
+    disk = []
+    for dr in range(-radius, radius + 1):
+        for dq in range(max(-radius, -dr - radius), min(radius, -dr + radius) + 1):
+            disk.append((dq, dr))
+    return HexOffsets(disk)
+
+
+def hex_distance(a: Sequence[int], b: Sequence[int]) -> int:
+    """Number of steps between two cube coordinates."""
+    dq = a[0] - b[0]
+    dr = a[1] - b[1]
+    return max(abs(dq), abs(dr), abs(dq + dr))
+
+
+def cube_round(q: float, r: float) -> tuple[int, int, int]:
+    """Round fractional cube coordinates to the containing hex."""
+    s = -q - r
+    rq, rr, rs = round(q), round(r), round(s)
+    dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+    if dq > dr and dq > ds:
+        rq = -rr - rs
+    elif dr > ds:
+        rr = -rq - rs
+    return rq, rr, -rq - rr
+
+
+def line(a: Sequence[int], b: Sequence[int]) -> list[tuple[int, int, int]]:
+    """Return the hexes on the straight line from `a` to `b`, both included.
+
+    Points are nudged by a small epsilon so that lines running exactly along
+    a hex edge resolve consistently to one side.
+    """
+    n = hex_distance(a, b)
+    if n == 0:
+        return [(a[0], a[1], -a[0] - a[1])]
+    aq, ar = a[0] + 1e-6, a[1] + 1e-6
+    bq, br = b[0] + 1e-6, b[1] + 1e-6
+    step = 1.0 / n
+    return [cube_round(aq + (bq - aq) * i * step, ar + (br - ar) * i * step) for i in range(n + 1)]
@@ -0,0 +1,285 @@
+"""Streaming import of hex terrain from CSV files and palette images.
+
+Sources are read lazily as `(q, r, terrain)` rows:
+
+- CSV files hold one `q,r,terrain` row per hex; an optional header row,
+  blank lines and lines starting with `#` are skipped.
+- PNG images with a palette (or 8-bit grayscale) map each pixel to one hex,
+  row `y` being axial `r` and rows shifted like "odd-r" offset coordinates,
+  so the picture reads the same on the minimap. Palette entries pick the
+  terrain by index or by `"#rrggbb"` color; pixels with no terrain are
+  skipped.
+
+Rows are taken `batch_size` at a time into a `HexMap` and upserted with
+its bulk `save_all`, one transaction per batch; existing tiles not in the
+source are left alone. `import_in_background` reads and decodes each batch
+in a worker thread and stores it back on the reactor, so only one batch is
+in memory at a time and the server keeps running between batches. An
+import that fails part way keeps the batches already stored.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import struct
+import zlib
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+
+from world.hexmap import CubeCoord, HexMap
+
+# Rows per batch; storing one keeps the reactor busy for roughly 70ms.
+DEFAULT_BATCH_SIZE = 250
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CHUNK_HEADER = struct.Struct(">I4s")
+IHDR = struct.Struct(">IIBBBBB")
+# Most bytes inflated per read, so a tiny, highly compressed IDAT can't
+# balloon in memory.
+INFLATE_STEP = 64 * 1024
+TERRAIN_COLORS: dict[str, str] = {
+    "#0000ff": "ocean",
+    "#00ffff": "coast",
+    "#00ff00": "plain",
+    "#ffff00": "desert",
+    "#008000": "forest",
+    "#008080": "swamp",
+    "#808000": "hills",
+    "#808080": "mountain",
+    "#ffffff": "tundra",
+}
+
+Row = tuple[int, int, str]
+
+
+class MapImportError(ValueError):
+    """Raised for sources that can't be read as hex terrain."""
+
+
+# --- Sources ---
+def read_csv(path: str) -> Iterator[Row]:
+    """Yield `(q, r, terrain)` rows of a CSV file."""
+    with open(path, newline="") as handle:
+        for line, fields in enumerate(csv.reader(handle), start=1):
+            if not fields or not "".join(fields).strip() or fields[0].lstrip().startswith("#"):
+                continue
+            try:
+                q, r, terrain = (field.strip() for field in fields)
+                row = (int(q), int(r), terrain)
+            except ValueError:
+                if line == 1:
+                    continue  # header
+                raise MapImportError(f"{path}:{line}: expected q,r,terrain") from None
+            if not terrain:
+                raise MapImportError(f"{path}:{line}: missing terrain")
+            yield row
+
+
+def _png_chunks(handle, path: str) -> Iterator[tuple[bytes, bytes]]:
+    if handle.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        raise MapImportError(f"{path} is not a PNG image")
+    while True:
+        header = handle.read(CHUNK_HEADER.size)
+        if len(header) < CHUNK_HEADER.size:
+            raise MapImportError(f"{path} is truncated")
+        length, kind = CHUNK_HEADER.unpack(header)
+        data = handle.read(length)
+        if len(data) < length:
+            raise MapImportError(f"{path} is truncated")
+        handle.read(4)  # crc; zlib catches corrupt image data
+        yield kind, data
+        if kind == b"IEND":
+            return
+
+
+def _palette_lookup(palette: dict, colors: list[tuple[int, int, int]]) -> list[Optional[str]]:
+    """Terrain per palette index, from index or `"#rrggbb"` keys."""
+    lookup = []
+    for index, (red, green, blue) in enumerate(colors):
+        terrain = palette.get(index)
+        if terrain is None:
+            terrain = palette.get(f"#{red:02x}{green:02x}{blue:02x}")
+        lookup.append(terrain)
+    return lookup
+
+
+def _unfilter(kind: int, row: bytearray, prior: bytearray, step: int) -> None:
+    """Undo PNG scanline filter `kind` on `row` in place."""
+    if kind == 0:
+        return
+    if kind == 1:
+        for i in range(step, len(row)):
+            row[i] = (row[i] + row[i - step]) & 0xFF
+    elif kind == 2:
+        for i in range(len(row)):
+            row[i] = (row[i] + prior[i]) & 0xFF
+    elif kind == 3:
+        for i in range(len(row)):
+            left = row[i - step] if i >= step else 0
+            row[i] = (row[i] + ((left + prior[i]) >> 1)) & 0xFF
+    elif kind == 4:
+        for i in range(len(row)):
+            a = row[i - step] if i >= step else 0
+            b = prior[i]
+            c = prior[i - step] if i >= step else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            predictor = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+            row[i] = (row[i] + predictor) & 0xFF
+    else:
+        raise MapImportError(f"unknown PNG filter {kind}")
+
+
+def _unpack(row: bytearray, depth: int, width: int) -> bytes | list[int]:
+    if depth == 8:
+        return row
+    per_byte = 8 // depth
+    mask = (1 << depth) - 1
+    shifts = [8 - depth * (n + 1) for n in range(per_byte)]
+    return [(byte >> shift) & mask for byte in row for shift in shifts][:width]
+
+
+def read_png(path: str, palette: Optional[dict] = None, origin: tuple[int, int] = (0, 0)) -> Iterator[Row]:
+    """Yield `(q, r, terrain)` rows of a palette or grayscale PNG, one scanline at a time.
+
+    `palette` maps palette indexes (gray levels for grayscale images) or
+    `"#rrggbb"` colors to terrains; `TERRAIN_COLORS` if omitted. Pixel
+    (0, 0) is hex `origin`.
+    """
+    palette = TERRAIN_COLORS if palette is None else palette
+    with open(path, "rb") as handle:
+        chunks = _png_chunks(handle, path)
+        kind, data = next(chunks)
+        if kind != b"IHDR":
+            raise MapImportError(f"{path} has no IHDR chunk")
+        width, height, depth, color_type, _compression, _filter, interlace = IHDR.unpack(data)
+        if color_type not in (0, 3) or depth > 8:
+            raise MapImportError(f"{path} is not a palette or 8-bit grayscale image")
+        if interlace:
+            raise MapImportError(f"{path} is interlaced")
+        if color_type == 0:
+            lookup = _palette_lookup(palette, [(level,) * 3 for level in range(1 << depth)])
+        else:
+            lookup = None
+        stride = (width * depth + 7) // 8
+        inflate = zlib.decompressobj()
+        pending = bytearray()
+        prior = bytearray(stride)
+        y = 0
+        q0, r0 = origin
+        for kind, data in chunks:
+            if kind == b"PLTE":
+                lookup = _palette_lookup(palette, [tuple(data[i:i + 3]) for i in range(0, len(data) - 2, 3)])
+            elif kind == b"IDAT":
+                if lookup is None:
+                    raise MapImportError(f"{path} has no palette")
+                while data and y < height:
+                    try:
+                        pending += inflate.decompress(data, INFLATE_STEP)
+                    except zlib.error as err:
+                        raise MapImportError(f"{path}: corrupt image data ({err})") from None
+                    data = inflate.unconsumed_tail
+                    while len(pending) > stride and y < height:
+                        row = pending[1:stride + 1]
+                        _unfilter(pending[0], row, prior, 1)
+                        del pending[:stride + 1]
+                        q_start = q0 - (y - (y & 1)) // 2
+                        for x, index in enumerate(_unpack(row, depth, width)):
+                            terrain = lookup[index] if index < len(lookup) else None
+                            if terrain is not None:
+                                yield q_start + x, r0 + y, terrain
+                        prior = row
+                        y += 1
+        if y < height:
+            raise MapImportError(f"{path} is truncated")
+
+
+def open_source(path: str, palette: Optional[dict] = None) -> Iterator[Row]:
+    """Rows of a `.csv` or `.png` source, picked by file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv(path)
+    if extension == ".png":
+        return read_png(path, palette)
+    raise MapImportError(f"can't import {extension or 'extensionless'} files; use .csv or .png")
+
+
+def parse_palette(text: str) -> dict:
+    """Parse `"0:ocean, #00ff00:plain"` into a palette dict."""
+    palette = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        key, sep, terrain = entry.partition(":")
+        key, terrain = key.strip().lower(), terrain.strip()
+        if not sep or not key or not terrain:
+            raise MapImportError(f"bad palette entry {entry.strip()!r}; use <index or #rrggbb>:<terrain>")
+        palette[key if key.startswith("#") else int(key)] = terrain
+    return palette
+
+
+# --- Import ---
+def next_batch(rows: Iterator[Row], batch_size: int = DEFAULT_BATCH_SIZE) -> list[Row]:
+    """Take up to `batch_size` rows; empty once the source is exhausted."""
+    return list(islice(rows, batch_size))
+
+
+def store_batch(rows: Iterable[Row]) -> int:
+    """Upsert one batch of rows in a single transaction; return how many were read."""
+    hexmap = HexMap()
+    count = 0
+    for q, r, terrain in rows:
+        hexmap.add_tile(CubeCoord.from_axial(q, r), terrain)
+        count += 1
+    hexmap.save_all(overwrite=False)
+    return count
+
+
+def import_tiles(
+    rows: Iterable[Row],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Import rows batch by batch in the calling thread; return the row count."""
+    rows = iter(rows)
+    total = 0
+    while batch := next_batch(rows, batch_size):
+        total += store_batch(batch)
+        if progress is not None:
+            progress(total)
+    return total
+
+
+def import_in_background(
+    rows: Iterable[Row],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Deferred:
+    """Import rows, reading each batch in a worker thread; return a Deferred.
+
+    The Deferred fires with the row count, or errbacks with the first error
+    (a `MapImportError` for bad sources). `progress(total)` is called on the
+    reactor after each stored batch.
+    """
+    rows = iter(rows)
+    done = Deferred()
+    total = 0
+
+    def stored(batch):
+        nonlocal total
+        if not batch:
+            done.callback(total)
+            return
+        total += store_batch(batch)
+        if progress is not None:
+            progress(total)
+        step()
+
+    def step():
+        threads.deferToThread(next_batch, rows, batch_size).addCallback(stored).addErrback(done.errback)
+
+    step()
+    return done
@@ -0,0 +1,433 @@
+"""Append-only change journal for the hex world.
+
+A `JournaledHexMap` saves by appending its pending changes to a journal
+file and syncing it to disk, instead of writing `HexTile` rows: a save
+costs one write and one fsync however many tiles changed. The journal is
+compacted into the `HexTile` store later, in bounded batches between
+reactor ticks, with `compact_in_background` (or all at once with
+`compact`).
+
+Files, next to `path`:
+
+    <path>             the live journal, appended to by `save_all`
+    <path>.<n>         sealed segments waiting for compaction, oldest first
+
+Each file starts with a short header, then holds records:
+
+    length u32, crc32 u32, body (length bytes)
+    body     op u8, q i32, r i32, then per op:
+             SET     terrain as u16 length + UTF-8 (0xFFFF: no data)
+             REMOVE  nothing
+             VALUE   layer name as u16 length + UTF-8, value f64 (NaN: cleared)
+             EDGES   packed edge flags u32
+
+Compaction seals the live journal into a segment, writes each segment to
+the store and deletes it once written; that deletion is the checkpoint.
+`JournaledHexMap.open` recovers after a crash by loading the store and
+replaying every remaining segment and the live journal on top. A torn
+record at the end of a file (a crash mid-append) fails its length or CRC
+check and is dropped along with anything after it.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import struct
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from django.db import transaction
+from evennia.utils.utils import delay
+from twisted.internet.defer import Deferred
+
+from world.hexedges import EDGE_ATTRIBUTE
+from world.hexmap import STORE_LISTENERS, CubeCoord, HexMap
+from world.hexstore import write_changes
+
+MAGIC = b"HEXJRNL\0"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sH")
+RECORD_HEADER = struct.Struct("<II")
+BODY = struct.Struct("<Bii")
+NAME_LENGTH = struct.Struct("<H")
+NO_DATA = 0xFFFF
+
+SET, REMOVE, VALUE, EDGES = 1, 2, 3, 4
+
+COMPACT_BATCH = 2000
+DEFAULT_COMPACT_BYTES = 64 * 1024 * 1024
+
+Change = tuple  # (op, q, r, name, value)
+
+
+class JournalError(ValueError):
+    """Raised for files that are not hex journals."""
+
+
+def _encode_name(name: Optional[str]) -> bytes:
+    if name is None:
+        return NAME_LENGTH.pack(NO_DATA)
+    encoded = name.encode("utf-8")
+    return NAME_LENGTH.pack(len(encoded)) + encoded
+
+
+def encode_record(op: int, q: int, r: int, name: Optional[str] = None, value=None) -> bytes:
+    """Encode one change as a framed journal record."""
+    body = BODY.pack(op, q, r)
+    if op == SET:
+        body += _encode_name(name)
+    elif op == VALUE:
+        body += _encode_name(name) + struct.pack("<d", math.nan if value is None else value)
+    elif op == EDGES:
+        body += struct.pack("<I", value)
+    elif op != REMOVE:
+        raise ValueError(f"unknown journal op {op}")
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def _decode_body(body: bytes) -> Change:
+    op, q, r = BODY.unpack_from(body)
+    offset = BODY.size
+    name = value = None
+    if op in (SET, VALUE):
+        (length,) = NAME_LENGTH.unpack_from(body, offset)
+        offset += NAME_LENGTH.size
+        if length != NO_DATA:
+            name = body[offset:offset + length].decode("utf-8")
+            offset += length
+    if op == VALUE:
+        (value,) = struct.unpack_from("<d", body, offset)
+        value = None if math.isnan(value) else value
+    elif op == EDGES:
+        (value,) = struct.unpack_from("<I", body, offset)
+    return op, q, r, name, value
+
+
+def read_records(path: str) -> tuple[list[Change], int]:
+    """Return the intact records of a journal file and the byte length they span."""
+    with open(path, "rb") as handle:
+        data = handle.read()
+    if len(data) < FILE_HEADER.size:
+        return [], 0
+    magic, version = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise JournalError(f"{path} is not a hex journal")
+    if version != VERSION:
+        raise JournalError(f"{path}: unsupported journal version {version}")
+    records = []
+    offset = FILE_HEADER.size
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        body = data[start:start + length]
+        if len(body) < length or zlib.crc32(body) != crc:
+            break
+        try:
+            records.append(_decode_body(body))
+        except (struct.error, UnicodeDecodeError):
+            break
+        offset = start + length
+    return records, offset
+
+
+class HexJournal:
+    """The live journal file and its sealed segments.
+
+    Args:
+        path: Path of the live journal.
+        fsync: Sync every append to disk (turn off only for throwaway data).
+    """
+
+    def __init__(self, path: str, fsync: bool = True) -> None:
+        self.path = path
+        self.fsync = fsync
+        self._handle = None
+        self._open()
+
+    def _open(self) -> None:
+        created = False
+        if os.path.exists(self.path):
+            # Drop a torn tail so new records follow the last intact one.
+            _records, end = read_records(self.path)
+            handle = open(self.path, "r+b")
+            if end < FILE_HEADER.size:
+                handle.truncate(0)
+                handle.write(FILE_HEADER.pack(MAGIC, VERSION))
+            else:
+                handle.truncate(end)
+            handle.seek(0, os.SEEK_END)
+        else:
+            handle = open(self.path, "wb")
+            handle.write(FILE_HEADER.pack(MAGIC, VERSION))
+            created = True
+        handle.flush()
+        if created and self.fsync:
+            os.fsync(handle.fileno())
+            # The new file's directory entry has to reach the disk as well.
+            self._sync_directory()
+        self._handle = handle
+
+    def _sync_directory(self) -> None:
+        """fsync the journal's directory, where creates and renames are recorded."""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    @property
+    def size(self) -> int:
+        """Bytes in the live journal."""
+        return self._handle.tell()
+
+    def append(self, changes: Iterable[Change]) -> int:
+        """Append `(op, q, r, name, value)` changes durably; return how many."""
+        records = [encode_record(*change) for change in changes]
+        if not records:
+            return 0
+        self._handle.write(b"".join(records))
+        self._handle.flush()
+        if self.fsync:
+            os.fsync(self._handle.fileno())
+        return len(records)
+
+    def segments(self) -> list[str]:
+        """Paths of the sealed segments, oldest first."""
+        directory, base = os.path.split(os.path.abspath(self.path))
+        numbered = []
+        for name in os.listdir(directory):
+            suffix = name[len(base) + 1:]
+            if name.startswith(base + ".") and suffix.isdigit():
+                numbered.append((int(suffix), os.path.join(directory, name)))
+        return [path for _number, path in sorted(numbered)]
+
+    def seal(self) -> Optional[str]:
+        """Turn the live journal into a new segment; return its path (None if empty)."""
+        if self.size <= FILE_HEADER.size:
+            return None
+        segments = self.segments()
+        number = int(segments[-1].rsplit(".", 1)[1]) + 1 if segments else 1
+        segment = f"{self.path}.{number}"
+        self.close()
+        os.replace(self.path, segment)
+        if self.fsync:
+            self._sync_directory()
+        self._open()
+        return segment
+
+    def replay(self) -> Iterator[Change]:
+        """Every change not yet compacted, oldest first."""
+        for path in [*self.segments(), self.path]:
+            yield from read_records(path)[0]
+
+
+def coalesce(changes: Iterable[Change]) -> tuple[dict, set, dict]:
+    """Reduce changes to their final effect: `(tiles, removed, values)` for `write_changes`."""
+    tiles: dict = {}
+    removed: set = set()
+    values: dict = {}
+    for op, q, r, name, value in changes:
+        coords = (q, r, -q - r)
+        if op == SET:
+            tiles[coords] = name
+            removed.discard(coords)
+        elif op == REMOVE:
+            tiles.pop(coords, None)
+            removed.add(coords)
+            for by_coords in values.values():
+                by_coords.pop(coords, None)
+        elif op == VALUE:
+            values.setdefault(name, {})[coords] = value
+        elif op == EDGES:
+            values.setdefault(EDGE_ATTRIBUTE, {})[coords] = value
+    return tiles, removed, values
+
+
+def _batches(tiles: dict, removed: set, values: dict, size: int) -> Iterator[tuple[dict, list, dict]]:
+    """Split coalesced changes into batches touching at most `size` tiles each."""
+    items = list(tiles.items())
+    for start in range(0, len(items), size):
+        yield dict(items[start:start + size]), [], {}
+    value_items = [(name, coords, value) for name, by_coords in values.items() for coords, value in by_coords.items()]
+    for start in range(0, len(value_items), size):
+        batch: dict = {}
+        for name, coords, value in value_items[start:start + size]:
+            batch.setdefault(name, {})[coords] = value
+        yield {}, [], batch
+    removed = list(removed)
+    for start in range(0, len(removed), size):
+        yield {}, removed[start:start + size], {}
+
+
+class JournaledHexMap(HexMap):
+    """A HexMap whose saves are journal appends, compacted into the store later.
+
+    Create it with `JournaledHexMap.open(path)`, which loads the store and
+    replays the journal, or pass a `HexJournal` to the constructor.
+    """
+
+    compact_bytes = DEFAULT_COMPACT_BYTES
+
+    def __init__(self, storage=None, journal: Optional[HexJournal] = None) -> None:
+        super().__init__(storage)
+        self.journal = journal
+        self._compacting: Optional[Deferred] = None
+        self._compaction: Optional[Iterator[int]] = None
+        self._compacted = 0
+
+    def _require_journal(self) -> HexJournal:
+        if self.journal is None:
+            raise RuntimeError("JournaledHexMap has no journal; create it with JournaledHexMap.open(path)")
+        return self.journal
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        storage=None,
+        layers: Iterable[str] = (),
+        edges: bool = False,
+        fsync: bool = True,
+    ) -> "JournaledHexMap":
+        """Load the store, then replay every uncompacted change in the journal at `path`."""
+        hm = cls.load_all(storage, layers=layers, edges=edges)
+        hm.journal = HexJournal(path, fsync=fsync)
+        for change in hm.journal.replay():
+            hm._apply(*change)
+        return hm
+
+    def _apply(self, op: int, q: int, r: int, name, value) -> None:
+        """Apply a journaled change without marking it dirty."""
+        coord = CubeCoord.from_axial(q, r)
+        if op == SET:
+            self.refresh_tile(coord, name)
+        elif op == REMOVE:
+            for layer in self._layers.values():
+                layer.set(q, r, None)
+            self._edges.set_packed(q, r, 0)
+            self.refresh_tile(coord, removed=True)
+        elif op == VALUE:
+            layer = self._layers.get(name)
+            if layer is None:
+                layer = self._layers[name] = self._new_layer(name)
+            layer.set(q, r, value)
+            self.revision += 1
+        elif op == EDGES:
+            self._edges.set_packed(q, r, value)
+            self.revision += 1
+
+    def _changes(self, overwrite: bool) -> list[Change]:
+        changes = [(SET, c.q, c.r, self._tiles.get(c.q, c.r), None) for c in self._dirty]
+        if overwrite:
+            changes.extend((REMOVE, c.q, c.r, None, None) for c in self._removed)
+        for name, coords in self._dirty_values.items():
+            if name == EDGE_ATTRIBUTE:
+                changes.extend((EDGES, c.q, c.r, None, self._edges.packed(c.q, c.r)) for c in coords)
+            else:
+                get = self._layers[name].get
+                changes.extend((VALUE, c.q, c.r, name, get(c.q, c.r)) for c in coords)
+        return changes
+
+    def save_all(self, overwrite: bool = True) -> None:
+        """Append pending changes to the journal and sync it; the store is written on compaction.
+
+        As for `HexMap.save_all`, removed tiles are only recorded with `overwrite`.
+        """
+        journal = self._require_journal()
+        changes = self._changes(overwrite)
+        journal.append(changes)
+        tiles, removed, _values = coalesce(changes)
+        for listener in STORE_LISTENERS:
+            listener(self, tiles, list(removed))
+        self._dirty.clear()
+        self._removed.clear()
+        self._dirty_values.clear()
+        if self.compact_bytes and journal.size >= self.compact_bytes and self._compacting is None:
+            self.compact_in_background()
+
+    def compact(self) -> int:
+        """Write every uncompacted change to the store now; return how many tiles it touched.
+
+        A background compaction in progress is finished first, so older
+        segments still reach the store before newer ones, and its Deferred
+        fires.
+        """
+        journal = self._require_journal()
+        touched = 0
+        if self._compacting is not None:
+            before = self._compacted
+            while self._compaction_step():
+                pass
+            touched = self._compacted - before
+        journal.seal()
+        for segment in journal.segments():
+            touched += self._compact_segment(segment)
+        return touched
+
+    @transaction.atomic
+    def _compact_segment(self, segment: str) -> int:
+        tiles, removed, values = coalesce(read_records(segment)[0])
+        write_changes(tiles, removed, values)
+        os.remove(segment)
+        return len(tiles) + len(removed) + sum(len(by_coords) for by_coords in values.values())
+
+    def compact_in_background(self, batch_size: int = COMPACT_BATCH) -> Deferred:
+        """Compact the journal `batch_size` tiles per reactor tick.
+
+        Returns a Deferred firing with the number of tiles written. Only one
+        compaction runs at a time; a call while one is running returns its
+        Deferred.
+        """
+        if self._compacting is not None:
+            return self._compacting
+        journal = self._require_journal()
+        journal.seal()
+        done = self._compacting = Deferred()
+        self._compaction = self._compact_steps(journal.segments(), batch_size)
+        self._compacted = 0
+
+        def step():
+            # A synchronous compact() may have finished this run already.
+            if self._compacting is done and self._compaction_step():
+                delay(0, step)
+
+        delay(0, step)
+        return done
+
+    @staticmethod
+    def _compact_steps(segments: list[str], batch_size: int) -> Iterator[int]:
+        """Write `segments` to the store a batch per step, yielding the tiles each step touched."""
+        for segment in segments:
+            for batch in _batches(*coalesce(read_records(segment)[0]), batch_size):
+                with transaction.atomic():
+                    write_changes(*batch)
+                yield len(batch[0]) + len(batch[1]) + sum(len(v) for v in batch[2].values())
+            os.remove(segment)
+            yield 0
+
+    def _compaction_step(self) -> bool:
+        """Run one step of the background compaction; return False once it has ended.
+
+        Fires the compaction's Deferred when it finishes or fails.
+        """
+        done = self._compacting
+        try:
+            count = next(self._compaction, None)
+        except Exception as err:
+            self._compacting = self._compaction = None
+            done.errback(err)
+            return False
+        if count is None:
+            self._compacting = self._compaction = None
+            done.callback(self._compacted)
+            return False
+        self._compacted += count
+        return True
@@ -4,24 +4,54 @@ This module provides helpers around cube coordinates and persists hex tiles
 as Evennia objects via the `typeclasses.hextile.HexTile` typeclass.
 """
 
-from dataclasses import dataclass
-from typing import Dict, Optional, Iterable
+from typing import Iterable, Iterator, NamedTuple, Optional
 
 from django.db import transaction
-from typeclasses.hextile import HexTile
+from world.hexedges import EDGE_ATTRIBUTE, HexEdges, direction_between
+from world.hexgrid import AXIAL_DIRECTIONS, disk_offsets, hex_distance, line, ring_offsets, spiral_offsets
+from world.hexstorage import (
+    ArrayTileStorage,
+    DenseAxialGrid,
+    DictTileStorage,
+    FloatLayer,
+    SparseFloatLayer,
+    TerrainTable,
+)
+from world.hexstore import delete_tiles, iter_tile_coords, load_attribute, load_tiles, write_changes
 
+# Standard numeric layers; any other name works too.
+LAYERS = ("elevation", "moisture", "temperature", "fertility")
 
-@dataclass(frozen=True)
-class CubeCoord:
-    """Cube coordinate in a hex grid."""
+# Called as `listener(hexmap, {(q, r, s): data}, removed_coords)` after a
+# map (or, with hexmap None, another bulk writer) writes tiles to the
+# store, so other live maps can follow.
+STORE_LISTENERS: list = []
 
+
+class _Cube(NamedTuple):
     q: int
     r: int
     s: int
 
-    def __post_init__(self):
-        if (self.q + self.r + self.s) != 0:
+
+class CubeCoord(_Cube):
+    """Cube coordinate in a hex grid.
+
+    A plain tuple underneath: no per-instance dict, hashes and compares like
+    `(q, r, s)`. `from_axial` skips validation for coordinates that are
+    valid by construction.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, q: int, r: int, s: int):
+        if (q + r + s) != 0:
             raise ValueError("q + r + s must equal 0")
+        return tuple.__new__(cls, (q, r, s))
+
+    @classmethod
+    def from_axial(cls, q: int, r: int) -> "CubeCoord":
+        return tuple.__new__(cls, (q, r, -q - r))
 
 
 class HexMap:
@@ -29,63 +59,353 @@ class HexMap:
 
     The optional `data` stored per tile is the terrain string when using
     DB persistence via `load_all`/`save_all`.
+
+    Tiles live in a storage backend from `world.hexstorage`: a dict by
+    default, or pass `ArrayTileStorage()` (see `HexMap.compact`) for large
+    maps whose data are terrain strings.
+
+    Numeric layers (see `LAYERS`) hold one optional float per tile, in a
+    dense `FloatLayer` on an array-backed map and a `SparseFloatLayer`
+    otherwise, persisted as uncategorized Attributes of the same name on
+    the tile. Roads, rivers and other edge features live in `edges` (see
+    `world.hexedges`), persisted as one packed int per tile.
+
+    `revision` increases whenever a tile or layer value is added, changed
+    or removed, so caches derived from the map can tell when they are stale.
+    Caches that need to know *where* tiles changed can `subscribe` a
+    callback, called with `(q, r)` whenever a tile's data change.
     """
 
-    def __init__(self) -> None:
-        self._tiles: Dict[CubeCoord, Optional[str]] = {}
+    def __init__(self, storage=None) -> None:
+        self._tiles = storage if storage is not None else DictTileStorage()
+        self._dirty: set[CubeCoord] = set()
+        self._removed: set[CubeCoord] = set()
+        self._synced = False
+        self._layers: dict[str, FloatLayer | SparseFloatLayer] = {}
+        self._dirty_values: dict[str, set[CubeCoord]] = {}
+        self._edges = HexEdges()
+        self._listeners: list = []
+        self.revision = 0
+
+    @classmethod
+    def compact(cls, terrains: tuple[str, ...] = ()) -> "HexMap":
+        """Return an empty map backed by `ArrayTileStorage`."""
+        return cls(ArrayTileStorage(TerrainTable(terrains)))
+
+    @property
+    def storage(self):
+        """The tile storage backend, for hot loops working on axial (q, r)."""
+        return self._tiles
+
+    def subscribe(self, callback) -> None:
+        """Call `callback(q, r)` whenever the data of tile (q, r) change."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, q: int, r: int) -> None:
+        for callback in self._listeners:
+            callback(q, r)
 
     def add_tile(self, coord: CubeCoord, data: Optional[str] = None) -> None:
-        self._tiles[coord] = data
+        if not self._tiles.set(coord.q, coord.r, data):
+            return
+        self.revision += 1
+        self._dirty.add(coord)
+        self._removed.discard(coord)
+        if self._listeners:
+            self._notify(coord.q, coord.r)
+
+    def refresh_tile(self, coord: CubeCoord, data: Optional[str] = None, removed: bool = False) -> None:
+        """Apply a tile change already stored in the DB, without marking it dirty."""
+        if removed:
+            if not self._tiles.has(coord[0], coord[1]):
+                return
+            self._tiles.remove(coord[0], coord[1])
+        elif not self._tiles.set(coord[0], coord[1], data):
+            return
+        self.revision += 1
+        if self._listeners:
+            self._notify(coord[0], coord[1])
+
+    def remove_tile(self, coord: CubeCoord) -> None:
+        if not self._tiles.has(coord.q, coord.r):
+            return
+        self._tiles.remove(coord.q, coord.r)
+        for name, layer in self._layers.items():
+            layer.set(coord.q, coord.r, None)
+            self._dirty_values.get(name, set()).discard(coord)
+        for direction in range(6):
+            self._set_edge(coord, direction, 0)
+        self._dirty_values.get(EDGE_ATTRIBUTE, set()).discard(coord)
+        self.revision += 1
+        self._dirty.discard(coord)
+        self._removed.add(coord)
+        if self._listeners:
+            self._notify(coord.q, coord.r)
 
     def get_tile(self, coord: CubeCoord) -> Optional[str]:
-        return self._tiles.get(coord)
+        return self._tiles.get(coord.q, coord.r)
+
+    def has_tile(self, coord: CubeCoord) -> bool:
+        return self._tiles.has(coord.q, coord.r)
+
+    # --- Numeric layers ---
+    @property
+    def layer_names(self) -> list[str]:
+        return list(self._layers)
+
+    def layer(self, name: str) -> Optional[FloatLayer | SparseFloatLayer]:
+        """The layer for `name`, for hot loops; None if never set."""
+        return self._layers.get(name)
+
+    def _new_layer(self, name: str) -> FloatLayer | SparseFloatLayer:
+        """An empty layer laid out like the tile storage (dense or sparse)."""
+        if isinstance(self._tiles, DenseAxialGrid):
+            return FloatLayer(name)
+        return SparseFloatLayer(name)
+
+    def set_value(self, coord: CubeCoord, layer: str, value: Optional[float]) -> None:
+        """Set layer `layer` of an existing tile; None clears it."""
+        if not self._tiles.has(coord[0], coord[1]):
+            raise KeyError(f"no tile at {tuple(coord)}")
+        grid = self._layers.get(layer)
+        if grid is None:
+            if value is None:
+                return
+            grid = self._layers[layer] = self._new_layer(layer)
+        if grid.set(coord[0], coord[1], value):
+            self.revision += 1
+            self._dirty_values.setdefault(layer, set()).add(coord)
+
+    def get_value(self, coord: CubeCoord, layer: str) -> Optional[float]:
+        grid = self._layers.get(layer)
+        return None if grid is None else grid.get(coord[0], coord[1])
+
+    def values(self, layer: str, coords: Iterable[CubeCoord]) -> list[Optional[float]]:
+        """Values of `layer` for many coords, in order."""
+        grid = self._layers.get(layer)
+        if grid is None:
+            return [None for _coord in coords]
+        get = grid.get
+        return [get(coord[0], coord[1]) for coord in coords]
+
+    def values_in_box(
+        self, layer: str, q_min: int, r_min: int, q_max: int, r_max: int
+    ) -> Iterator[tuple[CubeCoord, float]]:
+        """Yield `(coord, value)` for set values of `layer` inside the inclusive axial box."""
+        grid = self._layers.get(layer)
+        if grid is None:
+            return
+        for q, r, value in grid.items_in_box(q_min, r_min, q_max, r_max):
+            yield CubeCoord.from_axial(q, r), value
+
+    # --- Edge features ---
+    @property
+    def edges(self) -> HexEdges:
+        """The edge feature store, for hot loops working on axial (q, r, direction)."""
+        return self._edges
+
+    def edge_flags(self, a: CubeCoord, b: CubeCoord) -> int:
+        """Feature flags on the edge between adjacent hexes `a` and `b`."""
+        return self._edges.get(a[0], a[1], direction_between(a, b))
+
+    def set_edge(self, a: CubeCoord, b: CubeCoord, flags: int) -> None:
+        """Set the feature flags on the edge between two adjacent tiles."""
+        direction = direction_between(a, b)
+        for coord in (a, b):
+            if not self._tiles.has(coord[0], coord[1]):
+                raise KeyError(f"no tile at {tuple(coord)}")
+        self._set_edge(a, direction, flags)
+
+    def add_edge_feature(self, a: CubeCoord, b: CubeCoord, flags: int) -> None:
+        self.set_edge(a, b, self.edge_flags(a, b) | flags)
+
+    def remove_edge_feature(self, a: CubeCoord, b: CubeCoord, flags: int) -> None:
+        self.set_edge(a, b, self.edge_flags(a, b) & ~flags)
+
+    def _set_edge(self, coord: CubeCoord, direction: int, flags: int) -> None:
+        if not self._edges.set(coord[0], coord[1], direction, flags):
+            return
+        self.revision += 1
+        if direction >= 3:
+            dq, dr = AXIAL_DIRECTIONS[direction]
+            coord = CubeCoord.from_axial(coord[0] + dq, coord[1] + dr)
+        self._dirty_values.setdefault(EDGE_ATTRIBUTE, set()).add(coord)
+
+    def edges_in_box(
+        self, q_min: int, r_min: int, q_max: int, r_max: int
+    ) -> Iterator[tuple[CubeCoord, CubeCoord, int]]:
+        """Yield `(a, b, flags)` for featured edges touching a hex in the inclusive axial box."""
+        for q, r, direction, flags in self._edges.items_in_box(q_min, r_min, q_max, r_max):
+            dq, dr = AXIAL_DIRECTIONS[direction]
+            yield CubeCoord.from_axial(q, r), CubeCoord.from_axial(q + dq, r + dr), flags
+
+    def tiles(self) -> Iterator[tuple[CubeCoord, Optional[str]]]:
+        """Yield `(coord, data)` for every tile."""
+        for q, r, data in self._tiles.items():
+            yield CubeCoord.from_axial(q, r), data
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def __contains__(self, coord) -> bool:
+        return self._tiles.has(coord[0], coord[1])
 
     def neighbors(self, coord: CubeCoord):
         """Yield neighbor coordinates around `coord`."""
-        directions = [
-            CubeCoord(1, -1, 0),
-            CubeCoord(1, 0, -1),
-            CubeCoord(0, 1, -1),
-            CubeCoord(-1, 1, 0),
-            CubeCoord(-1, 0, 1),
-            CubeCoord(0, -1, 1),
-        ]
-        for d in directions:
-            yield CubeCoord(coord.q + d.q, coord.r + d.r, coord.s + d.s)
+        q, r = coord.q, coord.r
+        for dq, dr in AXIAL_DIRECTIONS:
+            yield CubeCoord.from_axial(q + dq, r + dr)
+
+    # --- Spatial queries ---
+    # Shape queries return only coordinates that hold a tile on this map.
+    @staticmethod
+    def distance(a: CubeCoord, b: CubeCoord) -> int:
+        """Number of hex steps between `a` and `b`."""
+        return hex_distance(a, b)
+
+    @staticmethod
+    def line_between(a: CubeCoord, b: CubeCoord) -> list[CubeCoord]:
+        """Every hex on the straight line from `a` to `b`, whether on the map or not."""
+        return [CubeCoord.from_axial(q, r) for q, r, _s in line(a, b)]
+
+    def within_radius(self, center: CubeCoord, radius: int) -> list[CubeCoord]:
+        """Tiles at most `radius` steps from `center`, center included, in row order."""
+        return [CubeCoord.from_axial(q, r) for q, r in self._tiles.select(center[0], center[1], disk_offsets(radius))]
+
+    def ring(self, center: CubeCoord, radius: int) -> list[CubeCoord]:
+        """Tiles exactly `radius` steps from `center`, walking around the ring."""
+        return [CubeCoord.from_axial(q, r) for q, r in self._tiles.select(center[0], center[1], ring_offsets(radius))]
+
+    def spiral(self, center: CubeCoord, radius: int) -> list[CubeCoord]:
+        """Tiles within `radius` of `center`, ordered outward ring by ring."""
+        return [CubeCoord.from_axial(q, r) for q, r in self._tiles.select(center[0], center[1], spiral_offsets(radius))]
+
+    def in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[CubeCoord, Optional[str]]]:
+        """Yield `(coord, data)` for tiles inside the inclusive axial bounding box."""
+        for q, r, data in self._tiles.items_in_box(q_min, r_min, q_max, r_max):
+            yield CubeCoord.from_axial(q, r), data
+
+    def within_radius_many(self, centers: Iterable[CubeCoord], radius: int) -> dict[CubeCoord, list[CubeCoord]]:
+        """Batch `within_radius` for many centers sharing one offset table."""
+        offsets = disk_offsets(radius)
+        select = self._tiles.select
+        return {
+            center: [CubeCoord.from_axial(q, r) for q, r in select(center[0], center[1], offsets)]
+            for center in centers
+        }
+
+    def count_within_radius(self, centers: Iterable[CubeCoord], radius: int) -> dict[CubeCoord, int]:
+        """Number of tiles within `radius` of each center, without building CubeCoords."""
+        offsets = disk_offsets(radius)
+        count = self._tiles.count
+        return {center: count(center[0], center[1], offsets) for center in centers}
+
+    # --- Dirty tracking ---
+    @property
+    def is_dirty(self) -> bool:
+        """True if tiles or values were added, changed or removed since the last load/save."""
+        return bool(self._dirty or self._removed or any(self._dirty_values.values()))
+
+    def mark_clean(self) -> None:
+        """Treat the in-memory map as identical to what is stored."""
+        self._dirty.clear()
+        self._removed.clear()
+        self._dirty_values.clear()
+        self._synced = True
+
+    def mark_all_dirty(self) -> None:
+        """Treat every tile as changed, so the next `save_all` writes them all."""
+        self._dirty.update(coord for coord, _data in self.tiles())
+        for name, grid in self._layers.items():
+            self._dirty_values.setdefault(name, set()).update(
+                CubeCoord.from_axial(q, r) for q, r, _value in grid.items()
+            )
+        if len(self._edges):
+            self._dirty_values.setdefault(EDGE_ATTRIBUTE, set()).update(
+                CubeCoord.from_axial(q, r) for q, r in self._edges.owners()
+            )
+        self._synced = False
 
     # --- Persistence helpers ---
     @classmethod
-    def load_all(cls) -> "HexMap":
-        """Load entire map from Evennia objects into a HexMap instance."""
-        hm = cls()
-        # Use tag category 'hexcoord' to find all hex tiles
-        from evennia import search_tag
-
-        tiles = [obj for obj in search_tag(category="hexcoord") if obj.is_typeclass(HexTile, exact=False)]
-        for obj in tiles:
-            q, r, s = int(obj.db.q or 0), int(obj.db.r or 0), int(obj.db.s or 0)
-            hm.add_tile(CubeCoord(q, r, s), getattr(obj.db, "terrain", None))
+    def load_all(cls, storage=None, layers: Iterable[str] = (), edges: bool = False) -> "HexMap":
+        """Load entire map from Evennia objects into a HexMap instance.
+
+        Coordinates and terrain are read in bulk (see `world.hexstore`), so
+        this issues a fixed number of queries and creates no typeclass
+        instances. The loaded map starts clean. `storage` selects the
+        backend, as for the constructor; each name in `layers` adds one
+        query reading that numeric layer, and `edges` one more reading the
+        edge features.
+        """
+        hm = cls(storage)
+        layers = list(layers)
+        positions = {}
+        for tile_id, (q, r, _s), terrain in load_tiles():
+            hm._tiles.set(q, r, terrain)
+            if layers or edges:
+                positions[tile_id] = (q, r)
+        for name in layers:
+            grid = hm._layers[name] = hm._new_layer(name)
+            for tile_id, value in load_attribute(name).items():
+                position = positions.get(tile_id)
+                if position is not None and isinstance(value, (int, float)):
+                    grid.set(*position, value)
+        if edges:
+            for tile_id, value in load_attribute(EDGE_ATTRIBUTE).items():
+                position = positions.get(tile_id)
+                if position is not None and isinstance(value, int):
+                    hm._edges.set_packed(*position, value)
+        hm.mark_clean()
         return hm
 
     @transaction.atomic
     def save_all(self, overwrite: bool = True) -> None:
         """Persist the current map to Evennia objects (typeclass HexTile).
 
+        Only tiles added, changed or removed since the last load/save are
+        written, with batched inserts, updates and deletes. A tile whose data
+        is None keeps the terrain already stored for it.
+
         - If `overwrite` is True, hex objects not present in the in-memory map are deleted.
+          A map that was never loaded or saved scans the stored coordinates once to find them.
         - Otherwise, only upserts are performed.
         """
-        from evennia import search_tag
-
-        coords_seen: set[tuple[int, int, int]] = set()
-        for coord, terrain in self._tiles.items():
-            coords_seen.add((coord.q, coord.r, coord.s))
-            obj, _ = HexTile.get_or_create_by_coords(coord.q, coord.r, coord.s, terrain=terrain or "plain")
-            if terrain is not None:
-                obj.db.terrain = terrain
-        if overwrite:
-            # Delete hex objects not in map
-            tiles = [obj for obj in search_tag(category="hexcoord") if obj.is_typeclass(HexTile, exact=False)]
-            for obj in tiles:
-                tup = (int(obj.db.q or 0), int(obj.db.r or 0), int(obj.db.s or 0))
-                if tup not in coords_seen:
-                    obj.delete()
+        if overwrite and not self._synced:
+            stale = [
+                (coords, tile_id)
+                for tile_id, coords in iter_tile_coords()
+                if not self._tiles.has(coords[0], coords[1])
+            ]
+            self._write_tiles(self._dirty, (), self._dirty_values)
+            delete_tiles(stale)
+            for listener in STORE_LISTENERS:
+                listener(self, {}, [coords for coords, _tile_id in stale])
+        else:
+            self._write_tiles(self._dirty, self._removed if overwrite else (), self._dirty_values)
+        self.mark_clean()
+
+    def _value_changes(self, values: dict[str, Iterable[CubeCoord]]) -> dict[str, dict[tuple[int, int, int], object]]:
+        """`{name: {(q, r, s): value}}` for the given layer (or edge) coords."""
+        changes = {}
+        for name, coords in values.items():
+            get = self._edges.packed if name == EDGE_ATTRIBUTE else self._layers[name].get
+            changes[name] = {(c[0], c[1], c[2]): get(c[0], c[1]) for c in coords}
+        return changes
+
+    def _write_tiles(
+        self,
+        dirty: Iterable[CubeCoord],
+        removed: Iterable[CubeCoord],
+        values: Optional[dict[str, Iterable[CubeCoord]]] = None,
+    ) -> None:
+        """Upsert the `dirty` tiles and layer `values`, delete the `removed` tiles, in batches."""
+        dirty = {(c.q, c.r, c.s): self._tiles.get(c.q, c.r) for c in dirty}
+        removed = [(c.q, c.r, c.s) for c in removed]
+        write_changes(dirty, removed, self._value_changes(values or {}))
+        for listener in STORE_LISTENERS:
+            listener(self, dirty, removed)
@@ -0,0 +1,171 @@
+"""ASCII/ANSI minimap of the hexes around a point.
+
+Hexes are drawn two columns wide with each row shifted half a hex from the
+one above (column `2q + r`), which keeps neighbours adjacent on screen.
+
+Rendering is split in two cached levels, so players standing in the same
+area share almost all of the work:
+
+- a *fragment* per square chunk of `chunk_size` hexes holds one list of
+  glyph tokens per row, built from the map in one box query. It is dropped
+  only when a tile inside the chunk changes (the renderer subscribes to the
+  map), and
+- a finished *view* per `(center, radius)` remembers the chunk stamps it was
+  composed from and is reused for as long as none of them changed.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional
+
+from world.hexmap import HexMap
+
+CHUNK_SIZE = 16
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_VIEW_CACHE_SIZE = 4096
+UNKNOWN_GLYPH = ("", " ")
+MISSING_GLYPH = ("|x", "?")
+CENTER_GLYPH = ("|R", "@")
+GLYPHS: dict[str, tuple[str, str]] = {
+    "ocean": ("|b", "~"),
+    "coast": ("|c", "-"),
+    "plain": ("|g", "."),
+    "plains": ("|g", "."),
+    "desert": ("|y", ":"),
+    "forest": ("|G", "T"),
+    "swamp": ("|C", '"'),
+    "hills": ("|Y", "n"),
+    "mountain": ("|w", "^"),
+    "tundra": ("|W", "*"),
+}
+
+
+class MinimapRenderer:
+    """Renders and caches minimaps of one HexMap.
+
+    Args:
+        hexmap: The map to draw; the renderer subscribes to its changes.
+        chunk_size: Side, in hexes, of a cached fragment.
+        cache_size: Maximum number of cached fragments.
+        view_cache_size: Maximum number of cached views.
+        glyphs: Terrain -> `(ansi_color, char)` overrides.
+    """
+
+    def __init__(
+        self,
+        hexmap: HexMap,
+        chunk_size: int = CHUNK_SIZE,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        view_cache_size: int = DEFAULT_VIEW_CACHE_SIZE,
+        glyphs: Optional[dict[str, tuple[str, str]]] = None,
+    ) -> None:
+        self.hexmap = hexmap
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.view_cache_size = view_cache_size
+        self.glyphs = {**GLYPHS, **(glyphs or {})}
+        self._fragments: OrderedDict = OrderedDict()
+        self._views: OrderedDict = OrderedDict()
+        self._stamps: dict[tuple[int, int], int] = {}
+        self.fragment_builds = 0
+        self.view_builds = 0
+        hexmap.subscribe(self._tile_changed)
+
+    def close(self) -> None:
+        """Stop following the map's changes."""
+        self.hexmap.unsubscribe(self._tile_changed)
+
+    def clear_cache(self) -> None:
+        self._fragments.clear()
+        self._views.clear()
+        self._stamps.clear()
+
+    def _tile_changed(self, q: int, r: int) -> None:
+        key = (q // self.chunk_size, r // self.chunk_size)
+        self._fragments.pop(key, None)
+        self._stamps[key] = self._stamps.get(key, 0) + 1
+
+    # --- Fragments ---
+    def _fragment(self, cq: int, cr: int) -> list[list[tuple[str, str]]]:
+        """Glyph tokens of chunk (cq, cr), one list per row, indexed by q offset."""
+        key = (cq, cr)
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self._fragments.move_to_end(key)
+            return fragment
+        size = self.chunk_size
+        q0, r0 = cq * size, cr * size
+        fragment = [[UNKNOWN_GLYPH] * size for _ in range(size)]
+        glyphs = self.glyphs
+        for q, r, terrain in self.hexmap.storage.items_in_box(q0, r0, q0 + size - 1, r0 + size - 1):
+            fragment[r - r0][q - q0] = glyphs.get(terrain, MISSING_GLYPH)
+        self.fragment_builds += 1
+        self._fragments[key] = fragment
+        while len(self._fragments) > self.cache_size:
+            self._fragments.popitem(last=False)
+        return fragment
+
+    # --- Views ---
+    def render(self, center, radius: int) -> str:
+        """The hexes within `radius` of `center` as ANSI text, center marked `@`."""
+        cq, cr = center[0], center[1]
+        size = self.chunk_size
+        chunks = [
+            (q_chunk, r_chunk)
+            for r_chunk in range((cr - radius) // size, (cr + radius) // size + 1)
+            for q_chunk in range((cq - radius) // size, (cq + radius) // size + 1)
+        ]
+        stamps = tuple(self._stamps.get(chunk, 0) for chunk in chunks)
+        key = (cq, cr, radius)
+        cached = self._views.get(key)
+        if cached is not None and cached[0] == stamps:
+            self._views.move_to_end(key)
+            return cached[1]
+        view = self._compose(cq, cr, radius)
+        self.view_builds += 1
+        self._views[key] = (stamps, view)
+        while len(self._views) > self.view_cache_size:
+            self._views.popitem(last=False)
+        return view
+
+    def _compose(self, cq: int, cr: int, radius: int) -> str:
+        size = self.chunk_size
+        lines = []
+        for r in range(cr - radius, cr + radius + 1):
+            # Hexes of row r within `radius` of the center.
+            q_min = cq - radius + max(0, cr - r)
+            q_max = cq + radius - max(0, r - cr)
+            fragment_row = r // size
+            local_r = r - fragment_row * size
+            tokens = []
+            for q_chunk in range(q_min // size, q_max // size + 1):
+                row = self._fragment(q_chunk, fragment_row)[local_r]
+                start = max(q_min - q_chunk * size, 0)
+                end = min(q_max - q_chunk * size, size - 1)
+                tokens.extend(row[start:end + 1])
+            if r == cr:
+                tokens[cq - q_min] = CENTER_GLYPH
+            while tokens and tokens[-1] is UNKNOWN_GLYPH:
+                tokens.pop()
+            # Column 2q + r, shifted so the widest (center) row starts at 0.
+            indent = 2 * q_min + r - (2 * (cq - radius) + cr)
+            lines.append(" " * indent + _join(tokens) if tokens else "")
+        return "\n".join(lines)
+
+
+def _join(tokens: list[tuple[str, str]]) -> str:
+    """Join glyph tokens two columns each, emitting a color code only when it changes."""
+    parts = []
+    color = None
+    for token_color, char in tokens:
+        if token_color and token_color != color:
+            parts.append(token_color)
+            color = token_color
+        parts.append(char)
+        parts.append(" ")
+    if parts:
+        parts.pop()
+    if color is not None:
+        parts.append("|n")
+    return "".join(parts)
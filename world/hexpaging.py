@@ -0,0 +1,426 @@
+"""Region-paged HexMap for worlds too large to hold in memory.
+
+`PagedHexMap` splits axial space into square chunks of `chunk_size` x
+`chunk_size` hexes. A chunk is read from the `HexTile` store the first time
+any of its hexes is touched and kept in an LRU of compact chunk arrays
+bounded by a memory budget. When a chunk is evicted its pending changes are
+written back first, so only recently used regions (those around active
+players) stay resident while the rest of the world lives in the database.
+
+Numeric layers and edge features are paged with the terrain: each
+resident chunk holds a small `FloatLayer` per layer name and a `HexEdges`
+for the edges its hexes own, read with the chunk and written back with it.
+
+The map mirrors the store rather than replacing it: `tiles()`, `len()` and
+`in_box()` see resident chunks only, and `save_all` never deletes tiles it
+has not loaded and removed itself.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from django.db import transaction
+
+from world.hexedges import EDGE_ATTRIBUTE, HexEdges, edge_slot
+from world.hexgrid import HexOffsets
+from world.hexmap import CubeCoord, HexMap
+from world.hexstorage import ArrayTileStorage, FloatLayer, TerrainTable
+from world.hexstore import load_attribute, load_tiles_at
+
+CHUNK_SIZE = 32
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Rough per-chunk bookkeeping on top of its cell bytes: the storage object,
+# its bytearray header and the LRU entry.
+CHUNK_OVERHEAD = 400
+
+
+class PagedTileStorage:
+    """Tile storage that pages square chunks in from the DB on demand.
+
+    Args:
+        chunk_size: Side of a chunk, in hexes.
+        max_bytes: Memory budget for resident chunks.
+        terrains: Terrain table shared by every chunk.
+        on_evict: Called with `(cq, cr)` before a chunk is dropped.
+        layers: Numeric layers read with every chunk.
+        edges: Read edge features with every chunk.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        terrains: TerrainTable | None = None,
+        on_evict=None,
+        layers: tuple[str, ...] = (),
+        edges: bool = False,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.chunk_size = chunk_size
+        self.terrains = terrains if terrains is not None else TerrainTable()
+        self.max_chunks = max(1, max_bytes // (chunk_size * chunk_size + CHUNK_OVERHEAD))
+        self.on_evict = on_evict
+        self._chunks: OrderedDict[tuple[int, int], ArrayTileStorage] = OrderedDict()
+        self.layer_names: list[str] = list(layers)
+        self._layers: dict[tuple[int, int], dict[str, FloatLayer]] = {}
+        self.pages_edges = edges
+        self._edges: dict[tuple[int, int], HexEdges] = {}
+        # Axial position of each stored tile in a resident chunk, by tile id.
+        self._positions: dict[tuple[int, int], dict[int, tuple[int, int]]] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    # --- Chunks ---
+    def chunk_of(self, q: int, r: int) -> tuple[int, int]:
+        return q // self.chunk_size, r // self.chunk_size
+
+    def chunk_coords(self, cq: int, cr: int) -> Iterator[tuple[int, int, int]]:
+        """Yield the cube coords covered by chunk (cq, cr)."""
+        size = self.chunk_size
+        for r in range(cr * size, (cr + 1) * size):
+            for q in range(cq * size, (cq + 1) * size):
+                yield q, r, -q - r
+
+    def is_resident(self, cq: int, cr: int) -> bool:
+        return (cq, cr) in self._chunks
+
+    def resident_chunks(self) -> list[tuple[int, int]]:
+        """Resident chunk keys, least recently used first."""
+        return list(self._chunks)
+
+    def _chunk(self, q: int, r: int) -> ArrayTileStorage:
+        key = (q // self.chunk_size, r // self.chunk_size)
+        chunks = self._chunks
+        chunk = chunks.get(key)
+        if chunk is not None:
+            chunks.move_to_end(key)
+            return chunk
+        chunk = self._load(*key)
+        chunks[key] = chunk
+        while len(chunks) > self.max_chunks:
+            self.evict(next(iter(chunks)))
+        return chunk
+
+    def _load(self, cq: int, cr: int) -> ArrayTileStorage:
+        size = self.chunk_size
+        chunk = ArrayTileStorage(self.terrains)
+        chunk.reserve(cq * size, cr * size, (cq + 1) * size - 1, (cr + 1) * size - 1)
+        positions = self._positions[(cq, cr)] = {}
+        for tile_id, (q, r, _s), terrain in load_tiles_at(self.chunk_coords(cq, cr)):
+            chunk.set(q, r, terrain)
+            positions[tile_id] = (q, r)
+        self._layers[(cq, cr)] = {}
+        for name in self.layer_names:
+            self._load_layer((cq, cr), name)
+        if self.pages_edges:
+            self._load_edges((cq, cr))
+        self.loads += 1
+        return chunk
+
+    def _load_layer(self, key: tuple[int, int], name: str) -> FloatLayer:
+        """Read layer `name` of a resident chunk from the store, in one query."""
+        grid = self._layers[key][name] = FloatLayer(name)
+        positions = self._positions[key]
+        if positions:
+            for tile_id, value in load_attribute(name, tile_ids=positions).items():
+                if isinstance(value, (int, float)):
+                    grid.set(*positions[tile_id], value)
+        return grid
+
+    def add_layer(self, name: str) -> None:
+        """Page layer `name` along with the terrain, reading it for resident chunks now."""
+        if name in self.layer_names:
+            return
+        self.layer_names.append(name)
+        for key in self._chunks:
+            self._load_layer(key, name)
+
+    def chunk_layer(self, q: int, r: int, name: str) -> FloatLayer:
+        """The `FloatLayer` for `name` of the chunk holding (q, r), paging it in."""
+        self._chunk(q, r)
+        return self._layers[self.chunk_of(q, r)][name]
+
+    def resident_layers(self, name: str) -> Iterator[FloatLayer]:
+        for key in list(self._chunks):
+            yield self._layers[key][name]
+
+    def _load_edges(self, key: tuple[int, int]) -> HexEdges:
+        """Read the edges owned by a resident chunk's hexes, in one query."""
+        edges = self._edges[key] = HexEdges()
+        positions = self._positions[key]
+        if positions:
+            for tile_id, value in load_attribute(EDGE_ATTRIBUTE, tile_ids=positions).items():
+                if isinstance(value, int):
+                    edges.set_packed(*positions[tile_id], value)
+        return edges
+
+    def enable_edges(self) -> None:
+        """Page edge features along with the terrain, reading them for resident chunks now."""
+        if self.pages_edges:
+            return
+        self.pages_edges = True
+        for key in self._chunks:
+            self._load_edges(key)
+
+    def chunk_edges(self, q: int, r: int) -> HexEdges:
+        """The `HexEdges` of the chunk holding owner hex (q, r), paging it in."""
+        self.enable_edges()
+        self._chunk(q, r)
+        return self._edges[self.chunk_of(q, r)]
+
+    def resident_edges(self) -> Iterator[HexEdges]:
+        for key in list(self._chunks):
+            edges = self._edges.get(key)
+            if edges is not None:
+                yield edges
+
+    def evict(self, key: tuple[int, int]) -> None:
+        """Write back and drop a resident chunk."""
+        if key not in self._chunks:
+            return
+        if self.on_evict is not None:
+            self.on_evict(*key)
+        del self._chunks[key]
+        del self._layers[key]
+        del self._positions[key]
+        self._edges.pop(key, None)
+        self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every resident chunk, writing each back first."""
+        for key in list(self._chunks):
+            self.evict(key)
+
+    # --- Storage protocol ---
+    def has(self, q: int, r: int) -> bool:
+        return self._chunk(q, r).has(q, r)
+
+    def get(self, q: int, r: int) -> Optional[str]:
+        return self._chunk(q, r).get(q, r)
+
+    def set(self, q: int, r: int, data: Optional[str]) -> bool:
+        return self._chunk(q, r).set(q, r, data)
+
+    def remove(self, q: int, r: int) -> None:
+        self._chunk(q, r).remove(q, r)
+
+    def _within_one_chunk(self, q: int, r: int, offsets: HexOffsets) -> bool:
+        size = self.chunk_size
+        extent = offsets.extent
+        return (q - extent) // size == (q + extent) // size and (r - extent) // size == (r + extent) // size
+
+    def select(self, q: int, r: int, offsets: HexOffsets) -> list[tuple[int, int]]:
+        """Return the axial coords of `offsets` around (q, r) that hold a tile."""
+        if self._within_one_chunk(q, r, offsets):
+            return self._chunk(q, r).select(q, r, offsets)
+        return [(q + dq, r + dr) for dq, dr in offsets.axial if self.has(q + dq, r + dr)]
+
+    def count(self, q: int, r: int, offsets: HexOffsets) -> int:
+        """Return how many of `offsets` around (q, r) hold a tile."""
+        if self._within_one_chunk(q, r, offsets):
+            return self._chunk(q, r).count(q, r, offsets)
+        return sum(self.has(q + dq, r + dr) for dq, dr in offsets.axial)
+
+    def items(self) -> Iterator[tuple[int, int, Optional[str]]]:
+        """Yield tiles of the resident chunks."""
+        for chunk in list(self._chunks.values()):
+            yield from chunk.items()
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, Optional[str]]]:
+        """Yield tiles inside the inclusive axial box, paging its chunks in."""
+        cq_min, cr_min = self.chunk_of(q_min, r_min)
+        cq_max, cr_max = self.chunk_of(q_max, r_max)
+        size = self.chunk_size
+        for cr in range(cr_min, cr_max + 1):
+            for cq in range(cq_min, cq_max + 1):
+                chunk = self._chunk(cq * size, cr * size)
+                yield from chunk.items_in_box(q_min, r_min, q_max, r_max)
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks.values())
+
+
+class PagedFloatLayer:
+    """A numeric layer of a `PagedHexMap`, held per resident chunk.
+
+    Reads and writes page the chunk in; `items()` sees resident chunks only.
+    """
+
+    def __init__(self, storage: PagedTileStorage, name: str) -> None:
+        self.name = name
+        self._storage = storage
+        storage.add_layer(name)
+
+    def get(self, q: int, r: int) -> Optional[float]:
+        return self._storage.chunk_layer(q, r, self.name).get(q, r)
+
+    def set(self, q: int, r: int, value: Optional[float]) -> bool:
+        return self._storage.chunk_layer(q, r, self.name).set(q, r, value)
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, float]]:
+        """Yield `(q, r, value)` for set cells inside the inclusive axial box, paging its chunks in."""
+        storage = self._storage
+        cq_min, cr_min = storage.chunk_of(q_min, r_min)
+        cq_max, cr_max = storage.chunk_of(q_max, r_max)
+        size = storage.chunk_size
+        for cr in range(cr_min, cr_max + 1):
+            for cq in range(cq_min, cq_max + 1):
+                grid = storage.chunk_layer(cq * size, cr * size, self.name)
+                yield from grid.items_in_box(q_min, r_min, q_max, r_max)
+
+    def items(self) -> Iterator[tuple[int, int, float]]:
+        for grid in self._storage.resident_layers(self.name):
+            yield from grid.items()
+
+
+class PagedEdges:
+    """The edge features of a `PagedHexMap`, held per resident chunk.
+
+    Each edge lives in the chunk of its owning hex (see `world.hexedges`).
+    Reads and writes page that chunk in; `items()`, `owners()` and `len()`
+    see resident chunks only.
+    """
+
+    # `len()` can't tell whether chunks not yet paged in have features.
+    paged = True
+
+    def __init__(self, storage: PagedTileStorage) -> None:
+        self._storage = storage
+
+    def get(self, q: int, r: int, direction: int) -> int:
+        oq, or_, slot = edge_slot(q, r, direction)
+        return self._storage.chunk_edges(oq, or_).get(oq, or_, slot)
+
+    def set(self, q: int, r: int, direction: int, flags: int) -> bool:
+        oq, or_, slot = edge_slot(q, r, direction)
+        return self._storage.chunk_edges(oq, or_).set(oq, or_, slot, flags)
+
+    def packed(self, q: int, r: int) -> int:
+        return self._storage.chunk_edges(q, r).packed(q, r)
+
+    def set_packed(self, q: int, r: int, value: int) -> None:
+        self._storage.chunk_edges(q, r).set_packed(q, r, value)
+
+    def owners(self) -> Iterator[tuple[int, int]]:
+        for edges in self._storage.resident_edges():
+            yield from edges.owners()
+
+    def items(self) -> Iterator[tuple[int, int, int, int]]:
+        for edges in self._storage.resident_edges():
+            yield from edges.items()
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, int, int]]:
+        """Yield `(q, r, direction, flags)` for featured edges touching the box, paging its chunks in."""
+        storage = self._storage
+        # Owners of edges touching the box lie at most one step outside it.
+        cq_min, cr_min = storage.chunk_of(q_min - 1, r_min - 1)
+        cq_max, cr_max = storage.chunk_of(q_max, r_max + 1)
+        size = storage.chunk_size
+        for cr in range(cr_min, cr_max + 1):
+            for cq in range(cq_min, cq_max + 1):
+                edges = storage.chunk_edges(cq * size, cr * size)
+                yield from edges.items_in_box(q_min, r_min, q_max, r_max)
+
+    def __len__(self) -> int:
+        """Number of hexes owning featured edges in resident chunks."""
+        return sum(len(edges) for edges in self._storage.resident_edges())
+
+
+class PagedHexMap(HexMap):
+    """A HexMap backed by the `HexTile` store, resident one chunk at a time.
+
+    Args:
+        chunk_size: Side of a chunk, in hexes.
+        max_bytes: Memory budget for resident chunks.
+        terrains: Terrains to pre-register in the shared terrain table.
+        layers: Numeric layers to read with every chunk; others are added
+            the first time they are used.
+        edges: Read edge features with every chunk from the start; otherwise
+            they are read once edges are first used.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        terrains: tuple[str, ...] = (),
+        layers: tuple[str, ...] = (),
+        edges: bool = False,
+    ) -> None:
+        storage = PagedTileStorage(
+            chunk_size, max_bytes, TerrainTable(terrains), on_evict=self._write_chunk, edges=edges
+        )
+        super().__init__(storage)
+        self._edges = PagedEdges(storage)
+        for name in layers:
+            self._layers[name] = PagedFloatLayer(storage, name)
+        # Whatever is not resident is, by definition, what the store holds.
+        self._synced = True
+
+    @classmethod
+    def load_all(cls, storage=None):
+        raise TypeError("PagedHexMap loads chunks on demand; use PagedHexMap() instead")
+
+    def layer(self, name: str) -> PagedFloatLayer:
+        # Every layer may have values in chunks not yet paged in.
+        if name not in self._layers:
+            self._layers[name] = PagedFloatLayer(self._tiles, name)
+        return self._layers[name]
+
+    def set_value(self, coord: CubeCoord, layer: str, value) -> None:
+        self.layer(layer)
+        super().set_value(coord, layer, value)
+
+    def get_value(self, coord: CubeCoord, layer: str):
+        return self.layer(layer).get(coord[0], coord[1])
+
+    def values(self, layer: str, coords):
+        get = self.layer(layer).get
+        return [get(coord[0], coord[1]) for coord in coords]
+
+    def values_in_box(self, layer: str, q_min: int, r_min: int, q_max: int, r_max: int):
+        self.layer(layer)
+        return super().values_in_box(layer, q_min, r_min, q_max, r_max)
+
+    def refresh_tile(self, coord: CubeCoord, data=None, removed: bool = False) -> None:
+        storage = self._tiles
+        if storage.is_resident(*storage.chunk_of(coord[0], coord[1])):
+            super().refresh_tile(coord, data, removed)
+            return
+        # The chunk will read the change when paged in, but caches derived
+        # from the map (like minimap fragments) may outlive the chunk.
+        self.revision += 1
+        if self._listeners:
+            self._notify(coord[0], coord[1])
+
+    def preload(self, center: CubeCoord, radius: int) -> None:
+        """Page in every chunk overlapping the hexes within `radius` of `center`."""
+        storage = self._tiles
+        size = storage.chunk_size
+        cq_min, cr_min = storage.chunk_of(center[0] - radius, center[1] - radius)
+        cq_max, cr_max = storage.chunk_of(center[0] + radius, center[1] + radius)
+        for cr in range(cr_min, cr_max + 1):
+            for cq in range(cq_min, cq_max + 1):
+                storage.has(cq * size, cr * size)
+
+    @transaction.atomic
+    def _write_chunk(self, cq: int, cr: int) -> None:
+        """Write back the pending changes inside chunk (cq, cr)."""
+        chunk_of = self._tiles.chunk_of
+        dirty = [c for c in self._dirty if chunk_of(c.q, c.r) == (cq, cr)]
+        removed = [c for c in self._removed if chunk_of(c.q, c.r) == (cq, cr)]
+        values = {
+            name: [c for c in coords if chunk_of(c[0], c[1]) == (cq, cr)]
+            for name, coords in self._dirty_values.items()
+        }
+        values = {name: coords for name, coords in values.items() if coords}
+        if not (dirty or removed or values):
+            return
+        self._write_tiles(dirty, removed, values)
+        self._dirty.difference_update(dirty)
+        self._removed.difference_update(removed)
+        for name, coords in values.items():
+            self._dirty_values[name].difference_update(coords)
@@ -0,0 +1,390 @@
+"""Terrain-cost pathfinding over a `world.hexmap.HexMap`.
+
+Entering a hex costs the movement cost of its terrain. Terrains mapped to
+None (ocean by default) and hexes missing from the map are impassable.
+Builders can override or extend the default costs with a
+`HEX_TERRAIN_COSTS` dict in settings.
+
+Edge features (see `world.hexedges`) adjust a step: following a road
+multiplies its cost by `road_factor`, crossing a river is impossible
+unless the edge has a ford (which costs `FORD_COST` extra) or a road
+(a bridge), and cliffs cannot be crossed at all.
+
+Searches run on axial `(q, r)` tuples straight against the map's storage
+and can be bounded by `max_cost` and `max_nodes`, so a single query never
+stalls the server. `find_path_async` runs the same search on the reactor
+in slices of `ASYNC_SLICE_NODES` expansions and returns a Deferred; it never
+leaves the reactor thread, so it cannot race map edits made there.
+
+Results of `find_path` are kept in a bounded LRU cache that is dropped
+whenever the map's `revision` changes or a cost is reconfigured.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from twisted.internet import defer, task
+
+from world.hexedges import CLIFF, FORD, RIVER, ROAD, direction_between
+from world.hexgrid import AXIAL_DIRECTIONS, hex_distance
+from world.hexmap import CubeCoord, HexMap
+
+DEFAULT_TERRAIN_COSTS: dict[str, Optional[float]] = {
+    "plain": 1,
+    "plains": 1,
+    "coast": 1,
+    "desert": 2,
+    "forest": 2,
+    "hills": 2,
+    "tundra": 2,
+    "swamp": 3,
+    "mountain": 4,
+    "ocean": None,
+}
+UNKNOWN_TERRAIN_COST = 1
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_MAX_NODES = 200_000
+ASYNC_SLICE_NODES = 2_000
+ROAD_FACTOR = 0.5
+FORD_COST = 1
+
+
+def terrain_costs() -> dict[str, Optional[float]]:
+    """Default costs updated with `settings.HEX_TERRAIN_COSTS`."""
+    costs = dict(DEFAULT_TERRAIN_COSTS)
+    costs.update(getattr(settings, "HEX_TERRAIN_COSTS", {}) or {})
+    return costs
+
+
+def _edge_lookup(edges):
+    """`edges.get`, or None when the map has no edge features to look up."""
+    # Paged edges only know about resident chunks, so they are always looked up.
+    return edges.get if len(edges) or getattr(edges, "paged", False) else None
+
+
+class PathResult(tuple):
+    """A found path: `(coords, cost)`, coords from start to goal inclusive."""
+
+    __slots__ = ()
+
+    def __new__(cls, coords: list[CubeCoord], cost: float):
+        return tuple.__new__(cls, (coords, cost))
+
+    @property
+    def coords(self) -> list[CubeCoord]:
+        return self[0]
+
+    @property
+    def cost(self) -> float:
+        return self[1]
+
+
+class HexPathfinder:
+    """A* and multi-source Dijkstra over one HexMap.
+
+    Args:
+        hexmap: The map to search; its tile data are terrain strings.
+        costs: Terrain -> cost overrides on top of `terrain_costs()`.
+        cache_size: Maximum number of cached `find_path` results.
+        road_factor: Cost multiplier for steps along a road.
+    """
+
+    def __init__(
+        self,
+        hexmap: HexMap,
+        costs: Optional[dict[str, Optional[float]]] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        road_factor: float = ROAD_FACTOR,
+    ) -> None:
+        if road_factor <= 0:
+            raise ValueError("road_factor must be positive")
+        self.hexmap = hexmap
+        self.road_factor = road_factor
+        self._costs = terrain_costs()
+        self._costs.update(costs or {})
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_revision = hexmap.revision
+        self.hits = 0
+        self.misses = 0
+
+    # --- Costs ---
+    def cost_of(self, terrain: Optional[str]) -> Optional[float]:
+        """Movement cost to enter a hex of `terrain`; None if impassable."""
+        if terrain is None:
+            return UNKNOWN_TERRAIN_COST
+        return self._costs.get(terrain, UNKNOWN_TERRAIN_COST)
+
+    def set_cost(self, terrain: str, cost: Optional[float]) -> None:
+        """Change the cost of `terrain` (None makes it impassable)."""
+        if cost is not None and cost <= 0:
+            raise ValueError("terrain costs must be positive")
+        self._costs[terrain] = cost
+        self.clear_cache()
+
+    def _min_cost(self) -> float:
+        passable = [cost for cost in self._costs.values() if cost is not None]
+        lowest = min(passable + [UNKNOWN_TERRAIN_COST])
+        return lowest * min(self.road_factor, 1) if _edge_lookup(self.hexmap.edges) else lowest
+
+    def _step_cost(self, q: int, r: int) -> Optional[float]:
+        storage = self.hexmap.storage
+        if not storage.has(q, r):
+            return None
+        return self.cost_of(storage.get(q, r))
+
+    def _edge_cost(self, flags: int, cost: float) -> Optional[float]:
+        """Adjust the cost of a step for the features on the edge it crosses."""
+        if flags & CLIFF or (flags & RIVER and not flags & (FORD | ROAD)):
+            return None
+        if flags & ROAD:
+            return cost * self.road_factor
+        if flags & RIVER:
+            return cost + FORD_COST
+        return cost
+
+    def move_cost(self, a: CubeCoord, b: CubeCoord) -> Optional[float]:
+        """Cost of one step from `a` to the adjacent hex `b`; None if it is blocked."""
+        cost = self._step_cost(b[0], b[1])
+        if cost is None:
+            return None
+        return self._edge_cost(self.hexmap.edges.get(a[0], a[1], direction_between(a, b)), cost)
+
+    # --- Cache ---
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._cache_revision = self.hexmap.revision
+
+    def _cache_get(self, key):
+        if self._cache_revision != self.hexmap.revision:
+            self.clear_cache()
+            return None
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key, result, revision: int) -> None:
+        if revision != self.hexmap.revision or self._cache_revision != revision:
+            return
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    # --- Searches ---
+    def find_path(
+        self,
+        start: CubeCoord,
+        goal: CubeCoord,
+        max_cost: Optional[float] = None,
+        max_nodes: int = DEFAULT_MAX_NODES,
+    ) -> Optional[PathResult]:
+        """Cheapest path from `start` to `goal` with A*.
+
+        Returns None if the goal is unreachable, or cannot be reached within
+        `max_cost` or by expanding at most `max_nodes` hexes.
+        """
+        key = (start[0], start[1], goal[0], goal[1], max_cost)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached or None
+        self.misses += 1
+        revision = self.hexmap.revision
+        outcome = self._astar(start[0], start[1], goal[0], goal[1], max_cost, max_nodes)
+        return self._finish(key, revision, outcome)
+
+    def find_path_async(
+        self,
+        start: CubeCoord,
+        goal: CubeCoord,
+        max_cost: Optional[float] = None,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        slice_nodes: int = ASYNC_SLICE_NODES,
+    ) -> defer.Deferred:
+        """`find_path` run on the reactor in slices; return a Deferred firing with its result.
+
+        Each slice expands at most `slice_nodes` hexes before yielding to the
+        reactor. If the map changes between slices the result is still
+        returned but not cached.
+        """
+        if slice_nodes <= 0:
+            raise ValueError("slice_nodes must be positive")
+        key = (start[0], start[1], goal[0], goal[1], max_cost)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.hits += 1
+            return defer.succeed(cached or None)
+        self.misses += 1
+        revision = self.hexmap.revision
+        outcome = []
+
+        def steps():
+            for step in self._astar_steps(start[0], start[1], goal[0], goal[1], max_cost, max_nodes, slice_nodes):
+                if step is not None:
+                    outcome.append(step)
+                yield None
+
+        done = task.cooperate(steps()).whenDone()
+        return done.addCallback(lambda _: self._finish(key, revision, outcome[-1]))
+
+    def _finish(self, key, revision: int, outcome: tuple[Optional[PathResult], bool]) -> Optional[PathResult]:
+        result, exhausted = outcome
+        # Running out of node budget proves nothing about reachability; don't cache it.
+        if not exhausted:
+            self._cache_put(key, result or (), revision)
+        return result
+
+    def _astar(self, sq, sr, gq, gr, max_cost, max_nodes) -> tuple[Optional[PathResult], bool]:
+        """Return `(result, exhausted)`; `exhausted` is True if `max_nodes` ran out."""
+        return next(self._astar_steps(sq, sr, gq, gr, max_cost, max_nodes, 0))
+
+    def _astar_steps(self, sq, sr, gq, gr, max_cost, max_nodes, slice_nodes):
+        """Run A*, yielding None after every `slice_nodes` expansions (never if 0).
+
+        The last item yielded is the `(result, exhausted)` tuple of `_astar`.
+        """
+        if self._step_cost(sq, sr) is None or self._step_cost(gq, gr) is None:
+            yield None, False
+            return
+        if (sq, sr) == (gq, gr):
+            yield PathResult([CubeCoord.from_axial(sq, sr)], 0), False
+            return
+        scale = self._min_cost()
+        goal = (gq, gr)
+        best = {(sq, sr): 0}
+        came_from = {}
+        frontier = [(hex_distance((sq, sr), goal) * scale, 0, sq, sr)]
+        step_cost = self._step_cost
+        edge_flags = _edge_lookup(self.hexmap.edges)
+        edge_cost = self._edge_cost
+        expanded = 0
+        while frontier:
+            _f, g, q, r = heapq.heappop(frontier)
+            if (q, r) == goal:
+                yield PathResult(self._rebuild(came_from, goal), g), False
+                return
+            if g > best[(q, r)]:
+                continue
+            expanded += 1
+            if expanded > max_nodes:
+                yield None, True
+                return
+            if slice_nodes and not expanded % slice_nodes:
+                yield None
+                # The map may have changed while the reactor ran other work.
+                edge_flags = _edge_lookup(self.hexmap.edges)
+            for direction, (dq, dr) in enumerate(AXIAL_DIRECTIONS):
+                nq, nr = q + dq, r + dr
+                cost = step_cost(nq, nr)
+                if cost is None:
+                    continue
+                if edge_flags is not None:
+                    flags = edge_flags(q, r, direction)
+                    if flags:
+                        cost = edge_cost(flags, cost)
+                        if cost is None:
+                            continue
+                ng = g + cost
+                if max_cost is not None and ng > max_cost:
+                    continue
+                if ng < best.get((nq, nr), ng + 1):
+                    best[(nq, nr)] = ng
+                    came_from[(nq, nr)] = (q, r)
+                    dq_goal, dr_goal = nq - gq, nr - gr
+                    h = max(abs(dq_goal), abs(dr_goal), abs(dq_goal + dr_goal)) * scale
+                    heapq.heappush(frontier, (ng + h, ng, nq, nr))
+        yield None, False
+
+    @staticmethod
+    def _rebuild(came_from: dict, goal: tuple[int, int]) -> list[CubeCoord]:
+        path = [goal]
+        while path[-1] in came_from:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return [CubeCoord.from_axial(q, r) for q, r in path]
+
+    def distances_from(
+        self,
+        sources: Iterable[CubeCoord],
+        max_cost: Optional[float] = None,
+        max_nodes: int = DEFAULT_MAX_NODES,
+    ) -> dict[CubeCoord, float]:
+        """Multi-source Dijkstra: cheapest cost from any of `sources` to each reachable hex."""
+        return {
+            CubeCoord.from_axial(q, r): cost
+            for (q, r), cost in self._dijkstra(sources, max_cost, max_nodes, None)[0].items()
+        }
+
+    def nearest(
+        self,
+        sources: Iterable[CubeCoord],
+        match: Callable[[Optional[str]], bool] | Iterable[str],
+        max_cost: Optional[float] = None,
+        max_nodes: int = DEFAULT_MAX_NODES,
+    ) -> Optional[tuple[CubeCoord, float]]:
+        """Closest hex, by movement cost from any source, whose terrain matches.
+
+        `match` is either a predicate on the terrain or a collection of
+        terrain names. The matching hex itself need not be passable, so
+        `nearest(here, {"ocean"})` finds the nearest shore water.
+        """
+        if not callable(match):
+            wanted = frozenset(match)
+            match = wanted.__contains__
+        _costs, found = self._dijkstra(sources, max_cost, max_nodes, match)
+        if found is None:
+            return None
+        (q, r), cost = found
+        return CubeCoord.from_axial(q, r), cost
+
+    def _dijkstra(self, sources, max_cost, max_nodes, match):
+        storage = self.hexmap.storage
+        step_cost = self._step_cost
+        edge_flags = _edge_lookup(self.hexmap.edges)
+        edge_cost = self._edge_cost
+        best: dict[tuple[int, int], float] = {}
+        frontier = []
+        for source in sources:
+            q, r = source[0], source[1]
+            if storage.has(q, r):
+                best[(q, r)] = 0
+                frontier.append((0, q, r))
+        heapq.heapify(frontier)
+        expanded = 0
+        while frontier:
+            g, q, r = heapq.heappop(frontier)
+            if g > best[(q, r)]:
+                continue
+            if match is not None and match(storage.get(q, r)):
+                return best, ((q, r), g)
+            expanded += 1
+            if expanded > max_nodes:
+                break
+            for direction, (dq, dr) in enumerate(AXIAL_DIRECTIONS):
+                nq, nr = q + dq, r + dr
+                if match is not None and storage.has(nq, nr) and match(storage.get(nq, nr)):
+                    # Targets are reached by walking up to them, even if impassable.
+                    cost = self.cost_of(storage.get(nq, nr)) or 0
+                else:
+                    cost = step_cost(nq, nr)
+                    if cost is None:
+                        continue
+                if edge_flags is not None:
+                    flags = edge_flags(q, r, direction)
+                    if flags:
+                        cost = edge_cost(flags, cost)
+                        if cost is None:
+                            continue
+                ng = g + cost
+                if max_cost is not None and ng > max_cost:
+                    continue
+                if ng < best.get((nq, nr), ng + 1):
+                    best[(nq, nr)] = ng
+                    heapq.heappush(frontier, (ng, nq, nr))
+        return best, None
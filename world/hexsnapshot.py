@@ -0,0 +1,227 @@
+"""Versioned binary snapshots of a HexMap, readable through `mmap`.
+
+Layout (little-endian):
+
+    header   magic b"HEXSNAP\\0", version u16, record size u16,
+             terrain count u16, layer count u16, record count u64
+    names    terrain names, then layer names, each as u16 length + UTF-8
+    padding  zero bytes up to the next multiple of 8
+    records  one fixed-width record per tile, sorted by (r, q):
+             q i32, r i32, terrain code u8, 3 pad bytes, one f32 per layer
+
+Terrain code 0 means "no data"; code n is the n-th terrain name. Layers
+hold optional numeric per-tile values (NaN when a tile has none).
+
+`HexSnapshot` maps the file and reads records in place: opening is constant
+time, and `get` finds a tile with a binary search over the sorted records.
+`restore_snapshot` writes a snapshot back into the `HexTile` store.
+"""
+
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+
+from world.hexmap import CubeCoord, HexMap
+
+MAGIC = b"HEXSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHHQ")
+RECORD_BASE = "<iiB3x"
+NAME_LENGTH = struct.Struct("<H")
+
+
+class SnapshotError(ValueError):
+    """Raised for files that are not valid hex snapshots."""
+
+
+def _record_struct(layer_count: int) -> struct.Struct:
+    return struct.Struct(RECORD_BASE + "f" * layer_count)
+
+
+def write_snapshot(
+    hexmap: HexMap, path: str, layers: Optional[dict[str, dict[tuple[int, int, int], float]]] = None
+) -> int:
+    """Write `hexmap` to `path` and return the number of records written.
+
+    `layers` maps layer names to `{(q, r, s): value}` and defaults to the
+    map's own numeric layers; tiles missing from a layer are stored as NaN.
+    The file is written to a temporary name and renamed into place, so
+    readers never see a partial snapshot.
+    """
+    if layers is None:
+        layers = {
+            name: {(q, r, -q - r): value for q, r, value in hexmap.layer(name).items()}
+            for name in hexmap.layer_names
+        }
+    layer_names = list(layers)
+    layer_values = [layers[name] for name in layer_names]
+    codes: dict[str, int] = {}
+    rows = []
+    for q, r, terrain in hexmap.storage.items():
+        if terrain is None:
+            code = 0
+        else:
+            code = codes.get(terrain)
+            if code is None:
+                code = codes[terrain] = len(codes) + 1
+                if code > 255:
+                    raise SnapshotError("snapshots hold at most 255 distinct terrains")
+        rows.append((r, q, code))
+    rows.sort()
+
+    record = _record_struct(len(layer_names))
+    names = b"".join(
+        NAME_LENGTH.pack(len(encoded)) + encoded
+        for encoded in (name.encode("utf-8") for name in [*codes, *layer_names])
+    )
+    head = HEADER.pack(MAGIC, VERSION, record.size, len(codes), len(layer_names), len(rows)) + names
+    head += b"\0" * (-len(head) % 8)
+
+    nan = math.nan
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(head)
+        buffer = bytearray(record.size * len(rows))
+        pack_into = record.pack_into
+        for index, (r, q, code) in enumerate(rows):
+            coords = (q, r, -q - r)
+            pack_into(buffer, index * record.size, q, r, code, *(values.get(coords, nan) for values in layer_values))
+        handle.write(buffer)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class HexSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Use as a context manager, or call `close()` when done.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            try:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{path} is empty") from None
+        try:
+            self._parse_header()
+        except (SnapshotError, struct.error, UnicodeDecodeError) as err:
+            self._map.close()
+            raise SnapshotError(f"{path} is not a valid hex snapshot: {err}") from None
+
+    def _parse_header(self) -> None:
+        data = self._map
+        magic, version, record_size, terrain_count, layer_count, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise SnapshotError("bad magic")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported version {version}")
+        self._record = _record_struct(layer_count)
+        if record_size != self._record.size:
+            raise SnapshotError("record size does not match layer count")
+        offset = HEADER.size
+        names = []
+        for _ in range(terrain_count + layer_count):
+            (length,) = NAME_LENGTH.unpack_from(data, offset)
+            offset += NAME_LENGTH.size
+            names.append(bytes(data[offset:offset + length]).decode("utf-8"))
+            offset += length
+        self.terrains: list[Optional[str]] = [None, *names[:terrain_count]]
+        self.layers: list[str] = names[terrain_count:]
+        self._start = offset + (-offset % 8)
+        self._count = count
+        if self._start + count * record_size > len(data):
+            raise SnapshotError("file is truncated")
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "HexSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _unpack(self, index: int) -> tuple:
+        return self._record.unpack_from(self._map, self._start + index * self._record.size)
+
+    def record(self, index: int) -> tuple[CubeCoord, Optional[str], tuple[float, ...]]:
+        """Return `(coord, terrain, layer_values)` of the record at `index`."""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        q, r, code, *values = self._unpack(index)
+        return CubeCoord.from_axial(q, r), self.terrains[code], tuple(values)
+
+    def _find(self, q: int, r: int) -> int:
+        lo, hi = 0, self._count
+        target = (r, q)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mq, mr = self._unpack(mid)[:2]
+            if (mr, mq) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._unpack(lo)[:2] == (q, r):
+            return lo
+        return -1
+
+    def __contains__(self, coord) -> bool:
+        return self._find(coord[0], coord[1]) >= 0
+
+    def get(self, coord) -> Optional[str]:
+        """Terrain at `coord` (None if absent or without data)."""
+        index = self._find(coord[0], coord[1])
+        return None if index < 0 else self.terrains[self._unpack(index)[2]]
+
+    def layer_value(self, coord, layer: str) -> Optional[float]:
+        """Value of `layer` at `coord`, or None if absent or unset."""
+        index = self._find(coord[0], coord[1])
+        if index < 0:
+            return None
+        value = self._unpack(index)[3 + self.layers.index(layer)]
+        return None if math.isnan(value) else value
+
+    def iter_tiles(self) -> Iterator[tuple[int, int, Optional[str]]]:
+        """Yield `(q, r, terrain)` for every record, in file order."""
+        terrains = self.terrains
+        end = self._start + self._count * self._record.size
+        for q, r, code, *_values in self._record.iter_unpack(self._map[self._start:end]):
+            yield q, r, terrains[code]
+
+    def to_hexmap(self, storage=None) -> HexMap:
+        """Build a HexMap from the snapshot (compact storage by default).
+
+        The map starts with no pending changes and, like a new map, no
+        knowledge of what the DB holds.
+        """
+        hm = HexMap(storage) if storage is not None else HexMap.compact(tuple(self.terrains[1:]))
+        store = hm.storage
+        for q, r, terrain in self.iter_tiles():
+            store.set(q, r, terrain)
+        return hm
+
+
+def read_snapshot(path: str, storage=None) -> HexMap:
+    """Return the HexMap stored in the snapshot at `path`."""
+    with HexSnapshot(path) as snapshot:
+        return snapshot.to_hexmap(storage)
+
+
+def restore_snapshot(path: str, overwrite: bool = True) -> HexMap:
+    """Write the snapshot at `path` into the `HexTile` store and return its map.
+
+    With `overwrite`, stored tiles absent from the snapshot are deleted.
+    """
+    hm = read_snapshot(path)
+    hm.mark_all_dirty()
+    hm.save_all(overwrite=overwrite)
+    return hm
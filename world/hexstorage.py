@@ -0,0 +1,460 @@
+"""Storage backends for `world.hexmap.HexMap`.
+
+Both backends address tiles by axial coordinates (q, r); the cube `s` is
+always `-q - r` and is never stored.
+
+- `DictTileStorage` keeps a dict of `(q, r) -> data`. Any value can be
+  stored and sparse maps stay cheap.
+- `ArrayTileStorage` keeps one byte per cell of the axial bounding box,
+  holding a small terrain code resolved through a `TerrainTable`. A
+  million-tile continent costs about a megabyte.
+
+`FloatLayer` uses the same dense layout for numeric per-hex layers such as
+elevation, at four bytes per cell; `SparseFloatLayer` is its dict
+counterpart for dict-backed maps.
+
+A dense grid only grows while its box stays reasonably full: growing to
+more than DENSE_MAX_WASTE cells per stored value (past DENSE_MIN_CELLS
+cells) moves its values to a dict instead, so two tiles far apart cost two
+entries rather than the whole box between them.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Iterator, Optional
+
+from world.hexgrid import HexOffsets
+
+ABSENT = 0
+NO_DATA = 1
+_NAN_CELL = (math.nan,)
+
+DENSE_MAX_WASTE = 8
+DENSE_MIN_CELLS = 1 << 16
+
+
+class TerrainTable:
+    """Bidirectional mapping between terrain strings and one-byte codes.
+
+    Code 0 marks an empty cell and code 1 a tile without data, so up to 254
+    distinct terrains can be registered.
+    """
+
+    MAX_CODE = 255
+
+    def __init__(self, terrains: tuple[str, ...] = ()) -> None:
+        self._values: list[Optional[str]] = [None, None]
+        self._codes: dict[str, int] = {}
+        for terrain in terrains:
+            self.code_of(terrain)
+
+    def code_of(self, terrain: Optional[str]) -> int:
+        """Return the code for `terrain`, registering it if unseen."""
+        if terrain is None:
+            return NO_DATA
+        code = self._codes.get(terrain)
+        if code is None:
+            code = len(self._values)
+            if code > self.MAX_CODE:
+                raise ValueError(f"TerrainTable is full; cannot add terrain {terrain!r}")
+            self._values.append(terrain)
+            self._codes[terrain] = code
+        return code
+
+    def value_of(self, code: int) -> Optional[str]:
+        return self._values[code]
+
+    @property
+    def terrains(self) -> list[str]:
+        """Registered terrains in code order."""
+        return self._values[2:]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+class DictTileStorage:
+    """Tiles in a dict keyed by axial `(q, r)` tuples."""
+
+    def __init__(self) -> None:
+        self._cells: dict[tuple[int, int], Optional[str]] = {}
+
+    def has(self, q: int, r: int) -> bool:
+        return (q, r) in self._cells
+
+    def get(self, q: int, r: int) -> Optional[str]:
+        return self._cells.get((q, r))
+
+    def set(self, q: int, r: int, data: Optional[str]) -> bool:
+        """Store `data` at (q, r); return False if it was already stored there."""
+        cells = self._cells
+        key = (q, r)
+        if key in cells and cells[key] == data:
+            return False
+        cells[key] = data
+        return True
+
+    def remove(self, q: int, r: int) -> None:
+        self._cells.pop((q, r), None)
+
+    def select(self, q: int, r: int, offsets: HexOffsets) -> list[tuple[int, int]]:
+        """Return the axial coords of `offsets` around (q, r) that hold a tile."""
+        cells = self._cells
+        return [(q + dq, r + dr) for dq, dr in offsets.axial if (q + dq, r + dr) in cells]
+
+    def count(self, q: int, r: int, offsets: HexOffsets) -> int:
+        """Return how many of `offsets` around (q, r) hold a tile."""
+        cells = self._cells
+        return sum((q + dq, r + dr) in cells for dq, dr in offsets.axial)
+
+    def items(self) -> Iterator[tuple[int, int, Optional[str]]]:
+        for (q, r), data in self._cells.items():
+            yield q, r, data
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, Optional[str]]]:
+        """Yield `(q, r, data)` for tiles inside the inclusive axial box."""
+        cells = self._cells
+        if (q_max - q_min + 1) * (r_max - r_min + 1) > len(cells):
+            for (q, r), data in cells.items():
+                if q_min <= q <= q_max and r_min <= r <= r_max:
+                    yield q, r, data
+            return
+        for r in range(r_min, r_max + 1):
+            for q in range(q_min, q_max + 1):
+                if (q, r) in cells:
+                    yield q, r, cells[q, r]
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+
+class DenseAxialGrid:
+    """A dense, row-major array of cells over a growable axial bounding box.
+
+    Cell `(q, r)` lives at `(r - r0) * width + (q - q0)`. The box grows to
+    include cells written outside it, at least doubling the grown dimension
+    so that filling a region costs amortized constant time per cell. If the
+    grown box would be mostly empty, the grid turns sparse instead: its
+    values move to the object `_to_sparse` returns, which subclasses then
+    delegate to. Subclasses pick the cell type through `_new_cells` and
+    keep `_count` of the cells holding a value.
+    """
+
+    def __init__(self) -> None:
+        self._q0 = 0
+        self._r0 = 0
+        self._width = 0
+        self._height = 0
+        self._cells = self._new_cells(0)
+        self._count = 0
+        self._sparse = None
+
+    def _new_cells(self, size: int):
+        return bytearray(size)
+
+    def _to_sparse(self):
+        raise NotImplementedError
+
+    @property
+    def is_sparse(self) -> bool:
+        """True once the values live in a dict rather than the dense box."""
+        return self._sparse is not None
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int]:
+        """Allocated axial box as `(q_min, r_min, q_max, r_max)`, inclusive."""
+        return self._q0, self._r0, self._q0 + self._width - 1, self._r0 + self._height - 1
+
+    def reserve(self, q_min: int, r_min: int, q_max: int, r_max: int) -> None:
+        """Grow the array to cover the given inclusive axial box in one step.
+
+        Does nothing once the grid is sparse.
+        """
+        if self._sparse is not None:
+            return
+        if self._width and self._height:
+            q_min = min(q_min, self._q0)
+            r_min = min(r_min, self._r0)
+            q_max = max(q_max, self._q0 + self._width - 1)
+            r_max = max(r_max, self._r0 + self._height - 1)
+        width = q_max - q_min + 1
+        height = r_max - r_min + 1
+        if (q_min, r_min, width, height) == (self._q0, self._r0, self._width, self._height):
+            return
+        cells = self._new_cells(width * height)
+        for row in range(self._height):
+            src = row * self._width
+            dst = (row + self._r0 - r_min) * width + (self._q0 - q_min)
+            cells[dst:dst + self._width] = self._cells[src:src + self._width]
+        self._q0, self._r0, self._width, self._height = q_min, r_min, width, height
+        self._cells = cells
+
+    def _index(self, q: int, r: int) -> int:
+        dq = q - self._q0
+        dr = r - self._r0
+        if 0 <= dq < self._width and 0 <= dr < self._height:
+            return dr * self._width + dq
+        return -1
+
+    def _grow_to(self, q: int, r: int) -> bool:
+        """Grow the box to include (q, r); return False if the grid turned sparse instead."""
+        if not (self._width and self._height):
+            self.reserve(q, r, q, r)
+            return True
+        q_min, r_min, q_max, r_max = self.bounds
+        if q < q_min:
+            q_min = min(q, q_min - self._width)
+        elif q > q_max:
+            q_max = max(q, q_max + self._width)
+        if r < r_min:
+            r_min = min(r, r_min - self._height)
+        elif r > r_max:
+            r_max = max(r, r_max + self._height)
+        cells = (q_max - q_min + 1) * (r_max - r_min + 1)
+        if cells > max(DENSE_MIN_CELLS, (self._count + 1) * DENSE_MAX_WASTE):
+            self._sparse = self._to_sparse()
+            self._q0 = self._r0 = self._width = self._height = 0
+            self._cells = self._new_cells(0)
+            return False
+        self.reserve(q_min, r_min, q_max, r_max)
+        return True
+
+
+class ArrayTileStorage(DenseAxialGrid):
+    """Tiles as one-byte terrain codes in a `DenseAxialGrid`."""
+
+    def __init__(self, terrains: TerrainTable | None = None) -> None:
+        super().__init__()
+        self.terrains = terrains if terrains is not None else TerrainTable()
+
+    def _to_sparse(self) -> DictTileStorage:
+        sparse = DictTileStorage()
+        for q, r, data in self.items():
+            sparse.set(q, r, data)
+        return sparse
+
+    def has(self, q: int, r: int) -> bool:
+        if self._sparse is not None:
+            return self._sparse.has(q, r)
+        idx = self._index(q, r)
+        return idx >= 0 and self._cells[idx] != ABSENT
+
+    def get(self, q: int, r: int) -> Optional[str]:
+        if self._sparse is not None:
+            return self._sparse.get(q, r)
+        idx = self._index(q, r)
+        if idx < 0:
+            return None
+        return self.terrains.value_of(self._cells[idx])
+
+    def set(self, q: int, r: int, data: Optional[str]) -> bool:
+        """Store `data` at (q, r); return False if it was already stored there."""
+        code = self.terrains.code_of(data)
+        if self._sparse is not None:
+            return self._sparse.set(q, r, data)
+        idx = self._index(q, r)
+        if idx < 0:
+            if not self._grow_to(q, r):
+                return self._sparse.set(q, r, data)
+            idx = self._index(q, r)
+        previous = self._cells[idx]
+        if previous == code:
+            return False
+        if previous == ABSENT:
+            self._count += 1
+        self._cells[idx] = code
+        return True
+
+    def remove(self, q: int, r: int) -> None:
+        if self._sparse is not None:
+            self._sparse.remove(q, r)
+            return
+        idx = self._index(q, r)
+        if idx >= 0 and self._cells[idx] != ABSENT:
+            self._cells[idx] = ABSENT
+            self._count -= 1
+
+    def select(self, q: int, r: int, offsets: HexOffsets) -> list[tuple[int, int]]:
+        """Return the axial coords of `offsets` around (q, r) that hold a tile.
+
+        When the whole table fits inside the array this is a single pass of
+        index arithmetic over precomputed flat offsets.
+        """
+        if self._sparse is not None:
+            return self._sparse.select(q, r, offsets)
+        extent = offsets.extent
+        dq0 = q - self._q0
+        dr0 = r - self._r0
+        if extent <= dq0 < self._width - extent and extent <= dr0 < self._height - extent:
+            cells = self._cells
+            base = dr0 * self._width + dq0
+            return [
+                (q + dq, r + dr)
+                for (dq, dr), delta in zip(offsets.axial, offsets.flat(self._width))
+                if cells[base + delta]
+            ]
+        return [(q + dq, r + dr) for dq, dr in offsets.axial if self.has(q + dq, r + dr)]
+
+    def count(self, q: int, r: int, offsets: HexOffsets) -> int:
+        """Return how many of `offsets` around (q, r) hold a tile."""
+        if self._sparse is not None:
+            return self._sparse.count(q, r, offsets)
+        extent = offsets.extent
+        dq0 = q - self._q0
+        dr0 = r - self._r0
+        if extent <= dq0 < self._width - extent and extent <= dr0 < self._height - extent:
+            cells = self._cells
+            base = dr0 * self._width + dq0
+            return sum(1 for delta in offsets.flat(self._width) if cells[base + delta])
+        return sum(self.has(q + dq, r + dr) for dq, dr in offsets.axial)
+
+    def items(self) -> Iterator[tuple[int, int, Optional[str]]]:
+        if self._sparse is not None:
+            return self._sparse.items()
+        return self.items_in_box(*self.bounds)
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, Optional[str]]]:
+        """Yield `(q, r, data)` for tiles inside the inclusive axial box."""
+        if self._sparse is not None:
+            yield from self._sparse.items_in_box(q_min, r_min, q_max, r_max)
+            return
+        q_min = max(q_min, self._q0)
+        r_min = max(r_min, self._r0)
+        q_max = min(q_max, self._q0 + self._width - 1)
+        r_max = min(r_max, self._r0 + self._height - 1)
+        if q_min > q_max or r_min > r_max:
+            return
+        cells = self._cells
+        value_of = self.terrains.value_of
+        for r in range(r_min, r_max + 1):
+            start = (r - self._r0) * self._width + (q_min - self._q0)
+            row = cells[start:start + q_max - q_min + 1]
+            if not any(row):
+                continue
+            for col, code in enumerate(row):
+                if code != ABSENT:
+                    yield q_min + col, r, value_of(code)
+
+    def __len__(self) -> int:
+        if self._sparse is not None:
+            return len(self._sparse)
+        return self._count
+
+
+class SparseFloatLayer:
+    """A numeric per-hex layer as a dict of `(q, r) -> float`, for sparse maps.
+
+    Values are rounded to 32-bit floats, as in `FloatLayer`.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._values: dict[tuple[int, int], float] = {}
+
+    def get(self, q: int, r: int) -> Optional[float]:
+        return self._values.get((q, r))
+
+    def set(self, q: int, r: int, value: Optional[float]) -> bool:
+        """Store `value` at (q, r); return False if it was already stored there."""
+        key = (q, r)
+        if value is None:
+            return self._values.pop(key, None) is not None
+        value = array("f", (value,))[0]
+        if self._values.get(key) == value:
+            return False
+        self._values[key] = value
+        return True
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, float]]:
+        """Yield `(q, r, value)` for set cells inside the inclusive axial box."""
+        for (q, r), value in self._values.items():
+            if q_min <= q <= q_max and r_min <= r <= r_max:
+                yield q, r, value
+
+    def items(self) -> Iterator[tuple[int, int, float]]:
+        for (q, r), value in self._values.items():
+            yield q, r, value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class FloatLayer(DenseAxialGrid):
+    """A numeric per-hex layer as 32-bit floats in a `DenseAxialGrid`.
+
+    Unset cells hold NaN and read back as None.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        super().__init__()
+
+    def _new_cells(self, size: int):
+        return array("f", _NAN_CELL) * size
+
+    def _to_sparse(self) -> SparseFloatLayer:
+        sparse = SparseFloatLayer(self.name)
+        for q, r, value in self.items():
+            sparse.set(q, r, value)
+        return sparse
+
+    def get(self, q: int, r: int) -> Optional[float]:
+        if self._sparse is not None:
+            return self._sparse.get(q, r)
+        idx = self._index(q, r)
+        if idx < 0:
+            return None
+        value = self._cells[idx]
+        return None if value != value else value
+
+    def set(self, q: int, r: int, value: Optional[float]) -> bool:
+        """Store `value` at (q, r); return False if it was already stored there."""
+        if self._sparse is not None:
+            return self._sparse.set(q, r, value)
+        idx = self._index(q, r)
+        if idx < 0:
+            if value is None:
+                return False
+            if not self._grow_to(q, r):
+                return self._sparse.set(q, r, value)
+            idx = self._index(q, r)
+        previous = self._cells[idx]
+        if value is None:
+            if previous != previous:
+                return False
+            self._cells[idx] = math.nan
+            self._count -= 1
+            return True
+        self._cells[idx] = value
+        if previous != previous:
+            self._count += 1
+        # Compare as stored, after rounding to float32.
+        return self._cells[idx] != previous
+
+    def items_in_box(self, q_min: int, r_min: int, q_max: int, r_max: int) -> Iterator[tuple[int, int, float]]:
+        """Yield `(q, r, value)` for set cells inside the inclusive axial box."""
+        if self._sparse is not None:
+            yield from self._sparse.items_in_box(q_min, r_min, q_max, r_max)
+            return
+        q_min = max(q_min, self._q0)
+        r_min = max(r_min, self._r0)
+        q_max = min(q_max, self._q0 + self._width - 1)
+        r_max = min(r_max, self._r0 + self._height - 1)
+        cells = self._cells
+        for r in range(r_min, r_max + 1):
+            start = (r - self._r0) * self._width + (q_min - self._q0)
+            for col, value in enumerate(cells[start:start + q_max - q_min + 1]):
+                if value == value:
+                    yield q_min + col, r, value
+
+    def items(self) -> Iterator[tuple[int, int, float]]:
+        if self._sparse is not None:
+            return self._sparse.items()
+        return self.items_in_box(*self.bounds)
+
+    def __len__(self) -> int:
+        if self._sparse is not None:
+            return len(self._sparse)
+        return self._count
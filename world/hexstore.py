@@ -0,0 +1,776 @@
+"""Bulk database access for hex tiles.
+
+`HexTile` objects keep their cube coordinates in a "hexcoord" tag and their
+terrain in a plain Attribute. The helpers here read and write those rows
+straight through the ORM, without creating typeclass instances, so reading
+the whole world costs a constant number of queries no matter how many tiles
+it has, and writing costs a handful of batched queries per changed tile set.
+
+Tiles that are live in the idmapper cache are kept coherent: their Attribute
+caches are reset after bulk updates, and they are deleted through the normal
+`delete()` path so their hooks run.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Iterable, Iterator
+
+from django.db import connection, transaction
+from django.db.models import Case, TextField, Value, When
+from django.db.models.functions import Cast
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.typeclasses.tags import Tag
+from evennia.utils.picklefield import dbsafe_decode
+
+from typeclasses.hextile import HexTile
+from world.hexgrid import disk_offsets, hex_distance
+
+COORD_CATEGORY = "hexcoord"
+QUERY_CHUNK_SIZE = 2000
+IN_CLAUSE_SIZE = 500
+DEFAULT_TERRAIN = "plain"
+ROOM_LINK_KEY = "hex_dbref"
+ROOM_LINK_CATEGORY = "environment"
+# Tag that `LivingMixin` puts on every character and NPC.
+OCCUPANT_TAG = "living_being"
+OCCUPANT_CATEGORY = "living_state"
+TILE_LOCKSTRING = (
+    "control:perm(Developer);examine:perm(Builder);view:all();edit:perm(Admin);"
+    "delete:perm(Admin);get:true();drop:holds();call:true();tell:perm(Admin);"
+    "puppet:pperm(Developer);teleport:true();teleport_here:true();pick_up:false()"
+)
+
+Coords = tuple[int, int, int]
+
+
+def coord_key(q: int, r: int, s: int) -> str:
+    """Return the "hexcoord" tag key used for cube coords (q, r, s)."""
+    return f"{int(q)},{int(r)},{int(s)}"
+
+
+def parse_coord_key(key: str | None) -> Coords | None:
+    """Parse a "hexcoord" tag key back into (q, r, s), or None if malformed."""
+    try:
+        q, r, s = (int(part) for part in key.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if q + r + s != 0:
+        return None
+    return q, r, s
+
+
+def chunked(items: Iterable, size: int = IN_CLAUSE_SIZE) -> Iterator[list]:
+    """Split `items` into lists of at most `size`, to keep IN clauses bounded."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def tile_queryset():
+    """ObjectDB queryset covering every `HexTile` (including subclasses)."""
+    return HexTile.objects.all_family()
+
+
+def iter_tile_coords(chunk_size: int = QUERY_CHUNK_SIZE) -> Iterator[tuple[int, Coords]]:
+    """Yield `(tile_id, (q, r, s))` for every tile using a single query."""
+    rows = (
+        tile_queryset()
+        .filter(db_tags__db_category=COORD_CATEGORY)
+        .values_list("id", "db_tags__db_key")
+    )
+    for tile_id, key in rows.iterator(chunk_size=chunk_size):
+        coords = parse_coord_key(key)
+        if coords is not None:
+            yield tile_id, coords
+
+
+def load_attribute(
+    key: str,
+    tile_ids: Iterable[int] | None = None,
+    chunk_size: int = QUERY_CHUNK_SIZE,
+    category: str | None = None,
+    queryset=None,
+) -> dict[int, Any]:
+    """Return `{tile_id: value}` for the Attribute `key`/`category` on tiles.
+
+    All tiles are read unless `tile_ids` narrows the set; pass `queryset`
+    to read the Attribute from other objects instead. Values are read as
+    their stored pickle string and decoded once per distinct string, since
+    most layers (like terrain) repeat a handful of values across the whole
+    world. Category and attrtype are checked in Python rather than SQL:
+    filtering on them makes SQLite drive the join from the Attribute table,
+    which degrades to quadratic time.
+    """
+    rows = (
+        (tile_queryset() if queryset is None else queryset)
+        .filter(db_attributes__db_key=key)
+        .annotate(raw=Cast("db_attributes__db_value", TextField()))
+        .values_list("id", "db_attributes__db_category", "db_attributes__db_attrtype", "raw")
+    )
+    if tile_ids is None:
+        batches = [rows.iterator(chunk_size=chunk_size)]
+    else:
+        batches = (rows.filter(id__in=batch) for batch in chunked(tile_ids))
+    decoded: dict[str, Any] = {}
+    values: dict[int, Any] = {}
+    for batch in batches:
+        for tile_id, attr_category, attrtype, raw in batch:
+            if attr_category != category or attrtype is not None:
+                continue
+            if raw is None:
+                values[tile_id] = None
+                continue
+            if raw not in decoded:
+                decoded[raw] = dbsafe_decode(raw)
+            values[tile_id] = decoded[raw]
+    return values
+
+
+def load_tiles() -> Iterator[tuple[int, Coords, Any]]:
+    """Yield `(tile_id, (q, r, s), terrain)` for every tile in two queries."""
+    terrains = load_attribute("terrain")
+    for tile_id, coords in iter_tile_coords():
+        yield tile_id, coords, terrains.get(tile_id)
+
+
+def load_tiles_at(coords: Iterable[Coords]) -> list[tuple[int, Coords, Any]]:
+    """Return `(tile_id, (q, r, s), terrain)` for those of `coords` that exist."""
+    ids = find_tile_ids(coords)
+    terrains = load_attribute("terrain", tile_ids=ids.values())
+    return [(tile_id, c, terrains.get(tile_id)) for c, tile_id in ids.items()]
+
+
+class CoordIndex:
+    """Process-wide `(q, r, s) -> tile id` index.
+
+    Built lazily from the "hexcoord" tags on first use, then kept current by
+    the tile creation and deletion paths of this process. Entries are keyed
+    by packed axial coordinates, so a lookup is a single dict access.
+
+    Tiles created inside a transaction stay pending, visible to lookups in
+    this process, until it commits; an `on_commit` callback then merges the
+    ones whose rows exist. If the transaction rolls back instead, the
+    callback never runs and the pending entries are dropped on the next use
+    outside a transaction, so no id of an unwritten row stays indexed.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[int, int] | None = None
+        self._pending: dict[int, int] = {}
+        # Set while an on_commit merge of `_pending` is outstanding.
+        self._committing = False
+
+    @staticmethod
+    def _key(q: int, r: int) -> int:
+        return (int(q) << 32) | (int(r) & 0xFFFFFFFF)
+
+    @property
+    def is_built(self) -> bool:
+        return self._ids is not None
+
+    def build(self) -> None:
+        """(Re)build the index from the database in a single query."""
+        self._ids = {self._key(q, r): tile_id for tile_id, (q, r, _s) in iter_tile_coords()}
+
+    def reset(self) -> None:
+        """Forget the index; it is rebuilt on the next lookup."""
+        self._ids = None
+        self._pending.clear()
+
+    def _settle(self) -> None:
+        """Drop the pending entries of a transaction that rolled back."""
+        if self._committing and not connection.in_atomic_block:
+            # Its commit would have merged them and cleared the flag.
+            self._committing = False
+            self._pending.clear()
+
+    def get(self, q: int, r: int, s: int) -> int | None:
+        """Return the id of the tile at (q, r, s), or None."""
+        if (q + r + s) != 0:
+            return None
+        if self._ids is None:
+            self.build()
+        key = self._key(q, r)
+        if self._pending:
+            self._settle()
+            tile_id = self._pending.get(key)
+            if tile_id is not None:
+                return tile_id
+        return self._ids.get(key)
+
+    def add(self, q: int, r: int, s: int, tile_id: int) -> None:
+        self.add_many({(q, r, s): tile_id})
+
+    def add_many(self, tile_ids: dict[Coords, int]) -> None:
+        """Index new tiles `{(q, r, s): tile_id}` once their transaction commits."""
+        entries = {self._key(c[0], c[1]): tile_id for c, tile_id in tile_ids.items()}
+        self._settle()
+        if not connection.in_atomic_block:
+            if self._ids is not None:
+                self._ids.update(entries)
+            return
+        self._pending.update(entries)
+        self._committing = True
+        # One callback per call: those registered in a savepoint that rolls
+        # back are discarded, the others still merge what committed.
+        transaction.on_commit(self._commit)
+
+    def _commit(self) -> None:
+        self._committing = False
+        pending, self._pending = self._pending, {}
+        if self._ids is None or not pending:
+            return
+        # Rows created in a savepoint that rolled back never committed.
+        committed = set()
+        for batch in chunked(list(pending.values())):
+            committed.update(ObjectDB.objects.filter(id__in=batch).values_list("id", flat=True))
+        self._ids.update({key: tile_id for key, tile_id in pending.items() if tile_id in committed})
+
+    def discard(self, q: int, r: int, s: int, tile_id: int | None = None) -> None:
+        """Drop (q, r, s); with `tile_id`, only if it still maps to that tile."""
+        key = self._key(q, r)
+        if tile_id is None or self._pending.get(key) == tile_id:
+            self._pending.pop(key, None)
+        if self._ids is None:
+            return
+        if tile_id is None or self._ids.get(key) == tile_id:
+            self._ids.pop(key, None)
+
+    def __len__(self) -> int:
+        if self._ids is None:
+            self.build()
+        self._settle()
+        return len(self._ids.keys() | self._pending.keys())
+
+
+coord_index = CoordIndex()
+
+
+def parse_dbref(value: Any) -> int | None:
+    """Return the id in a "#123" dbref string, or None."""
+    if isinstance(value, str) and value.startswith("#") and value[1:].isdigit():
+        return int(value[1:])
+    return None
+
+
+class HexRoomIndex:
+    """Process-wide `tile id -> room ids` index of rooms linked to hexes.
+
+    Built lazily from the rooms' `hex_dbref` Attributes on first use, then
+    kept current by `Room` linking and deletion and by tile deletion.
+    """
+
+    def __init__(self) -> None:
+        self._rooms: dict[int, set[int]] | None = None
+        self._tiles: dict[int, int] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._rooms is not None
+
+    def build(self) -> None:
+        """(Re)build the index from the database in a single query."""
+        links = load_attribute(ROOM_LINK_KEY, category=ROOM_LINK_CATEGORY, queryset=ObjectDB.objects.all())
+        self._rooms = defaultdict(set)
+        self._tiles = {}
+        for room_id, dbref in links.items():
+            tile_id = parse_dbref(dbref)
+            if tile_id is not None:
+                self._rooms[tile_id].add(room_id)
+                self._tiles[room_id] = tile_id
+
+    def reset(self) -> None:
+        """Forget the index; it is rebuilt on the next lookup."""
+        self._rooms = None
+        self._tiles = {}
+
+    def _built(self) -> dict[int, set[int]]:
+        if self._rooms is None:
+            self.build()
+        return self._rooms
+
+    def room_ids(self, tile_ids: Iterable[int]) -> set[int]:
+        """Ids of the rooms linked to any of `tile_ids`."""
+        rooms = self._built()
+        found: set[int] = set()
+        for tile_id in tile_ids:
+            found.update(rooms.get(tile_id, ()))
+        return found
+
+    def link(self, room_id: int, tile_id: int | None) -> None:
+        """Record that `room_id` now links to `tile_id` (None to unlink)."""
+        if self._rooms is None:
+            return
+        previous = self._tiles.pop(room_id, None)
+        if previous is not None:
+            self._rooms[previous].discard(room_id)
+            if not self._rooms[previous]:
+                del self._rooms[previous]
+        if tile_id is not None:
+            self._rooms[tile_id].add(room_id)
+            self._tiles[room_id] = tile_id
+
+    def discard_tile(self, tile_id: int) -> None:
+        """Forget every link to a deleted tile."""
+        if self._rooms is None:
+            return
+        for room_id in self._rooms.pop(tile_id, ()):
+            self._tiles.pop(room_id, None)
+            occupancy_index.relink_room(room_id, None)
+
+    def tile_id(self, room_id: int) -> int | None:
+        """Id of the tile `room_id` links to, or None."""
+        self._built()
+        return self._tiles.get(room_id)
+
+    def links(self) -> dict[int, int]:
+        """`{room_id: tile_id}` for every linked room."""
+        self._built()
+        return dict(self._tiles)
+
+
+room_index = HexRoomIndex()
+
+
+class HexOccupancyIndex:
+    """Process-wide index of where living beings stand on the hex map.
+
+    Beings are grouped by the room they are in, and rooms linked to a hex by
+    axial `(q, r)`, so the beings in an area are found with one dict lookup
+    per hex (or per occupied hex, whichever is fewer) and relinking a room
+    moves all its occupants at once. Built lazily from the DB on first use,
+    then kept current by `LivingMixin.at_post_move` and by `Room` linking.
+    Moves made without hooks are not seen; `occupants_in_hexes` and
+    `occupants_within` re-place any being found out of place.
+    """
+
+    def __init__(self) -> None:
+        self._hexes: dict[tuple[int, int], set[int]] | None = None
+        self._room_hex: dict[int, tuple[int, int]] = {}
+        self._occupants: dict[int, set[int]] = {}
+        self._location: dict[int, int] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._hexes is not None
+
+    def build(self) -> None:
+        """(Re)build the index from the database in a few batched queries."""
+        self._hexes = defaultdict(set)
+        self._room_hex = {}
+        self._occupants = {}
+        self._location = {}
+        room_tiles = room_index.links()
+        coords = tile_coords(set(room_tiles.values()))
+        tag_ids = [
+            tag_id
+            for tag_id, category in Tag.objects.filter(db_key=OCCUPANT_TAG).values_list("id", "db_category")
+            if category == OCCUPANT_CATEGORY
+        ]
+        link_model = ObjectDB.db_tags.through
+        being_ids = set(link_model.objects.filter(tag_id__in=tag_ids).values_list("objectdb_id", flat=True))
+        for batch in chunked(being_ids):
+            for being_id, room_id in ObjectDB.objects.filter(id__in=batch).values_list("id", "db_location_id"):
+                if room_id is not None:
+                    self._enter(being_id, room_id, coords.get(room_tiles.get(room_id)))
+
+    def reset(self) -> None:
+        """Forget the index; it is rebuilt on the next lookup."""
+        self._hexes = None
+        self._room_hex = {}
+        self._occupants = {}
+        self._location = {}
+
+    def _built(self) -> dict[tuple[int, int], set[int]]:
+        if self._hexes is None:
+            self.build()
+        return self._hexes
+
+    def _set_room_hex(self, room_id: int, coords: Coords | None) -> None:
+        previous = self._room_hex.pop(room_id, None)
+        if previous is not None:
+            self._hexes[previous].discard(room_id)
+            if not self._hexes[previous]:
+                del self._hexes[previous]
+        if coords is not None:
+            axial = (coords[0], coords[1])
+            self._room_hex[room_id] = axial
+            self._hexes[axial].add(room_id)
+
+    def _enter(self, obj_id: int, room_id: int, coords: Coords | None) -> None:
+        occupants = self._occupants.get(room_id)
+        if occupants is None:
+            occupants = self._occupants[room_id] = set()
+            self._set_room_hex(room_id, coords)
+        occupants.add(obj_id)
+        self._location[obj_id] = room_id
+
+    def discard(self, obj_id: int) -> None:
+        """Forget `obj_id`, wherever it was."""
+        if self._hexes is None:
+            return
+        room_id = self._location.pop(obj_id, None)
+        if room_id is None:
+            return
+        occupants = self._occupants[room_id]
+        occupants.discard(obj_id)
+        if not occupants:
+            del self._occupants[room_id]
+            self._set_room_hex(room_id, None)
+
+    def move(self, obj_id: int, room_id: int | None, coords: Coords | None) -> None:
+        """Record that `obj_id` is now in `room_id`, linked to hex `coords` (or None)."""
+        if self._hexes is None:
+            return
+        self.discard(obj_id)
+        if room_id is not None:
+            self._enter(obj_id, room_id, coords)
+
+    def place(self, obj) -> None:
+        """Re-index `obj` from its current location."""
+        if self._hexes is None:
+            return
+        location = obj.location
+        get_coords = getattr(location, "get_hex_coords", None)
+        coords = get_coords() if get_coords is not None else None
+        self.move(obj.id, location.id if location is not None else None, coords)
+
+    def relink_room(self, room_id: int, coords: Coords | None) -> None:
+        """Move the occupants of `room_id` along with the room's new hex link."""
+        if self._hexes is not None and room_id in self._occupants:
+            self._set_room_hex(room_id, coords)
+
+    def ids_in_hexes(self, coords: Iterable[Coords]) -> set[int]:
+        """Ids of the beings standing on any hex in `coords`."""
+        hexes = self._built()
+        return self._collect(hexes.get((c[0], c[1]), ()) for c in coords)
+
+    def ids_within(self, center: Coords, radius: int) -> set[int]:
+        """Ids of the beings within `radius` hexes of `center`."""
+        hexes = self._built()
+        cq, cr = center[0], center[1]
+        offsets = disk_offsets(radius).axial
+        if len(hexes) < len(offsets):
+            return self._collect(rooms for axial, rooms in hexes.items() if hex_distance(axial, (cq, cr)) <= radius)
+        return self._collect(hexes.get((cq + dq, cr + dr), ()) for dq, dr in offsets)
+
+    def _collect(self, room_sets: Iterable[Iterable[int]]) -> set[int]:
+        occupants = self._occupants
+        found: set[int] = set()
+        for rooms in room_sets:
+            for room_id in rooms:
+                found.update(occupants[room_id])
+        return found
+
+    def room_of(self, obj_id: int) -> int | None:
+        """Id of the room `obj_id` is indexed in, or None."""
+        self._built()
+        return self._location.get(obj_id)
+
+
+occupancy_index = HexOccupancyIndex()
+
+
+def rooms_in_hexes(coords: Iterable[Coords]) -> list:
+    """Return the rooms linked to any hex in `coords`.
+
+    Coordinates resolve through the coord index and rooms through the room
+    index; rooms not already in the idmapper cache are fetched in one batched
+    query per `IN_CLAUSE_SIZE` rooms.
+    """
+    tile_ids = [tile_id for tile_id in (coord_index.get(*c) for c in coords) if tile_id is not None]
+    return objects_by_id(room_index.room_ids(tile_ids))
+
+
+def objects_by_id(object_ids: Iterable[int]) -> list:
+    """Return the objects with `object_ids`, fetching uncached ones in batches."""
+    found = []
+    missing = []
+    for object_id in object_ids:
+        cached = ObjectDB.get_cached_instance(object_id)
+        if cached is not None:
+            found.append(cached)
+        else:
+            missing.append(object_id)
+    for batch in chunked(missing):
+        found.extend(ObjectDB.objects.filter(id__in=batch))
+    return found
+
+
+def _current_occupants(object_ids: Iterable[int]) -> list:
+    """Resolve occupant ids, dropping any that left their indexed room unseen."""
+    occupants = []
+    for obj in objects_by_id(object_ids):
+        if obj.db_location_id == occupancy_index.room_of(obj.id):
+            occupants.append(obj)
+        else:
+            occupancy_index.place(obj)
+    return occupants
+
+
+def occupants_in_hexes(coords: Iterable[Coords]) -> list:
+    """Return the living beings standing on any hex in `coords`."""
+    return _current_occupants(occupancy_index.ids_in_hexes(coords))
+
+
+def occupants_within(center: Coords, radius: int) -> list:
+    """Return the living beings within `radius` hexes of `center`."""
+    return _current_occupants(occupancy_index.ids_within(center, radius))
+
+
+def _coord_tag_rows(keys: list[str]) -> list[tuple[int, str, str | None]]:
+    """Return `(tag_id, key, tagtype)` of the "hexcoord" object Tags with `keys`.
+
+    Only the key is filtered in SQL: adding category or model makes SQLite
+    pick a low-selectivity index and scan every tag in the world.
+    """
+    rows = Tag.objects.filter(db_key__in=keys).values_list("id", "db_key", "db_category", "db_model", "db_tagtype")
+    return [
+        (tag_id, key, tagtype)
+        for tag_id, key, category, model, tagtype in rows
+        if category == COORD_CATEGORY and model == "objectdb"
+    ]
+
+
+def find_tile_ids(coords: Iterable[Coords]) -> dict[Coords, int]:
+    """Return `{(q, r, s): tile_id}` for those of `coords` that exist in the DB.
+
+    Resolved tag -> link -> object in separate indexed lookups; a single
+    joined query lets SQLite scan every tile per batch.
+    """
+    link_model = ObjectDB.db_tags.through
+    found: dict[Coords, int] = {}
+    for batch in chunked(coord_key(*c) for c in coords):
+        tag_keys = {tag_id: key for tag_id, key, _tagtype in _coord_tag_rows(batch)}
+        if not tag_keys:
+            continue
+        links = list(link_model.objects.filter(tag_id__in=list(tag_keys)).values_list("objectdb_id", "tag_id"))
+        tiles = set(tile_queryset().filter(id__in=[tile_id for tile_id, _tag in links]).values_list("id", flat=True))
+        for tile_id, tag_id in links:
+            parsed = parse_coord_key(tag_keys[tag_id])
+            if tile_id in tiles and parsed is not None:
+                found[parsed] = tile_id
+    return found
+
+
+def tile_coords(tile_ids: Iterable[int]) -> dict[int, Coords]:
+    """Return `{tile_id: (q, r, s)}` for those of `tile_ids` that carry coords."""
+    link_model = ObjectDB.db_tags.through
+    found: dict[int, Coords] = {}
+    for batch in chunked(tile_ids):
+        links = list(link_model.objects.filter(objectdb_id__in=batch).values_list("objectdb_id", "tag_id"))
+        keys = {
+            tag_id: key
+            for tag_id, key, category in Tag.objects.filter(id__in=[tag_id for _tile, tag_id in links]).values_list(
+                "id", "db_key", "db_category"
+            )
+            if category == COORD_CATEGORY
+        }
+        for tile_id, tag_id in links:
+            parsed = parse_coord_key(keys.get(tag_id))
+            if parsed is not None:
+                found[tile_id] = parsed
+    return found
+
+
+def _attribute_links(tile_ids: Iterable[int], key: str | None = None) -> list[tuple[int, int]]:
+    """Return `(tile_id, attribute_id)` for Attributes on `tile_ids`.
+
+    With `key`, only uncategorized Attributes of that key are returned; the
+    key is matched in Python for the same query-planning reason as above.
+    """
+    links = []
+    for batch in chunked(tile_ids):
+        rows = ObjectDB.objects.filter(id__in=batch).values_list(
+            "id",
+            "db_attributes__id",
+            "db_attributes__db_key",
+            "db_attributes__db_category",
+            "db_attributes__db_attrtype",
+        )
+        for tile_id, attr_id, attr_key, category, attrtype in rows:
+            if attr_id is None:
+                continue
+            if key is not None and (attr_key != key or category is not None or attrtype is not None):
+                continue
+            links.append((tile_id, attr_id))
+    return links
+
+
+def _add_attributes(values: dict[int, dict[str, Any]]) -> None:
+    """Create uncategorized Attributes `{tile_id: {key: value}}` and link them."""
+    link_model = ObjectDB.db_attributes.through
+    pairs = [(tile_id, key, value) for tile_id, attrs in values.items() for key, value in attrs.items()]
+    for batch in chunked(pairs, QUERY_CHUNK_SIZE):
+        attrs = Attribute.objects.bulk_create(
+            [Attribute(db_key=key, db_value=value, db_model="objectdb") for _tile_id, key, value in batch]
+        )
+        link_model.objects.bulk_create(
+            [link_model(objectdb_id=tile_id, attribute_id=attr.id) for (tile_id, _k, _v), attr in zip(batch, attrs)]
+        )
+
+
+def _coord_tags(coords: list[Coords]) -> dict[Coords, int]:
+    """Return "hexcoord" Tag ids for `coords`, creating the missing shared Tags."""
+    keys = {coord_key(*c): c for c in coords}
+    tag_ids: dict[Coords, int] = {}
+    for batch in chunked(keys):
+        for tag_id, key, tagtype in _coord_tag_rows(batch):
+            if tagtype is None:
+                tag_ids[keys[key]] = tag_id
+    missing = [key for key, c in keys.items() if c not in tag_ids]
+    for batch in chunked(missing, QUERY_CHUNK_SIZE):
+        created = Tag.objects.bulk_create(
+            [Tag(db_key=key, db_category=COORD_CATEGORY, db_model="objectdb") for key in batch]
+        )
+        for key, tag in zip(batch, created):
+            tag_ids[keys[key]] = tag.id
+    return tag_ids
+
+
+def insert_tiles(tiles: dict[Coords, str | None]) -> dict[Coords, int]:
+    """Create tiles `{(q, r, s): terrain}` in bulk and return their new ids.
+
+    Rows match what `HexTile.get_or_create_by_coords` produces: an object with
+    the tile locks, q/r/s/terrain Attributes and the "hexcoord" tag. A terrain
+    of None is stored as the default terrain, as when creating a single tile.
+    """
+    coords = list(tiles)
+    ids: dict[Coords, int] = {}
+    tag_ids = _coord_tags(coords)
+    tag_link_model = ObjectDB.db_tags.through
+    for batch in chunked(coords, QUERY_CHUNK_SIZE):
+        objs = ObjectDB.objects.bulk_create(
+            [
+                ObjectDB(
+                    db_key=f"Hex {coord_key(*c)}",
+                    db_typeclass_path=HexTile.path,
+                    db_lock_storage=TILE_LOCKSTRING,
+                )
+                for c in batch
+            ]
+        )
+        for c, obj in zip(batch, objs):
+            ids[c] = obj.id
+        coord_index.add_many({c: ids[c] for c in batch})
+        tag_link_model.objects.bulk_create(
+            [tag_link_model(objectdb_id=ids[c], tag_id=tag_ids[c]) for c in batch]
+        )
+    _add_attributes(
+        {
+            ids[c]: {"q": c[0], "r": c[1], "s": c[2], "terrain": str(tiles[c] or DEFAULT_TERRAIN)}
+            for c in coords
+        }
+    )
+    return ids
+
+
+def update_attribute(key: str, values: dict[int, Any]) -> None:
+    """Set the uncategorized Attribute `key` to `{tile_id: value}` in bulk.
+
+    Values shared by many tiles (like terrain) are written with one UPDATE
+    per distinct value; mostly distinct values (like numeric layers) with
+    one CASE UPDATE per batch. Missing Attributes are created.
+    """
+    existing = dict(_attribute_links(values, key=key))
+    by_value: dict[Any, list[int]] = defaultdict(list)
+    for tile_id, attr_id in existing.items():
+        by_value[values[tile_id]].append(attr_id)
+    if len(by_value) * 8 <= len(existing):
+        for value, attr_ids in by_value.items():
+            for batch in chunked(attr_ids):
+                Attribute.objects.filter(id__in=batch).update(db_value=value)
+    else:
+        # A CASE update rather than bulk_update: building Attribute(id=...)
+        # instances would plant partial objects in the idmapper cache.
+        field = Attribute._meta.get_field("db_value")
+        for batch in chunked(existing.items()):
+            cases = [
+                When(id=attr_id, then=Value(field.get_db_prep_value(values[tile_id], connection), TextField()))
+                for tile_id, attr_id in batch
+            ]
+            Attribute.objects.filter(id__in=[attr_id for _tile_id, attr_id in batch]).update(
+                db_value=Case(*cases, output_field=TextField())
+            )
+    for tile_id, attr_id in existing.items():
+        cached = Attribute.get_cached_instance(attr_id)
+        if cached is not None:
+            cached.db_value = values[tile_id]
+    _add_attributes({tile_id: {key: value} for tile_id, value in values.items() if tile_id not in existing})
+    for tile_id in values:
+        cached = ObjectDB.get_cached_instance(tile_id)
+        if cached is not None:
+            cached.attributes.reset_cache()
+
+
+def delete_attribute(key: str, tile_ids: Iterable[int]) -> None:
+    """Delete the uncategorized Attribute `key` from `tile_ids` in bulk."""
+    tile_ids = list(tile_ids)
+    attr_ids = [attr_id for _tile_id, attr_id in _attribute_links(tile_ids, key=key)]
+    for batch in chunked(attr_ids):
+        Attribute.objects.filter(id__in=batch).delete()
+    for tile_id in tile_ids:
+        cached = ObjectDB.get_cached_instance(tile_id)
+        if cached is not None:
+            cached.attributes.reset_cache()
+
+
+def update_terrain(terrains: dict[int, str]) -> None:
+    """Set terrain `{tile_id: terrain}` in bulk."""
+    update_attribute("terrain", {tile_id: str(terrain) for tile_id, terrain in terrains.items()})
+
+
+def delete_tiles(tiles: Iterable[tuple[Coords, int]]) -> None:
+    """Delete tiles given as `((q, r, s), tile_id)` pairs, with their Attributes.
+
+    Tiles currently live in the idmapper cache go through `delete()` so any
+    object holding them sees the deletion and their hooks run.
+    """
+    bulk_ids = []
+    for coords, tile_id in tiles:
+        coord_index.discard(*coords, tile_id)
+        room_index.discard_tile(tile_id)
+        cached = ObjectDB.get_cached_instance(tile_id)
+        if cached is not None:
+            cached.delete()
+        else:
+            bulk_ids.append(tile_id)
+    attr_ids = [attr_id for _tile_id, attr_id in _attribute_links(bulk_ids)]
+    for batch in chunked(bulk_ids):
+        ObjectDB.objects.filter(id__in=batch).delete()
+    for batch in chunked(attr_ids):
+        Attribute.objects.filter(id__in=batch).delete()
+
+
+def write_changes(
+    tiles: dict[Coords, Any],
+    removed: Iterable[Coords] = (),
+    values: dict[str, dict[Coords, Any]] | None = None,
+) -> None:
+    """Apply a set of tile changes to the store in batches.
+
+    `tiles` maps coords to terrain: missing tiles are inserted, existing
+    ones get the new terrain (None keeps what is stored). `values` maps an
+    Attribute key to `{coords: value}`; coords with no tile are skipped and
+    a None value deletes the Attribute. `removed` tiles are deleted.
+    """
+    values = values or {}
+    existing = find_tile_ids(set(tiles).union(*values.values()))
+    inserted = insert_tiles({coords: terrain for coords, terrain in tiles.items() if coords not in existing})
+    update_terrain(
+        {existing[coords]: terrain for coords, terrain in tiles.items() if coords in existing and terrain is not None}
+    )
+    existing.update(inserted)
+    for key, by_coords in values.items():
+        update_attribute(
+            key, {existing[c]: value for c, value in by_coords.items() if c in existing and value is not None}
+        )
+        delete_attribute(key, [existing[c] for c, value in by_coords.items() if c in existing and value is None])
+    delete_tiles(list(find_tile_ids(removed).items()))
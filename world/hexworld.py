@@ -0,0 +1,62 @@
+"""The process-wide hex world map shared by game commands.
+
+`world_map()` is a `PagedHexMap` over the `HexTile` store, so only regions
+around active players are resident. It follows changes made elsewhere:
+`HexTile` reports single-tile edits, and other maps report their bulk
+saves through `hexmap.STORE_LISTENERS`. `minimap()` is the shared renderer
+for it, so every player looking at the same area reuses the same cached
+fragments.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from world.hexmap import STORE_LISTENERS, CubeCoord
+from world.hexminimap import MinimapRenderer
+from world.hexpaging import PagedHexMap
+
+_world_map: Optional[PagedHexMap] = None
+_minimap: Optional[MinimapRenderer] = None
+
+
+def world_map() -> PagedHexMap:
+    """The shared world map, created on first use."""
+    global _world_map
+    if _world_map is None:
+        _world_map = PagedHexMap()
+    return _world_map
+
+
+def minimap() -> MinimapRenderer:
+    """The shared minimap renderer of `world_map()`."""
+    global _minimap
+    if _minimap is None:
+        _minimap = MinimapRenderer(world_map())
+    return _minimap
+
+
+def reset() -> None:
+    """Drop the shared map and renderer; they are recreated on next use."""
+    global _world_map, _minimap
+    _world_map = None
+    _minimap = None
+
+
+def tile_changed(q: int, r: int, terrain: Optional[str] = None, removed: bool = False) -> None:
+    """Tell the shared map, if any, that a stored tile changed."""
+    if _world_map is not None:
+        _world_map.refresh_tile(CubeCoord.from_axial(q, r), terrain, removed)
+
+
+def _tiles_stored(hexmap, tiles: dict, removed: list) -> None:
+    if _world_map is None or hexmap is _world_map:
+        return
+    for (q, r, _s), terrain in tiles.items():
+        if terrain is not None:
+            tile_changed(q, r, terrain)
+    for q, r, _s in removed:
+        tile_changed(q, r, removed=True)
+
+
+STORE_LISTENERS.append(_tiles_stored)
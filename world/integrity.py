@@ -0,0 +1,298 @@
+"""Bulk integrity checks for hex tiles, room links and resource tags.
+
+`scan()` reads everything it needs with a fixed number of queries (see
+`world.hexstore` for why filters are kept to keys and ids) and reports:
+
+- rooms whose `hex_dbref` does not point to an existing `HexTile`,
+- tiles without a "hexcoord" tag, or whose tags disagree with `db.q/r/s`,
+- coordinates held by more than one tile, and
+- `Resource` objects whose `resource:<kind>` tags don't match `db.kind`.
+
+`repair(report)` fixes them in one transaction. A tile's `db.q/r/s` win
+over its tags; a tile with no valid coordinates takes them from its single
+valid tag. Of duplicate tiles, the one most rooms link to (then the oldest)
+is kept, rooms linked to the others are moved to it and the others are
+deleted. Broken room links are removed. The process-wide hex indexes and
+the shared world map are dropped afterwards and rebuild on next use.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Q
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.typeclasses.tags import Tag
+
+from typeclasses.resources import Resource
+from world import hexworld
+from world.hexstore import (
+    COORD_CATEGORY,
+    ROOM_LINK_CATEGORY,
+    ROOM_LINK_KEY,
+    Coords,
+    chunked,
+    coord_index,
+    coord_key,
+    delete_tiles,
+    load_attribute,
+    occupancy_index,
+    parse_coord_key,
+    parse_dbref,
+    room_index,
+    tile_queryset,
+    update_attribute,
+)
+
+RESOURCE_TAG_PREFIX = "resource:"
+RESOURCE_TAG_CATEGORY = "system"
+
+
+@dataclass
+class IntegrityReport:
+    """Problems found by `scan`; empty when the world is consistent."""
+
+    # room id -> its `hex_dbref` value
+    broken_rooms: dict[int, Any] = field(default_factory=dict)
+    # tile ids without any "hexcoord" tag
+    missing_tags: list[int] = field(default_factory=list)
+    # tile id -> (db.q/r/s or None, coords of its tags, None if malformed)
+    mismatched_tags: dict[int, tuple[Optional[Coords], list[Optional[Coords]]]] = field(default_factory=dict)
+    # coords -> ids of every tile there
+    duplicates: dict[Coords, list[int]] = field(default_factory=dict)
+    # resource id -> (db.kind, its `resource:` tag keys)
+    resource_tags: dict[int, tuple[Any, list[str]]] = field(default_factory=dict)
+    # Scan bookkeeping, used by `repair`.
+    tiles: int = 0
+    resources: int = 0
+    _locations: dict[int, Coords] = field(default_factory=dict, repr=False)
+    _tile_tags: dict[int, list[tuple[int, str]]] = field(default_factory=dict, repr=False)
+    _resource_tag_ids: dict[int, list[tuple[int, str]]] = field(default_factory=dict, repr=False)
+    _room_links: dict[int, int] = field(default_factory=dict, repr=False)
+
+    @property
+    def issue_count(self) -> int:
+        return (
+            len(self.broken_rooms)
+            + len(self.missing_tags)
+            + len(self.mismatched_tags)
+            + sum(len(ids) - 1 for ids in self.duplicates.values())
+            + len(self.resource_tags)
+        )
+
+    def __bool__(self) -> bool:
+        return self.issue_count > 0
+
+    def summary(self) -> list[str]:
+        """One line per kind of problem found."""
+        return [
+            f"Rooms linked to missing hexes: {len(self.broken_rooms)}",
+            f"Hexes without a coordinate tag: {len(self.missing_tags)}",
+            f"Hexes whose tags disagree with db.q/r/s: {len(self.mismatched_tags)}",
+            f"Coordinates with duplicate hexes: {len(self.duplicates)}",
+            f"Resources with out-of-sync kind tags: {len(self.resource_tags)}",
+        ]
+
+
+def _valid(coords) -> Optional[Coords]:
+    if len(coords) == 3 and all(isinstance(c, int) for c in coords) and sum(coords) == 0:
+        return coords
+    return None
+
+
+def scan() -> IntegrityReport:
+    """Check tiles, room links and resource tags in bulk."""
+    report = IntegrityReport()
+    tile_ids = set(tile_queryset().values_list("id", flat=True))
+    report.tiles = len(tile_ids)
+
+    tags: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    rows = tile_queryset().filter(db_tags__db_category=COORD_CATEGORY).values_list("id", "db_tags__id", "db_tags__db_key")
+    for tile_id, tag_id, key in rows.iterator():
+        tags[tile_id].append((tag_id, key))
+    report._tile_tags = tags
+    axes = [load_attribute(axis) for axis in ("q", "r", "s")]
+
+    by_coords: dict[Coords, list[int]] = defaultdict(list)
+    for tile_id in sorted(tile_ids):
+        attr_coords = _valid(tuple(axis.get(tile_id) for axis in axes))
+        tag_coords = [parse_coord_key(key) for _tag_id, key in tags.get(tile_id, ())]
+        if not tag_coords:
+            report.missing_tags.append(tile_id)
+        elif attr_coords is None or tag_coords != [attr_coords]:
+            report.mismatched_tags[tile_id] = (attr_coords, tag_coords)
+        valid_tags = {c for c in tag_coords if c is not None}
+        location = attr_coords or (valid_tags.pop() if len(valid_tags) == 1 else None)
+        if location is not None:
+            report._locations[tile_id] = location
+            by_coords[location].append(tile_id)
+    report.duplicates = {coords: ids for coords, ids in by_coords.items() if len(ids) > 1}
+
+    links = load_attribute(ROOM_LINK_KEY, category=ROOM_LINK_CATEGORY, queryset=ObjectDB.objects.all())
+    for room_id, dbref in links.items():
+        tile_id = parse_dbref(dbref)
+        if tile_id in tile_ids:
+            report._room_links[room_id] = tile_id
+        else:
+            report.broken_rooms[room_id] = dbref
+
+    _scan_resources(report)
+    return report
+
+
+def _scan_resources(report: IntegrityReport) -> None:
+    resources = Resource.objects.all_family()
+    resource_ids = set(resources.values_list("id", flat=True))
+    report.resources = len(resource_ids)
+    kinds = load_attribute("kind", queryset=resources)
+    tag_keys = {
+        tag_id: key
+        for tag_id, key, category, model in Tag.objects.filter(db_key__startswith=RESOURCE_TAG_PREFIX).values_list(
+            "id", "db_key", "db_category", "db_model"
+        )
+        if category == RESOURCE_TAG_CATEGORY and model == "objectdb"
+    }
+    held: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    link_model = ObjectDB.db_tags.through
+    for batch in chunked(tag_keys):
+        for obj_id, tag_id in link_model.objects.filter(tag_id__in=batch).values_list("objectdb_id", "tag_id"):
+            if obj_id in resource_ids:
+                held[obj_id].append((tag_id, tag_keys[tag_id]))
+    report._resource_tag_ids = held
+    for obj_id in sorted(resource_ids):
+        kind = kinds.get(obj_id)
+        expected = [f"{RESOURCE_TAG_PREFIX}{kind}"] if kind else []
+        keys = sorted(key for _tag_id, key in held.get(obj_id, ()))
+        if keys != expected:
+            report.resource_tags[obj_id] = (kind, keys)
+
+
+# --- Repair ---
+def _shared_tag_ids(keys: Iterable[str], category: str) -> dict[str, int]:
+    """Ids of the plain object Tags `keys`/`category`, creating missing ones."""
+    keys = set(keys)
+    found: dict[str, int] = {}
+    for batch in chunked(keys):
+        for tag_id, key, tag_category, model, tagtype in Tag.objects.filter(db_key__in=batch).values_list(
+            "id", "db_key", "db_category", "db_model", "db_tagtype"
+        ):
+            if tag_category == category and model == "objectdb" and tagtype is None:
+                found[key] = tag_id
+    missing = sorted(keys - set(found))
+    for tag in Tag.objects.bulk_create([Tag(db_key=key, db_category=category, db_model="objectdb") for key in missing]):
+        found[tag.db_key] = tag.id
+    return found
+
+
+def _retag(remove: list[tuple[int, int]], add: dict[int, str], category: str) -> None:
+    """Unlink `(object_id, tag_id)` pairs and link `{object_id: tag key}`."""
+    link_model = ObjectDB.db_tags.through
+    for batch in chunked(remove):
+        query = Q()
+        for obj_id, tag_id in batch:
+            query |= Q(objectdb_id=obj_id, tag_id=tag_id)
+        link_model.objects.filter(query).delete()
+    tag_ids = _shared_tag_ids(add.values(), category)
+    link_model.objects.bulk_create([link_model(objectdb_id=obj_id, tag_id=tag_ids[key]) for obj_id, key in add.items()])
+    for obj_id in {obj_id for obj_id, _tag_id in remove} | set(add):
+        cached = ObjectDB.get_cached_instance(obj_id)
+        if cached is not None:
+            cached.tags.reset_cache()
+
+
+def _room_link_attributes(room_ids: Iterable[int]) -> dict[int, int]:
+    """`{room_id: attribute_id}` of the rooms' `hex_dbref` Attributes."""
+    found = {}
+    for batch in chunked(room_ids):
+        rows = ObjectDB.objects.filter(id__in=batch).values_list(
+            "id", "db_attributes__id", "db_attributes__db_key", "db_attributes__db_category"
+        )
+        for room_id, attr_id, key, category in rows:
+            if key == ROOM_LINK_KEY and category == ROOM_LINK_CATEGORY:
+                found[room_id] = attr_id
+    return found
+
+
+def _forget_rooms(room_ids: Iterable[int]) -> None:
+    for room_id in room_ids:
+        cached = ObjectDB.get_cached_instance(room_id)
+        if cached is not None:
+            cached.attributes.reset_cache()
+            if hasattr(cached, "refresh_hex_cache"):
+                cached.refresh_hex_cache()
+
+
+def _fix_tile_tags(report: IntegrityReport) -> None:
+    remove, add, positions = [], {}, {}
+    for tile_id in [*report.missing_tags, *report.mismatched_tags]:
+        location = report._locations.get(tile_id)
+        if location is None:
+            continue  # no valid coords anywhere; left for a builder
+        key = coord_key(*location)
+        held = report._tile_tags.get(tile_id, ())
+        remove.extend((tile_id, tag_id) for tag_id, tag_key in held if tag_key != key)
+        if key not in {tag_key for _tag_id, tag_key in held}:
+            add[tile_id] = key
+        attr_coords = report.mismatched_tags.get(tile_id, (location,))[0]
+        if attr_coords is None:
+            positions[tile_id] = location
+    _retag(remove, add, COORD_CATEGORY)
+    for index, axis in enumerate(("q", "r", "s")):
+        update_attribute(axis, {tile_id: coords[index] for tile_id, coords in positions.items()})
+
+
+def _merge_duplicates(report: IntegrityReport) -> None:
+    rooms_per_tile = Counter(report._room_links.values())
+    moves: dict[int, list[int]] = defaultdict(list)
+    doomed = []
+    for coords, tile_ids in report.duplicates.items():
+        keeper = min(tile_ids, key=lambda tile_id: (-rooms_per_tile[tile_id], tile_id))
+        losers = set(tile_ids) - {keeper}
+        doomed.extend((coords, tile_id) for tile_id in losers)
+        moves[keeper].extend(room_id for room_id, tile_id in report._room_links.items() if tile_id in losers)
+    attributes = _room_link_attributes(room_id for room_ids in moves.values() for room_id in room_ids)
+    for keeper, room_ids in moves.items():
+        attr_ids = [attributes[room_id] for room_id in room_ids if room_id in attributes]
+        for batch in chunked(attr_ids):
+            Attribute.objects.filter(id__in=batch).update(db_value=f"#{keeper}")
+        for attr_id in attr_ids:
+            cached = Attribute.get_cached_instance(attr_id)
+            if cached is not None:
+                cached.db_value = f"#{keeper}"
+        _forget_rooms(room_ids)
+    delete_tiles(doomed)
+
+
+def _unlink_rooms(report: IntegrityReport) -> None:
+    attr_ids = list(_room_link_attributes(report.broken_rooms).values())
+    for batch in chunked(attr_ids):
+        Attribute.objects.filter(id__in=batch).delete()
+    _forget_rooms(report.broken_rooms)
+
+
+def _fix_resource_tags(report: IntegrityReport) -> None:
+    remove, add = [], {}
+    for obj_id, (kind, _keys) in report.resource_tags.items():
+        expected = f"{RESOURCE_TAG_PREFIX}{kind}" if kind else None
+        held = report._resource_tag_ids.get(obj_id, ())
+        remove.extend((obj_id, tag_id) for tag_id, key in held if key != expected)
+        if expected is not None and expected not in {key for _tag_id, key in held}:
+            add[obj_id] = expected
+    _retag(remove, add, RESOURCE_TAG_CATEGORY)
+
+
+@transaction.atomic
+def repair(report: IntegrityReport) -> None:
+    """Fix every problem in `report` (from `scan`) in one transaction."""
+    _fix_tile_tags(report)
+    _merge_duplicates(report)
+    _unlink_rooms(report)
+    _fix_resource_tags(report)
+    coord_index.reset()
+    room_index.reset()
+    occupancy_index.reset()
+    hexworld.reset()
@@ -0,0 +1,225 @@
+"""Light spilling between rooms through exits.
+
+A room's own light (what its contents give off) partly shows in the rooms
+its exits lead to: each exit passes on its `light_spill` fraction, and light
+travels at most SPILL_RADIUS exits away, getting weaker with every one.
+
+`spill_graph` holds the exits as a process-wide adjacency graph, read from
+the database in two queries on first use. For each room it works out, once,
+which rooms it lights and how strongly (`targets`) and which rooms light it
+(`sources`), so a change in one room's light updates only the rooms within
+the radius. Exits update it themselves when they are created, deleted,
+moved or relinked, or their `light_spill` Attribute changes (however it is
+set, see `SpillAttributeHandler`); only the rooms near them recount.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import AttributeHandler
+from evennia.utils.utils import make_iter
+
+from world.hexstore import load_attribute
+
+# Fraction of a room's light that shows through an exit, unless the exit sets its own.
+DEFAULT_SPILL = 0.25
+# Light spills at most this many exits away.
+SPILL_RADIUS = 2
+SPILL_KEY = "light_spill"
+
+
+def _reach(edges: dict[int, dict[int, float]], origin: int, radius: int) -> dict[int, float]:
+    """Strongest spill factor from `origin` to each room within `radius` steps."""
+    best: dict[int, float] = {}
+    frontier = {origin: 1.0}
+    for _step in range(radius):
+        following: dict[int, float] = {}
+        for room_id, factor in frontier.items():
+            for other_id, spill in edges.get(room_id, {}).items():
+                reached = factor * spill
+                if other_id != origin and reached > best.get(other_id, 0.0):
+                    best[other_id] = following[other_id] = reached
+        frontier = following
+    return best
+
+
+def _spill_of(value) -> float:
+    """An exit's `light_spill` as a fraction, falling back to DEFAULT_SPILL."""
+    try:
+        return max(0.0, min(float(value), 1.0))
+    except (TypeError, ValueError):
+        return DEFAULT_SPILL
+
+
+class SpillGraph:
+    """Process-wide graph of how much light passes between rooms."""
+
+    def __init__(self, radius: int = SPILL_RADIUS) -> None:
+        self.radius = radius
+        self._out: dict[int, dict[int, float]] | None = None
+        self._in: dict[int, dict[int, float]] = {}
+        # exit id -> (room id, destination id, spill), and the exits linking each pair of rooms
+        self._exits: dict[int, tuple[int, int, float]] = {}
+        self._links: dict[tuple[int, int], dict[int, float]] = {}
+        self._targets: dict[int, dict[int, float]] = {}
+        self._sources: dict[int, dict[int, float]] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._out is not None
+
+    def build(self) -> None:
+        """(Re)build the graph from every exit in the database."""
+        # Imported here, since typeclasses.exits imports this module.
+        from typeclasses.exits import Exit
+
+        exits = Exit.objects.all_family().filter(db_location__isnull=False, db_destination__isnull=False)
+        spills = load_attribute(SPILL_KEY, queryset=exits)
+        self._out = defaultdict(dict)
+        self._in = defaultdict(dict)
+        self._exits = {}
+        self._links = defaultdict(dict)
+        for exit_id, room_id, other_id in exits.values_list("id", "db_location_id", "db_destination_id"):
+            self._link(exit_id, room_id, other_id, _spill_of(spills.get(exit_id, DEFAULT_SPILL)))
+        self._targets = {}
+        self._sources = {}
+
+    def reset(self) -> None:
+        """Forget the graph, and the spilled light of the rooms that used it."""
+        for room_id in self._sources:
+            room = ObjectDB.get_cached_instance(room_id)
+            if room is not None:
+                room.ndb.light_spill = None
+        self._out = None
+        self._in = {}
+        self._exits = {}
+        self._links = {}
+        self._targets = {}
+        self._sources = {}
+
+    def update_exit(self, exit) -> None:
+        """Follow a created, moved or relinked exit, or a changed `light_spill`.
+
+        Only the rooms within the radius of the exit's ends (before and after
+        the change) forget their targets, sources and spilled light.
+        """
+        if self._out is None:
+            return  # read as it is when first built
+        location, destination = exit.location, exit.destination
+        if location is None or destination is None:
+            self.remove_exit(exit.id)
+        else:
+            spill = _spill_of(exit.attributes.get(SPILL_KEY, default=DEFAULT_SPILL))
+            self._relink(exit.id, (location.id, destination.id, spill))
+
+    def remove_exit(self, exit_id: int) -> None:
+        """Follow a deleted (or unlinked) exit."""
+        self._relink(exit_id, None)
+
+    def _relink(self, exit_id: int, link: tuple[int, int, float] | None) -> None:
+        if self._out is None:
+            return  # read as it is when first built
+        old = self._exits.get(exit_id)
+        if old == link:
+            return
+        ends = {room_id for each in (old, link) if each for room_id in each[:2]}
+        near = self._near(ends)
+        if old:
+            self._unlink(exit_id, *old[:2])
+        if link:
+            self._link(exit_id, *link)
+        self._forget(near | self._near(ends))
+
+    def _link(self, exit_id: int, room_id: int, other_id: int, spill: float) -> None:
+        self._exits[exit_id] = (room_id, other_id, spill)
+        if room_id != other_id:
+            self._links[room_id, other_id][exit_id] = spill
+            self._set_edge(room_id, other_id)
+
+    def _unlink(self, exit_id: int, room_id: int, other_id: int) -> None:
+        del self._exits[exit_id]
+        links = self._links.get((room_id, other_id), {})
+        links.pop(exit_id, None)
+        if not links:
+            self._links.pop((room_id, other_id), None)
+        self._set_edge(room_id, other_id)
+
+    def _set_edge(self, room_id: int, other_id: int) -> None:
+        """Make the edge between two rooms the strongest of the exits linking them."""
+        spill = max(self._links.get((room_id, other_id), {}).values(), default=0.0)
+        if spill:
+            self._out[room_id][other_id] = self._in[other_id][room_id] = spill
+        else:
+            self._out[room_id].pop(other_id, None)
+            self._in[other_id].pop(room_id, None)
+
+    def _near(self, room_ids: set[int]) -> set[int]:
+        """`room_ids` and the rooms within the radius of them, either way along the exits."""
+        near = set(room_ids)
+        frontier = set(room_ids)
+        for _step in range(self.radius):
+            frontier = {
+                other_id
+                for room_id in frontier
+                for edges in (self._out, self._in)
+                for other_id in edges.get(room_id, ())
+                if other_id not in near
+            }
+            near |= frontier
+        return near
+
+    def _forget(self, room_ids: set[int]) -> None:
+        for room_id in room_ids:
+            self._targets.pop(room_id, None)
+            if self._sources.pop(room_id, None) is not None:
+                room = ObjectDB.get_cached_instance(room_id)
+                if room is not None:
+                    room.ndb.light_spill = None
+
+    def _built(self) -> dict[int, dict[int, float]]:
+        if self._out is None:
+            self.build()
+        return self._out
+
+    def targets(self, room_id: int) -> dict[int, float]:
+        """`{room_id: factor}` of the rooms `room_id` spills light into."""
+        out = self._built()
+        if room_id not in self._targets:
+            self._targets[room_id] = _reach(out, room_id, self.radius)
+        return self._targets[room_id]
+
+    def sources(self, room_id: int) -> dict[int, float]:
+        """`{room_id: factor}` of the rooms spilling light into `room_id`."""
+        self._built()
+        if room_id not in self._sources:
+            self._sources[room_id] = _reach(self._in, room_id, self.radius)
+        return self._sources[room_id]
+
+
+spill_graph = SpillGraph()
+
+
+class SpillAttributeHandler(AttributeHandler):
+    """Exit Attributes; changing `light_spill` updates `spill_graph`.
+
+    Covers the `light_spill` AttributeProperty, `db` and builder commands
+    such as `@set` alike, since they all go through the handler.
+    """
+
+    def add(self, key, value, category=None, **kwargs):
+        super().add(key, value, category=category, **kwargs)
+        if key == SPILL_KEY and category is None:
+            spill_graph.update_exit(self.obj)
+
+    def remove(self, key=None, category=None, **kwargs):
+        result = super().remove(key=key, category=category, **kwargs)
+        if category is None and (key is None or SPILL_KEY in make_iter(key)):
+            spill_graph.update_exit(self.obj)
+        return result
+
+    def clear(self, category=None, **kwargs):
+        super().clear(category=category, **kwargs)
+        if category is None:
+            spill_graph.update_exit(self.obj)
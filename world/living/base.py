@@ -6,6 +6,13 @@ from world.utils import null_func
 from evennia.utils.utils import lazy_property
 
 
+def _occupancy_index():
+    """Return the process-wide hex occupancy index (imported lazily to avoid a cycle)."""
+    from world.hexstore import occupancy_index
+
+    return occupancy_index
+
+
 class LivingMixin(MetabolismMixin, PerceptionMixin):
     default_weight = 60000
 
@@ -22,6 +29,14 @@ class LivingMixin(MetabolismMixin, PerceptionMixin):
         self.tags.add("living_being", category="living_state")
         self.weight.value = self.default_weight
 
+    def at_post_move(self, source_location, move_type="move", **kwargs):
+        super().at_post_move(source_location, move_type=move_type, **kwargs)
+        _occupancy_index().place(self)
+
+    def at_object_delete(self):
+        _occupancy_index().discard(self.id)
+        return super().at_object_delete()
+
     def load_cmdset(self):
         getattr(super(), "load_cmdset", null_func)()
 
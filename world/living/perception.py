@@ -1,6 +1,170 @@
+from bisect import bisect_right, insort
+
 from evennia.utils.utils import lazy_property
+from twisted.internet import reactor
 from world.utils import null_func
 
+# Light reaches a room from its contents and from their contents (a torch
+# held by an occupant or lying in an open crate), not from deeper down.
+LIGHT_DEPTH = 2
+
+# Seconds an unsaved `EphemeralLight(persist=True)` level waits before it is written.
+LIGHT_WRITE_DELAY = 30.0
+
+
+def light_of(obj) -> int:
+    """Light emitted by `obj` itself, 0..100.
+
+    An in-memory level held by an `EphemeralLight` wins over the one stored
+    by a `LightManager`.
+    """
+    level = obj.ndb.light_level
+    if level is None:
+        level = obj.attributes.get("light_level", default=0, category="vision")
+    try:
+        level = int(level or 0)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(level, 100))
+
+
+def carried_light(obj) -> int:
+    """Light emitted by the objects directly inside `obj`."""
+    return sum(light_of(item) for item in obj.contents)
+
+
+def _lit_from(location, own: int, carried: int):
+    """Yield `(room, delta)` for the rooms lit from `location` (see `spread_light`)."""
+    if location is None:
+        return
+    if getattr(location, "adjust_light", None) is not None:
+        yield location, own + carried
+    parent = location.location
+    if parent is not None and LIGHT_DEPTH > 1 and getattr(parent, "adjust_light", None) is not None:
+        yield parent, own
+
+
+def spread_light(location, own: int, carried: int = 0) -> None:
+    """Adjust the cached light of the rooms lit from `location`.
+
+    `own` is the change in light of something directly inside `location`
+    and `carried` the change in light of what that something contains, which
+    is one level deeper and so only reaches `location` itself.
+    """
+    if not (own or carried):
+        return
+    for room, delta in _lit_from(location, own, carried):
+        if delta:
+            room.adjust_light(delta)
+
+
+def shine(obj, delta: int) -> None:
+    """Pass a change of `delta` in `obj`'s own light to the rooms it lights.
+
+    A room that counts its own light (see `Room.lights_itself`) is one of them.
+    """
+    if delta and getattr(obj, "lights_itself", False):
+        obj.adjust_light(delta)
+    spread_light(obj.location, delta)
+
+
+def move_light(source, target, own: int, carried: int = 0) -> None:
+    """Move light from the rooms lit from `source` to those lit from `target`.
+
+    Each room is adjusted once by its net change, so a torch picked up or
+    put down in the same room doesn't make that room flicker.
+    """
+    if not (own or carried):
+        return
+    deltas: dict = {}
+    for room, delta in _lit_from(source, -own, -carried):
+        deltas[room] = deltas.get(room, 0) + delta
+    for room, delta in _lit_from(target, own, carried):
+        deltas[room] = deltas.get(room, 0) + delta
+    for room, delta in deltas.items():
+        if delta:
+            room.adjust_light(delta)
+
+
+def room_light(location, looker=None) -> int:
+    """Ambient light in `location`, 0..100.
+
+    Rooms keep their light total cached; any other container is lit by
+    itself and its direct contents.
+    """
+    if location is None:
+        return 0
+    get_light_level = getattr(location, "get_light_level", None)
+    if get_light_level is not None:
+        return get_light_level(looker=looker)
+    return max([light_of(location)] + [light_of(obj) for obj in location.contents])
+
+
+def split_by_sight(location, recipients) -> tuple[list, list]:
+    """Split `recipients` in `location` into those who see and those who only hear.
+
+    The location's light is read once for the whole group. Recipients
+    without vision (e.g. plain objects) count as seeing.
+    """
+    light = room_light(location)
+    sees, hears = [], []
+    for recipient in recipients:
+        vision = getattr(recipient, "vision", None)
+        if vision is None or vision.sees_in(light):
+            sees.append(recipient)
+        else:
+            hears.append(recipient)
+    return sees, hears
+
+
+def broadcast(location, text, sound, from_obj=None, **kwargs):
+    """Send `text` to those in `location` who can see it and `sound` to the rest.
+
+    Sight is decided once per message with `split_by_sight`. The seeing
+    get `text` through `msg_contents`, so `$You()`-style markup is still
+    rendered for each of them; the others all get the same `sound`.
+    """
+    _sees, hears = split_by_sight(location, location.contents)
+    location.msg_contents(text, exclude=set(hears), from_obj=from_obj, **kwargs)
+    for recipient in hears:
+        recipient.msg(sound, from_obj=from_obj)
+
+
+class SightIndex:
+    """Beings in a room sorted by the light they need to see.
+
+    When the room's light goes from `before` to `after`, exactly those whose
+    threshold lies between the two start or stop seeing, and they are found
+    by bisecting instead of asking every occupant.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple] = []
+        self._entries: dict[int, tuple] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, obj) -> None:
+        """Index `obj` under its current light threshold, replacing any old entry."""
+        self.remove(obj)
+        key = (obj.vision.light_threshold, obj.id)
+        self._entries[obj.id] = (key, obj)
+        insort(self._keys, key)
+
+    def remove(self, obj) -> None:
+        entry = self._entries.pop(obj.id, None)
+        if entry is not None:
+            self._keys.pop(bisect_right(self._keys, entry[0]) - 1)
+
+    def crossed(self, before: int, after: int) -> list:
+        """Return `(obj, sees)` for those whose sight changes between the two light levels."""
+        low, high = sorted((before, after))
+        start = bisect_right(self._keys, (low, float("inf")))
+        end = bisect_right(self._keys, (high, float("inf")))
+        sees = after > before
+        return [(self._entries[obj_id][1], sees) for _threshold, obj_id in self._keys[start:end]]
+
 
 class MsgObj(object):
     def __init__(self, visual=None, sound=None):
@@ -49,6 +213,9 @@ class VisionManager:
     def light_threshold(self, value):
         self._light_threshold = value
         self._save()
+        resort = getattr(self.obj.location, "update_sight", None)
+        if resort is not None:
+            resort(self.obj)
 
     @property
     def disabled(self):
@@ -56,19 +223,11 @@ class VisionManager:
 
     @property
     def can_see(self):
-        if self.disabled:
-            return False
-        light_level = self._get_light_level(self.obj.location)
-        if light_level >= self.light_threshold:
-            return True
-        for obj in self.obj.location.contents:
-            light_level = max(light_level, self._get_light_level(obj))
-        return light_level >= self.light_threshold
-
-    def _get_light_level(self, obj):
-        if obj.tags.has("light_source", category="vision"):
-            return obj.light.level
-        return 0
+        return self.sees_in(room_light(self.obj.location, looker=self.obj))
+
+    def sees_in(self, light: int) -> bool:
+        """Whether this viewer can see at ambient `light` (0..100)."""
+        return not self.disabled and light >= self.light_threshold
 
     def can_receive_message(self, msg_obj: MsgObj):
         if msg_obj.has_visual():
@@ -104,6 +263,12 @@ class PerceptionMixin:
                 text = msg_obj.sound
         return super().msg(text, from_obj, **kwargs)
 
+    def at_sight_change(self, sees: bool):
+        """Called when the light around us crosses our light threshold."""
+        if self.vision.disabled:
+            return
+        self.msg("You can see again." if sees else "It's now too dark to see anything.")
+
     def at_look(self, target, **kwargs):
         if self.vision.disabled:
             return "You can't see anything."
@@ -122,11 +287,7 @@ class LightManager:
         self._light_level = self.obj.attributes.get("light_level", default=0, category="vision")
 
     def _save(self):
-        self.obj.attributes.add("light_level", self._light_level, category="vision")
-        if self._light_level > 0:
-            self.obj.tags.add("light_source", category="vision")
-        else:
-            self.obj.tags.remove("light_source", category="vision")
+        _store_light(self.obj, self._light_level)
         self._load()
 
     @property
@@ -135,5 +296,80 @@ class LightManager:
 
     @level.setter
     def level(self, value):
+        before = light_of(self.obj)
         self._light_level = value
-        self._save()
\ No newline at end of file
+        self.obj.ndb.light_level = None
+        _unsaved.pop(self.obj.id, None)
+        self._save()
+        shine(self.obj, light_of(self.obj) - before)
+
+
+def _store_light(obj, level) -> None:
+    obj.attributes.add("light_level", level, category="vision")
+    if level > 0:
+        obj.tags.add("light_source", category="vision")
+    else:
+        obj.tags.remove("light_source", category="vision")
+
+
+# Objects whose EphemeralLight level is waiting to be written, by id.
+_unsaved: dict = {}
+_flush_call = None
+
+
+def flush_lights() -> int:
+    """Write every unsaved persistent `EphemeralLight` level; return how many."""
+    global _flush_call
+    if _flush_call is not None and _flush_call.active():
+        _flush_call.cancel()
+    _flush_call = None
+    pending = list(_unsaved.values())
+    _unsaved.clear()
+    for obj in pending:
+        if obj.pk:
+            _store_light(obj, light_of(obj))
+    return len(pending)
+
+
+class EphemeralLight:
+    """Light held in memory only, or computed on every read.
+
+    Unlike `LightManager`, creating one or reading its level never touches
+    the database. The level lives in `obj.ndb`, where `light_of` and the
+    cached room light see it. With `persist=True` changes are also written
+    to the 'light_level' Attribute, LIGHT_WRITE_DELAY seconds later (or at
+    `flush_lights()`), so a burst of changes costs one write.
+
+    Args:
+        obj: The object giving off the light.
+        level: Initial level; None keeps the current one.
+        compute: Optional callable returning the level (e.g. sunlight). Such
+            a light can't be set, and rooms don't cache it.
+        persist: Write the level behind to the database.
+    """
+
+    def __init__(self, obj, level=None, compute=None, persist=False):
+        self.obj = obj
+        self.compute = compute
+        self.persist = persist
+        if level is not None:
+            self.level = level
+
+    @property
+    def level(self):
+        if self.compute is not None:
+            return self.compute()
+        return light_of(self.obj)
+
+    @level.setter
+    def level(self, value):
+        global _flush_call
+        if self.compute is not None:
+            raise TypeError("a computed light level can't be set")
+        before = light_of(self.obj)
+        self.obj.ndb.light_level = value
+        shine(self.obj, light_of(self.obj) - before)
+        if self.persist:
+            _unsaved[self.obj.id] = self.obj
+            if _flush_call is None:
+                _flush_call = reactor.callLater(LIGHT_WRITE_DELAY, flush_lights)
\ No newline at end of file
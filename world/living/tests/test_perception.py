@@ -2,9 +2,20 @@
 Tests for the perception system.
 """
 import unittest
+from unittest.mock import patch
 from evennia.utils.test_resources import EvenniaTest
 from evennia import create_object
-from world.living.perception import MsgObj, VisionManager, PerceptionMixin, LightManager
+from world.living.perception import (
+    EphemeralLight,
+    LightManager,
+    MsgObj,
+    PerceptionMixin,
+    VisionManager,
+    broadcast,
+    flush_lights,
+    light_of,
+    split_by_sight,
+)
 
 
 class TestMsgObj(EvenniaTest):
@@ -250,3 +261,70 @@ class TestLightManager(EvenniaTest):
         # Set light level to 0, should not have tag
         new_light_manager.level = 0
         self.assertFalse(self.light_obj.tags.has("light_source", category="vision"))
+
+
+class TestBroadcast(EvenniaTest):
+    """Test suite for splitting room messages by sight."""
+
+    def setUp(self):
+        super().setUp()
+        self.seer = create_object("world.living.people.Person", key="Seer", location=self.room1)
+        self.blind = create_object("world.living.people.Person", key="Blind", location=self.room1)
+        self.torch = create_object("typeclasses.objects.Object", key="torch", location=self.room1)
+        LightManager(self.torch, 30)
+        self.blind.vision.light_threshold = 50
+
+    def test_split_by_sight(self):
+        """Test recipients are split by their own threshold against one light reading."""
+        with patch.object(type(self.room1), "get_light_level", autospec=True, return_value=30) as light:
+            sees, hears = split_by_sight(self.room1, [self.seer, self.blind, self.torch])
+        self.assertEqual(light.call_count, 1)
+        self.assertEqual(sees, [self.seer, self.torch])
+        self.assertEqual(hears, [self.blind])
+
+    def test_broadcast(self):
+        """Test the seeing get the rendered text and the rest only the sound."""
+        with patch.object(type(self.seer), "msg", autospec=True) as msg:
+            broadcast(self.room1, "$You() $conj(wave).", "You hear rustling.", from_obj=self.seer)
+        sent = {call.args[0]: call.args[1] if len(call.args) > 1 else call.kwargs["text"] for call in msg.call_args_list}
+        self.assertEqual(sent[self.seer][0], "You wave.")
+        self.assertEqual(sent[self.blind], "You hear rustling.")
+
+
+class TestEphemeralLight(EvenniaTest):
+    """Test suite for in-memory light sources."""
+
+    def setUp(self):
+        super().setUp()
+        self.wisp = create_object("typeclasses.objects.Object", key="wisp", location=self.room1)
+        self.room1.get_light_level()
+
+    def test_no_writes(self):
+        """Test creating, setting and reading an ephemeral light touches no DB."""
+        with self.assertNumQueries(0):
+            light = EphemeralLight(self.wisp, 40)
+            self.assertEqual(light.level, 40)
+            self.assertEqual(self.room1.get_light_level(), 40)
+            light.level = 10
+            self.assertEqual(self.room1.get_light_level(), 10)
+        self.assertIsNone(self.wisp.attributes.get("light_level", category="vision"))
+
+    def test_computed(self):
+        """Test a computed light is read each time and can't be set."""
+        levels = iter([10, 20])
+        light = EphemeralLight(self.wisp, compute=lambda: next(levels))
+        self.assertEqual((light.level, light.level), (10, 20))
+        with self.assertRaises(TypeError):
+            light.level = 5
+
+    def test_write_behind(self):
+        """Test persistent ephemeral lights are written once, on flush."""
+        light = EphemeralLight(self.wisp, 30, persist=True)
+        light.level = 60
+        self.assertIsNone(self.wisp.attributes.get("light_level", category="vision"))
+        self.assertEqual(flush_lights(), 1)
+        self.assertEqual(self.wisp.attributes.get("light_level", category="vision"), 60)
+        self.assertTrue(self.wisp.tags.has("light_source", category="vision"))
+        self.wisp.ndb.light_level = None
+        self.assertEqual(light_of(self.wisp), 60)
+        self.assertEqual(flush_lights(), 0)
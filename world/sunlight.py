@@ -0,0 +1,128 @@
+"""Shared sunlight clock for outdoor rooms.
+
+Sunlight only depends on the in-game time of day, so it is the same in
+every `ExternalRoom`. `sunlight_clock` reads the custom game time at most
+once per in-game minute and remembers the level per dawn/dusk schedule
+until the minute is over, so rooms read it as a plain number. Call
+`sunlight_clock.start()` (done at server start) to also re-check it every
+in-game minute, so that `subscribe`d callbacks hear about changes even
+when no room is asking.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from evennia.contrib.base_systems import custom_gametime
+from twisted.internet import task
+
+# In-game hours of (dawn start, dawn end, dusk start, dusk end).
+DEFAULT_SCHEDULE = (5, 7, 18, 20)
+
+Schedule = tuple[float, float, float, float]
+
+
+def sunlight_level(hours: float, schedule: Schedule = DEFAULT_SCHEDULE) -> int:
+    """Sunlight 0..100 at `hours` into the day, ramping up at dawn and down at dusk."""
+    dawn_start, dawn_end, dusk_start, dusk_end = (float(hour) for hour in schedule)
+    if hours < dawn_start or hours >= dusk_end:
+        return 0
+    if hours < dawn_end:
+        frac = (hours - dawn_start) / max(dawn_end - dawn_start, 1e-6)
+        return int(round(100.0 * max(0.0, min(frac, 1.0))))
+    if hours >= dusk_start:
+        frac = (hours - dusk_start) / max(dusk_end - dusk_start, 1e-6)
+        return int(round(100.0 * (1.0 - max(0.0, min(frac, 1.0)))))
+    return 100
+
+
+class SunlightClock:
+    """Sunlight level computed once per in-game minute.
+
+    Args:
+        game_time: Returns the in-game `(year, month, day, hour, min, sec)`.
+        monotonic: Real-time clock, in seconds.
+    """
+
+    def __init__(self, game_time: Optional[Callable[[], tuple]] = None, monotonic: Callable[[], float] = time.monotonic):
+        self._game_time = game_time or (lambda: custom_gametime.custom_gametime(absolute=True))
+        self._monotonic = monotonic
+        self._hours = 0.0
+        self._expires = float("-inf")
+        self._levels: dict[Schedule, int] = {}
+        self._notified: dict[Schedule, int] = {}
+        self._subscribers: dict[Schedule, list] = {}
+        self._ticker: Optional[task.LoopingCall] = None
+        self.refreshes = 0
+
+    def _units(self) -> tuple[float, float]:
+        """Game seconds per in-game minute and per hour."""
+        units = getattr(settings, "TIME_UNITS", None) or {}
+        return float(units.get("min", 60)), float(units.get("hour", 3600))
+
+    def _time_factor(self) -> float:
+        return float(getattr(settings, "TIME_FACTOR", 1.0) or 1.0)
+
+    def refresh(self) -> int:
+        """Re-read the game time now; notify subscribers if the sunlight changed."""
+        _year, _month, _day, hour, minute, second = self._game_time()
+        per_minute, per_hour = self._units()
+        self._hours = float(hour) + float(minute) * per_minute / per_hour
+        self._expires = self._monotonic() + max(per_minute - float(second), 1.0) / self._time_factor()
+        self._levels.clear()
+        self.refreshes += 1
+        for schedule, callbacks in list(self._subscribers.items()):
+            before, after = self._notified.get(schedule), self.level(schedule)
+            self._notified[schedule] = after
+            if before is not None and before != after:
+                for callback in list(callbacks):
+                    callback(before, after)
+        return self.level()
+
+    @property
+    def hours(self) -> float:
+        """In-game hours into the day, to the minute."""
+        if self._monotonic() >= self._expires:
+            self.refresh()
+        return self._hours
+
+    def level(self, schedule: Schedule = DEFAULT_SCHEDULE) -> int:
+        """Current sunlight 0..100 under `schedule`."""
+        if self._monotonic() >= self._expires:
+            self.refresh()
+        level = self._levels.get(schedule)
+        if level is None:
+            level = self._levels[schedule] = sunlight_level(self._hours, schedule)
+        return level
+
+    def subscribe(self, callback, schedule: Schedule = DEFAULT_SCHEDULE) -> None:
+        """Call `callback(old, new)` when the sunlight under `schedule` changes."""
+        self._subscribers.setdefault(schedule, []).append(callback)
+
+    def unsubscribe(self, callback, schedule: Schedule = DEFAULT_SCHEDULE) -> None:
+        callbacks = self._subscribers.get(schedule, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def start(self) -> None:
+        """Re-check the sunlight every in-game minute on the reactor."""
+        if self._ticker is None:
+            per_minute, _per_hour = self._units()
+            self._ticker = task.LoopingCall(self.refresh)
+            self._ticker.start(per_minute / self._time_factor(), now=True)
+
+    def stop(self) -> None:
+        if self._ticker is not None:
+            if self._ticker.running:
+                self._ticker.stop()
+            self._ticker = None
+
+    def reset(self) -> None:
+        """Forget the cached time; it is read again on next use."""
+        self._expires = float("-inf")
+        self._levels.clear()
+
+
+sunlight_clock = SunlightClock()
@@ -0,0 +1 @@
+# Tests for world module
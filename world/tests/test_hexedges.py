@@ -0,0 +1,83 @@
+"""
+Tests for hex edge features.
+"""
+from evennia.utils.test_resources import EvenniaTestCase
+from typeclasses.hextile import HexTile
+from world.hexedges import CLIFF, RIVER, ROAD, HexEdges, direction_between, edge_slot, feature_flags
+from world.hexmap import CubeCoord, HexMap
+from world.tests.test_hexmap import HexTestCase
+
+
+class TestHexEdges(EvenniaTestCase):
+    """Test suite for the packed edge store."""
+
+    def test_edge_is_shared(self):
+        """Test both hexes of an edge see the same flags, stored once."""
+        edges = HexEdges()
+        self.assertTrue(edges.set(0, 0, 4, RIVER))
+        self.assertFalse(edges.set(-1, 0, 1, RIVER))
+        self.assertEqual(edges.get(-1, 0, 1), RIVER)
+        self.assertEqual(edge_slot(0, 0, 4), (-1, 0, 1))
+        self.assertEqual(len(edges), 1)
+        self.assertEqual(list(edges.items()), [(-1, 0, 1, RIVER)])
+        edges.set(0, 0, 4, 0)
+        self.assertEqual(len(edges), 0)
+
+    def test_items_in_box(self):
+        """Test a region query finds edges touching the box from either side."""
+        edges = HexEdges()
+        edges.set(0, 0, 0, ROAD)
+        edges.set(5, 5, 1, CLIFF)
+        edges.set(3, 3, 3, RIVER)
+        self.assertEqual(set(edges.items_in_box(3, 3, 4, 4)), {(2, 4, 0, RIVER)})
+        self.assertEqual(len(list(edges.items_in_box(-10, -10, 10, 10))), 3)
+
+    def test_helpers(self):
+        """Test adjacency and feature name helpers."""
+        self.assertEqual(direction_between((0, 0), (1, 0)), 1)
+        with self.assertRaises(ValueError):
+            direction_between((0, 0), (2, 0))
+        self.assertEqual(feature_flags(["road", "river"]), ROAD | RIVER)
+        with self.assertRaises(ValueError):
+            feature_flags(["lava"])
+
+
+class TestHexMapEdges(HexTestCase):
+    """Test suite for edge features on HexMap."""
+
+    def setUp(self):
+        super().setUp()
+        self.hm = HexMap()
+        self.a, self.b, self.c = CubeCoord(0, 0, 0), CubeCoord(1, 0, -1), CubeCoord(1, -1, 0)
+        for coord in (self.a, self.b, self.c):
+            self.hm.add_tile(coord, "plain")
+
+    def test_set_and_query(self):
+        """Test edges need both tiles and are listed by region."""
+        self.hm.set_edge(self.a, self.b, ROAD)
+        self.hm.add_edge_feature(self.b, self.a, RIVER)
+        self.hm.set_edge(self.b, self.c, CLIFF)
+        self.assertEqual(self.hm.edge_flags(self.b, self.a), ROAD | RIVER)
+        with self.assertRaises(KeyError):
+            self.hm.set_edge(self.a, CubeCoord(-1, 0, 1), ROAD)
+        self.assertEqual(
+            set(self.hm.edges_in_box(0, 0, 0, 0)), {(self.a, self.b, ROAD | RIVER)}
+        )
+        self.hm.remove_tile(self.b)
+        self.assertEqual(len(self.hm.edges), 0)
+
+    def test_save_and_load(self):
+        """Test edges persist as one Attribute per owning tile."""
+        self.hm.set_edge(self.a, self.b, ROAD)
+        self.hm.set_edge(self.c, self.b, RIVER)
+        self.hm.save_all()
+        self.assertFalse(self.hm.is_dirty)
+        self.assertEqual(HexTile.get_by_coords(0, 0, 0).attributes.get("edges"), ROAD << 8)
+
+        loaded = HexMap.load_all(edges=True)
+        self.assertEqual(loaded.edge_flags(self.b, self.a), ROAD)
+        self.assertEqual(loaded.edge_flags(self.b, self.c), RIVER)
+        loaded.remove_edge_feature(self.a, self.b, ROAD)
+        loaded.save_all()
+        self.assertEqual(HexMap.load_all(edges=True).edge_flags(self.a, self.b), 0)
+        self.assertEqual(len(HexMap.load_all().edges), 0)
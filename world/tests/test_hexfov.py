@@ -0,0 +1,77 @@
+"""
+Tests for the elevation-aware field of view.
+"""
+from evennia.utils.test_resources import EvenniaTestCase
+from world.hexfov import HexFieldOfView
+from world.hexgrid import hex_distance
+from world.hexmap import CubeCoord, HexMap
+
+
+def disk_map(radius, terrain="plain"):
+    hm = HexMap.compact()
+    for q in range(-radius, radius + 1):
+        for r in range(-radius, radius + 1):
+            if hex_distance((q, r), (0, 0)) <= radius:
+                hm.add_tile(CubeCoord.from_axial(q, r), terrain)
+    return hm
+
+
+class TestHexFieldOfView(EvenniaTestCase):
+    """Test suite for HexFieldOfView."""
+
+    def test_flat_ground_sees_everything(self):
+        """Test nothing blocks the view over flat terrain."""
+        hm = disk_map(5)
+        fov = HexFieldOfView(hm)
+        self.assertEqual(len(fov.visible(CubeCoord(0, 0, 0), 5)), len(hm))
+
+    def test_mountain_casts_shadow(self):
+        """Test a mountain hides the low ground behind it but stays visible itself."""
+        hm = disk_map(6)
+        hm.add_tile(CubeCoord(2, 0, -2), "mountain")
+        fov = HexFieldOfView(hm)
+        seen = fov.visible(CubeCoord(0, 0, 0), 6)
+        self.assertIn(CubeCoord(2, 0, -2), seen)
+        self.assertNotIn(CubeCoord(4, 0, -4), seen)
+        self.assertNotIn(CubeCoord(6, 0, -6), seen)
+        self.assertIn(CubeCoord(-4, 0, 4), seen)
+        self.assertFalse(fov.can_see(CubeCoord(0, 0, 0), CubeCoord(5, 0, -5)))
+
+    def test_high_ground_behind_ridge_is_visible(self):
+        """Test a peak taller than the ridge in front of it can be seen."""
+        heights = {(2, 0): 4, (5, 0): 20}
+        hm = disk_map(6)
+        fov = HexFieldOfView(hm, elevation=heights)
+        seen = fov.visible(CubeCoord(0, 0, 0), 6)
+        self.assertNotIn(CubeCoord(4, 0, -4), seen)
+        self.assertIn(CubeCoord(5, 0, -5), seen)
+
+    def test_uses_map_elevation_layer(self):
+        """Test the map's own elevation layer overrides terrain heights."""
+        hm = disk_map(6)
+        hm.set_value(CubeCoord(2, 0, -2), "elevation", 30.0)
+        seen = HexFieldOfView(hm).visible(CubeCoord(0, 0, 0), 6)
+        self.assertIn(CubeCoord(2, 0, -2), seen)
+        self.assertNotIn(CubeCoord(5, 0, -5), seen)
+
+    def test_cache_and_invalidation(self):
+        """Test results are cached per origin and radius until the map changes."""
+        hm = disk_map(4)
+        fov = HexFieldOfView(hm)
+        origin = CubeCoord(0, 0, 0)
+        first = fov.visible(origin, 4)
+        self.assertIs(fov.visible(origin, 4), first)
+        self.assertEqual(fov.hits, 1)
+
+        hm.add_tile(CubeCoord(1, 0, -1), "mountain")
+        self.assertNotEqual(fov.visible(origin, 4), first)
+        self.assertEqual(fov.misses, 2)
+
+    def test_batch_and_missing_origin(self):
+        """Test batch queries and origins off the map."""
+        hm = disk_map(3)
+        fov = HexFieldOfView(hm)
+        origins = [CubeCoord(0, 0, 0), CubeCoord(1, -1, 0), CubeCoord(9, -9, 0)]
+        result = fov.visible_many(origins, 2)
+        self.assertEqual(result[CubeCoord(0, 0, 0)], fov.visible(CubeCoord(0, 0, 0), 2))
+        self.assertEqual(result[CubeCoord(9, -9, 0)], frozenset())
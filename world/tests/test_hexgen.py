@@ -0,0 +1,96 @@
+"""
+Tests for the procedural world generator.
+"""
+from unittest.mock import patch
+
+from evennia.utils.test_resources import EvenniaTestCase
+from typeclasses.hextile import HexTile
+from world import hexgen, hexworld
+from world.hexgen import TERRAINS, WorldGenerator, noise_row
+from world.hexmap import CubeCoord, HexMap
+from world.hexstore import insert_tiles, iter_tile_coords
+from world.tests.test_hexmap import HexTestCase
+
+
+class TestWorldGenerator(EvenniaTestCase):
+    """Test suite for WorldGenerator."""
+
+    def test_deterministic(self):
+        """Test the same seed gives the same rows and other seeds differ."""
+        box = (-20, -10, 20, 10)
+        first = list(WorldGenerator(5, workers=1).rows(*box))
+        self.assertEqual(first, list(WorldGenerator(5, workers=1).rows(*box)))
+        self.assertNotEqual(first, list(WorldGenerator(6, workers=1).rows(*box)))
+
+    def test_region_independent(self):
+        """Test a hex gets the same terrain whatever region it is generated in."""
+        generator = WorldGenerator(3, workers=1)
+        big = dict(generator.rows(-30, -5, 30, 5))
+        small = dict(generator.rows(-2, 1, 4, 2))
+        self.assertEqual(small[1], big[1][28:35])
+        self.assertEqual(generator.terrain_at(CubeCoord.from_axial(0, 2)), TERRAINS[big[2][30]])
+
+    def test_noise_range(self):
+        """Test noise stays within [0, 1)."""
+        values = noise_row(-100, 100, 7, seed=11, scale=16, octaves=4)
+        self.assertEqual(len(values), 201)
+        self.assertTrue(all(0 <= v < 1 for v in values))
+
+    def test_pool_matches_serial(self):
+        """Test large regions give the same result through the process pool."""
+        box = (0, 0, 40, 150)
+        serial = list(WorldGenerator(9, workers=1).rows(*box))
+        with patch.object(hexgen, "POOL_THRESHOLD", 100):
+            pooled = list(WorldGenerator(9, workers=2).rows(*box))
+        self.assertEqual(serial, pooled)
+
+    def test_generate_into(self):
+        """Test generated tiles land in the map as dirty terrain strings."""
+        hm = HexMap.compact(TERRAINS)
+        count = WorldGenerator(1, workers=1).generate_into(hm, 0, 0, 9, 4)
+        self.assertEqual(count, 50)
+        self.assertEqual(len(hm), 50)
+        self.assertTrue(hm.is_dirty)
+        self.assertIn(hm.get_tile(CubeCoord.from_axial(3, 3)), TERRAINS)
+
+
+class TestGenerateToStore(HexTestCase):
+    """Test suite for streaming generated tiles into the HexTile store."""
+
+    def setUp(self):
+        super().setUp()
+        hexworld.reset()
+        self.addCleanup(hexworld.reset)
+
+    def test_generate_to_store(self):
+        """Test generated tiles are inserted in batches and load back."""
+        generator = WorldGenerator(2, workers=1)
+        self.assertEqual(generator.generate_to_store(0, 0, 5, 4, batch_rows=2), 30)
+        stored = HexMap.load_all()
+        self.assertEqual(len(stored), 30)
+        self.assertEqual(stored.get_tile(CubeCoord.from_axial(5, 4)), generator.terrain_at(CubeCoord.from_axial(5, 4)))
+
+    def test_generate_over_existing_tiles(self):
+        """Test regenerating a region updates its tiles instead of duplicating them."""
+        insert_tiles({(0, 0, 0): "ocean"})
+        generator = WorldGenerator(2, workers=1)
+        generator.generate_to_store(0, 0, 5, 4, batch_rows=2)
+        self.assertEqual(HexTile.objects.all_family().count(), 30)
+        self.assertEqual(HexMap.load_all().get_tile(CubeCoord(0, 0, 0)), generator.terrain_at(CubeCoord(0, 0, 0)))
+
+    def test_overlapping_runs(self):
+        """Test generating two overlapping boxes stores one tile per coordinate."""
+        generator = WorldGenerator(2, workers=1)
+        generator.generate_to_store(0, 0, 5, 4, batch_rows=2)
+        generator.generate_to_store(3, 2, 8, 6, batch_rows=2)
+        coords = [coords for _tile_id, coords in iter_tile_coords()]
+        self.assertEqual(len(coords), len(set(coords)))
+        self.assertEqual(len(coords), 30 + 30 - 3 * 3)
+
+    def test_world_map_follows(self):
+        """Test the shared world map sees generated terrain."""
+        insert_tiles({(1, 1, -2): "ocean"})
+        self.assertEqual(hexworld.world_map().get_tile(CubeCoord(1, 1, -2)), "ocean")
+        generator = WorldGenerator(2, workers=1)
+        generator.generate_to_store(0, 0, 5, 4)
+        self.assertEqual(hexworld.world_map().get_tile(CubeCoord(1, 1, -2)), generator.terrain_at(CubeCoord(1, 1, -2)))
@@ -0,0 +1,121 @@
+"""
+Tests for hex-grid geometry and the HexMap spatial queries.
+"""
+from evennia.utils.test_resources import EvenniaTestCase
+from world.hexgrid import disk_offsets, hex_distance, line, ring_offsets, spiral_offsets
+from world.hexmap import CubeCoord, HexMap
+
+
+def filled_map(factory, radius):
+    hm = factory()
+    for q in range(-radius, radius + 1):
+        for r in range(-radius, radius + 1):
+            if hex_distance((q, r), (0, 0)) <= radius:
+                hm.add_tile(CubeCoord.from_axial(q, r), "plain")
+    return hm
+
+
+class TestOffsetTables(EvenniaTestCase):
+    """Test suite for the precomputed offset tables."""
+
+    def test_sizes(self):
+        """Test ring and disk sizes follow 6k and 3k(k+1)+1."""
+        self.assertEqual(len(ring_offsets(0)), 1)
+        for k in range(1, 6):
+            self.assertEqual(len(ring_offsets(k)), 6 * k)
+            self.assertEqual(len(disk_offsets(k)), 3 * k * (k + 1) + 1)
+            self.assertEqual(set(disk_offsets(k)), set(spiral_offsets(k)))
+
+    def test_ring_distance(self):
+        """Test every ring offset lies at the ring radius, walking adjacent hexes."""
+        offsets = ring_offsets(3).axial
+        for dq, dr in offsets:
+            self.assertEqual(hex_distance((dq, dr), (0, 0)), 3)
+        for a, b in zip(offsets, offsets[1:] + offsets[:1]):
+            self.assertEqual(hex_distance(a, b), 1)
+
+    def test_tables_are_shared(self):
+        """Test repeated calls reuse one table."""
+        self.assertIs(disk_offsets(4), disk_offsets(4))
+
+    def test_negative_radius(self):
+        """Test a negative radius is rejected."""
+        with self.assertRaises(ValueError):
+            disk_offsets(-1)
+
+    def test_flat_offsets(self):
+        """Test flat offsets are row-major deltas."""
+        offsets = ring_offsets(1)
+        self.assertEqual(offsets.flat(10), tuple(dr * 10 + dq for dq, dr in offsets))
+
+
+class TestLine(EvenniaTestCase):
+    """Test suite for hex lines."""
+
+    def test_endpoints_and_steps(self):
+        """Test lines include both ends and step one hex at a time."""
+        points = line((0, 0, 0), (4, -1, -3))
+        self.assertEqual(points[0], (0, 0, 0))
+        self.assertEqual(points[-1], (4, -1, -3))
+        self.assertEqual(len(points), 5)
+        for a, b in zip(points, points[1:]):
+            self.assertEqual(hex_distance(a, b), 1)
+
+    def test_single_point(self):
+        """Test a line to itself is one hex."""
+        self.assertEqual(line((2, -1, -1), (2, -1, -1)), [(2, -1, -1)])
+
+
+class SpatialQueryMixin:
+    """Spatial queries shared by every storage backend."""
+
+    factory = None
+
+    def setUp(self):
+        super().setUp()
+        self.hm = filled_map(type(self).factory, 6)
+
+    def test_within_radius(self):
+        """Test within_radius returns tiles in range and stops at the map edge."""
+        center = CubeCoord(0, 0, 0)
+        self.assertEqual(len(self.hm.within_radius(center, 2)), 19)
+        edge = CubeCoord(6, 0, -6)
+        found = self.hm.within_radius(edge, 1)
+        self.assertEqual(len(found), 4)
+        self.assertTrue(all(self.hm.distance(edge, c) <= 1 for c in found))
+        self.assertTrue(all(c in self.hm for c in found))
+
+    def test_ring_and_spiral(self):
+        """Test ring returns one radius and spiral grows outward."""
+        center = CubeCoord(1, -1, 0)
+        ring = self.hm.ring(center, 2)
+        self.assertEqual(len(ring), 12)
+        self.assertTrue(all(self.hm.distance(center, c) == 2 for c in ring))
+        spiral = self.hm.spiral(center, 2)
+        self.assertEqual(spiral[0], center)
+        distances = [self.hm.distance(center, c) for c in spiral]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_in_box(self):
+        """Test in_box yields tiles inside the axial box only."""
+        found = dict(self.hm.in_box(0, 0, 2, 1))
+        self.assertEqual(len(found), 6)
+        self.assertEqual(found[CubeCoord(2, 1, -3)], "plain")
+        self.assertEqual(list(self.hm.in_box(50, 50, 60, 60)), [])
+
+    def test_batch_queries(self):
+        """Test batch variants agree with the single-center queries."""
+        centers = [CubeCoord(0, 0, 0), CubeCoord(5, 0, -5), CubeCoord(-3, 3, 0)]
+        many = self.hm.within_radius_many(centers, 3)
+        counts = self.hm.count_within_radius(centers, 3)
+        for center in centers:
+            self.assertEqual(many[center], self.hm.within_radius(center, 3))
+            self.assertEqual(counts[center], len(many[center]))
+
+
+class TestDictSpatialQueries(SpatialQueryMixin, EvenniaTestCase):
+    factory = HexMap
+
+
+class TestArraySpatialQueries(SpatialQueryMixin, EvenniaTestCase):
+    factory = HexMap.compact
@@ -0,0 +1,155 @@
+"""
+Tests for streaming hex map imports.
+"""
+import os
+import struct
+import tempfile
+import zlib
+from unittest import mock
+
+from evennia.utils.test_resources import EvenniaTestCase
+from twisted.internet import defer
+
+from world import heximport
+from world.hexmap import CubeCoord, HexMap
+from world.tests.test_hexmap import HexTestCase
+
+
+def write_file(data, suffix, mode="w"):
+    handle = tempfile.NamedTemporaryFile(mode, suffix=suffix, delete=False)
+    with handle:
+        handle.write(data)
+    return handle.name
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def palette_png(rows, colors, depth=8, filters=None):
+    """A palette PNG of pixel index rows; `filters` gives the filter type per row (applied as Sub/Up)."""
+    width = len(rows[0])
+    raw = bytearray()
+    prior = bytes((width * depth + 7) // 8)
+    for y, pixels in enumerate(rows):
+        packed = bytearray()
+        per_byte = 8 // depth
+        for start in range(0, width, per_byte):
+            byte = 0
+            for n, index in enumerate(pixels[start:start + per_byte]):
+                byte |= index << (8 - depth * (n + 1))
+            packed.append(byte)
+        kind = (filters or [0] * len(rows))[y]
+        if kind == 1:
+            encoded = bytes((packed[i] - (packed[i - 1] if i else 0)) & 0xFF for i in range(len(packed)))
+        elif kind == 2:
+            encoded = bytes((packed[i] - prior[i]) & 0xFF for i in range(len(packed)))
+        else:
+            encoded = bytes(packed)
+        raw += bytes([kind]) + encoded
+        prior = bytes(packed)
+    return (
+        heximport.PNG_SIGNATURE
+        + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, len(rows), depth, 3, 0, 0, 0))
+        + png_chunk(b"PLTE", b"".join(bytes(color) for color in colors))
+        + png_chunk(b"IDAT", zlib.compress(bytes(raw)))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+class TestSources(EvenniaTestCase):
+    """Test suite for reading import sources."""
+
+    def source(self, data, suffix, mode="w"):
+        path = write_file(data, suffix, mode)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_csv(self):
+        """Test CSV rows are read, skipping the header, comments and blanks."""
+        path = self.source("q,r,terrain\n0,0,plain\n\n# river\n1, -1, ocean\n", ".csv")
+        self.assertEqual(list(heximport.open_source(path)), [(0, 0, "plain"), (1, -1, "ocean")])
+
+    def test_csv_errors(self):
+        """Test malformed CSV rows report their line."""
+        path = self.source("0,0,plain\n1,x,ocean\n", ".csv")
+        with self.assertRaisesRegex(heximport.MapImportError, ":2:"):
+            list(heximport.read_csv(path))
+
+    def test_png_palette(self):
+        """Test palette pixels map to hexes by index or color, in odd-r rows."""
+        colors = [(0, 0, 255), (0, 255, 0), (1, 2, 3)]
+        rows = [[0, 1, 2], [1, 1, 0], [2, 0, 1]]
+        path = self.source(palette_png(rows, colors, filters=[1, 2, 0]), ".png", "wb")
+        tiles = list(heximport.read_png(path, {"#0000ff": "ocean", 1: "forest"}))
+        self.assertEqual(
+            tiles,
+            [
+                (0, 0, "ocean"), (1, 0, "forest"),
+                (0, 1, "forest"), (1, 1, "forest"), (2, 1, "ocean"),
+                (0, 2, "ocean"), (1, 2, "forest"),
+            ],
+        )
+
+    def test_png_packed_pixels(self):
+        """Test sub-byte pixels use the default terrain colors."""
+        rows = [[0, 1, 0, 1, 1]]
+        path = self.source(palette_png(rows, [(0, 0, 255), (0, 255, 0)], depth=1), ".png", "wb")
+        terrains = [terrain for _q, _r, terrain in heximport.read_png(path, origin=(10, 10))]
+        self.assertEqual(terrains, ["ocean", "plain", "ocean", "plain", "plain"])
+
+    def test_bad_sources(self):
+        """Test unsupported or corrupt files are rejected."""
+        with self.assertRaises(heximport.MapImportError):
+            heximport.open_source(self.source("", ".txt"))
+        with self.assertRaises(heximport.MapImportError):
+            list(heximport.read_png(self.source(b"not a png", ".png", "wb")))
+        self.assertEqual(heximport.parse_palette("0:ocean, #00FF00:plain"), {0: "ocean", "#00ff00": "plain"})
+        with self.assertRaises(heximport.MapImportError):
+            heximport.parse_palette("ocean")
+
+
+class TestImport(HexTestCase):
+    """Test suite for storing imported rows."""
+
+    def test_import_in_batches(self):
+        """Test rows are upserted batch by batch, keeping tiles not in the source."""
+        existing = HexMap()
+        existing.add_tile(CubeCoord(0, 0, 0), "ocean")
+        existing.add_tile(CubeCoord(5, 5, -10), "hills")
+        existing.save_all()
+        rows = [(q, 0, "plain") for q in range(7)]
+        seen = []
+        self.assertEqual(heximport.import_tiles(rows, batch_size=3, progress=seen.append), 7)
+        self.assertEqual(seen, [3, 6, 7])
+        stored = HexMap.load_all()
+        self.assertEqual(len(stored), 8)
+        self.assertEqual(stored.get_tile(CubeCoord(0, 0, 0)), "plain")
+        self.assertEqual(stored.get_tile(CubeCoord(5, 5, -10)), "hills")
+
+    def test_import_in_background(self):
+        """Test the background import reads batches off the reactor and reports progress."""
+        seen, results = [], []
+        with mock.patch.object(
+            heximport.threads, "deferToThread", side_effect=lambda f, *a: defer.succeed(f(*a))
+        ):
+            heximport.import_in_background(iter([(0, 0, "plain"), (1, 0, "forest")]), 1, seen.append).addCallback(
+                results.append
+            )
+        self.assertEqual((seen, results), ([1, 2], [2]))
+        self.assertEqual(HexMap.load_all().get_tile(CubeCoord(1, 0, -1)), "forest")
+
+    def test_background_errors(self):
+        """Test a bad row stops the import and errbacks."""
+        failures = []
+
+        def rows():
+            yield (0, 0, "plain")
+            raise heximport.MapImportError("bad row")
+
+        with mock.patch.object(
+            heximport.threads, "deferToThread", side_effect=lambda f, *a: defer.maybeDeferred(f, *a)
+        ):
+            heximport.import_in_background(rows(), 1).addErrback(failures.append)
+        self.assertEqual(failures[0].getErrorMessage(), "bad row")
+        self.assertEqual(len(HexMap.load_all()), 1)
@@ -0,0 +1,161 @@
+"""
+Tests for the hex change journal.
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from evennia.utils.test_resources import EvenniaTestCase
+from typeclasses.hextile import HexTile
+from world.hexedges import ROAD
+from world.hexjournal import REMOVE, SET, VALUE, HexJournal, JournaledHexMap, coalesce, read_records
+from world.hexmap import CubeCoord, HexMap
+from world.tests.test_hexmap import HexTestCase
+
+
+class JournalDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "world.journal")
+
+
+class TestHexJournal(JournalDirMixin, EvenniaTestCase):
+    """Test suite for the journal file format."""
+
+    def test_append_and_replay(self):
+        """Test records survive reopening, segments included, in order."""
+        journal = HexJournal(self.path, fsync=False)
+        self.assertEqual(journal.append([(SET, 1, -1, "forest", None), (VALUE, 1, -1, "elevation", 2.5)]), 2)
+        journal.seal()
+        journal.append([(REMOVE, 1, -1, None, None), (SET, 0, 0, None, None)])
+        journal.close()
+
+        reopened = HexJournal(self.path)
+        self.assertEqual(len(reopened.segments()), 1)
+        self.assertEqual(
+            list(reopened.replay()),
+            [
+                (SET, 1, -1, "forest", None),
+                (VALUE, 1, -1, "elevation", 2.5),
+                (REMOVE, 1, -1, None, None),
+                (SET, 0, 0, None, None),
+            ],
+        )
+
+    def test_directory_synced(self):
+        """Test creating the journal and sealing it sync the directory entries."""
+        with patch.object(HexJournal, "_sync_directory") as sync:
+            journal = HexJournal(self.path)
+            self.assertEqual(sync.call_count, 1)
+            journal.append([(SET, 0, 0, "plain", None)])
+            journal.seal()
+            # Once for the rename, once for the new live journal.
+            self.assertEqual(sync.call_count, 3)
+            journal.close()
+
+    def test_torn_tail_is_dropped(self):
+        """Test a partly written last record is discarded and overwritten."""
+        journal = HexJournal(self.path, fsync=False)
+        journal.append([(SET, 0, 0, "plain", None), (SET, 1, 0, "hills", None)])
+        journal.close()
+        with open(self.path, "r+b") as handle:
+            handle.truncate(os.path.getsize(self.path) - 3)
+
+        journal = HexJournal(self.path, fsync=False)
+        journal.append([(SET, 2, 0, "swamp", None)])
+        journal.close()
+        records, _end = read_records(self.path)
+        self.assertEqual([record[3] for record in records], ["plain", "swamp"])
+
+    def test_coalesce(self):
+        """Test changes reduce to their final effect per tile."""
+        tiles, removed, values = coalesce([
+            (SET, 0, 0, "plain", None),
+            (VALUE, 0, 0, "elevation", 1.0),
+            (REMOVE, 0, 0, None, None),
+            (SET, 1, 0, "plain", None),
+            (SET, 1, 0, "forest", None),
+        ])
+        self.assertEqual(tiles, {(1, 0, -1): "forest"})
+        self.assertEqual(removed, {(0, 0, 0)})
+        self.assertEqual(values, {"elevation": {}})
+
+
+class TestJournaledHexMap(JournalDirMixin, HexTestCase):
+    """Test suite for JournaledHexMap."""
+
+    def test_save_appends_without_store_writes(self):
+        """Test saving only appends to the journal."""
+        hm = JournaledHexMap.open(self.path, fsync=False)
+        hm.add_tile(CubeCoord(0, 0, 0), "forest")
+        with patch("world.hexstore.insert_tiles") as insert:
+            hm.save_all()
+        insert.assert_not_called()
+        self.assertFalse(hm.is_dirty)
+        self.assertIsNone(HexTile.get_by_coords(0, 0, 0))
+
+    def test_recovery_replays_journal(self):
+        """Test reopening rebuilds the map from the store plus the journal."""
+        HexTile.get_or_create_by_coords(5, -5, 0, terrain="plain")
+        hm = JournaledHexMap.open(self.path, layers=("elevation",), edges=True, fsync=False)
+        hm.add_tile(CubeCoord(0, 0, 0), "forest")
+        hm.add_tile(CubeCoord(1, 0, -1), "hills")
+        hm.set_value(CubeCoord(1, 0, -1), "elevation", 40.0)
+        hm.set_edge(CubeCoord(0, 0, 0), CubeCoord(1, 0, -1), ROAD)
+        hm.remove_tile(CubeCoord(5, -5, 0))
+        hm.save_all()
+        hm.journal.close()
+
+        recovered = JournaledHexMap.open(self.path, layers=("elevation",), edges=True)
+        self.assertEqual(dict(recovered.tiles()), {CubeCoord(0, 0, 0): "forest", CubeCoord(1, 0, -1): "hills"})
+        self.assertEqual(recovered.get_value(CubeCoord(1, 0, -1), "elevation"), 40.0)
+        self.assertEqual(recovered.edge_flags(CubeCoord(1, 0, -1), CubeCoord(0, 0, 0)), ROAD)
+        self.assertFalse(recovered.is_dirty)
+
+    def test_compact_writes_store_and_checkpoints(self):
+        """Test compaction applies the journal to the store and empties it."""
+        hm = JournaledHexMap.open(self.path, layers=("elevation",), fsync=False)
+        hm.add_tile(CubeCoord(0, 0, 0), "forest")
+        hm.save_all()
+        hm.set_value(CubeCoord(0, 0, 0), "elevation", 3.0)
+        hm.add_tile(CubeCoord(2, -1, -1), "swamp")
+        hm.save_all()
+        hm.remove_tile(CubeCoord(2, -1, -1))
+        hm.save_all()
+
+        self.assertEqual(hm.compact(), 3)
+        self.assertEqual(hm.journal.segments(), [])
+        self.assertEqual(list(hm.journal.replay()), [])
+        stored = HexMap.load_all(layers=("elevation",))
+        self.assertEqual(dict(stored.tiles()), {CubeCoord(0, 0, 0): "forest"})
+        self.assertEqual(stored.get_value(CubeCoord(0, 0, 0), "elevation"), 3.0)
+
+    def test_compact_finishes_background_compaction(self):
+        """Test a synchronous compaction completes a running background one instead of redoing it."""
+        hm = JournaledHexMap.open(self.path, fsync=False)
+        for q in range(3):
+            hm.add_tile(CubeCoord.from_axial(q, 0), "plain")
+        hm.save_all()
+        steps = []
+        with patch("world.hexjournal.delay", lambda _seconds, step: steps.append(step)):
+            results = []
+            hm.compact_in_background(batch_size=1).addCallback(results.append)
+            steps.pop(0)()
+            hm.add_tile(CubeCoord(0, 1, -1), "hills")
+            hm.save_all()
+
+            self.assertEqual(hm.compact(), 3)
+            self.assertEqual(results, [3])
+            self.assertEqual(hm.journal.segments(), [])
+            for step in steps:
+                step()
+        self.assertEqual(len(HexMap.load_all()), 4)
+
+    def test_save_without_journal(self):
+        """Test a map built without a journal fails clearly on save."""
+        hm = JournaledHexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        with self.assertRaises(RuntimeError):
+            hm.save_all()
@@ -0,0 +1,318 @@
+"""
+Tests for the hex map and its bulk persistence.
+"""
+from unittest.mock import patch
+from django.db import transaction
+from evennia.utils.test_resources import EvenniaTest
+from evennia import create_object
+from typeclasses.hextile import HexTile
+from world.hexmap import CubeCoord, HexMap
+from world.hexstore import coord_index, coord_key, insert_tiles, occupancy_index, parse_coord_key, room_index
+
+
+class HexTestCase(EvenniaTest):
+    """Base for tests touching hex tiles; the hex indexes outlive each test's DB."""
+
+    def setUp(self):
+        super().setUp()
+        coord_index.reset()
+        room_index.reset()
+        occupancy_index.reset()
+
+
+class TestCoordKeys(EvenniaTest):
+    """Test suite for hexcoord tag keys."""
+
+    def test_round_trip(self):
+        """Test coord keys parse back into coordinates."""
+        self.assertEqual(coord_key(2, -3, 1), "2,-3,1")
+        self.assertEqual(parse_coord_key("2,-3,1"), (2, -3, 1))
+
+    def test_parse_invalid(self):
+        """Test malformed or invalid keys are rejected."""
+        self.assertIsNone(parse_coord_key("1,2"))
+        self.assertIsNone(parse_coord_key("a,b,c"))
+        self.assertIsNone(parse_coord_key("1,1,1"))
+        self.assertIsNone(parse_coord_key(None))
+
+
+class TestHexMapLoadAll(HexTestCase):
+    """Test suite for HexMap.load_all."""
+
+    def test_load_all_reads_coords_and_terrain(self):
+        """Test load_all returns every tile with its terrain."""
+        HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        HexTile.get_or_create_by_coords(1, -1, 0, terrain="forest")
+        tile, _ = HexTile.get_or_create_by_coords(0, 1, -1)
+        tile.tags.add("landmark", category="poi")
+
+        hm = HexMap.load_all()
+
+        self.assertEqual(hm.get_tile(CubeCoord(0, 0, 0)), "plain")
+        self.assertEqual(hm.get_tile(CubeCoord(1, -1, 0)), "forest")
+        self.assertIn(CubeCoord(0, 1, -1), hm)
+        self.assertIsNone(hm.get_tile(CubeCoord(0, 1, -1)))
+        self.assertEqual(len(hm), 3)
+
+    def test_load_all_ignores_other_typeclasses(self):
+        """Test objects that are not hex tiles are skipped."""
+        HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        impostor = create_object("typeclasses.objects.Object", key="Impostor")
+        impostor.tags.add("5,-5,0", category="hexcoord")
+
+        hm = HexMap.load_all()
+
+        self.assertNotIn(CubeCoord(5, -5, 0), hm)
+        self.assertEqual(len(hm), 1)
+
+    def test_load_all_constant_queries(self):
+        """Test load_all issues the same number of queries for any map size."""
+        for q in range(-5, 6):
+            HexTile.get_or_create_by_coords(q, -q, 0, terrain="hills")
+
+        with self.assertNumQueries(2):
+            hm = HexMap.load_all()
+
+        self.assertEqual(len(hm), 11)
+
+
+class TestHexMapSaveAll(HexTestCase):
+    """Test suite for HexMap dirty tracking and HexMap.save_all."""
+
+    def test_add_tile_marks_dirty(self):
+        """Test adding or changing tiles marks the map dirty."""
+        hm = HexMap()
+        self.assertFalse(hm.is_dirty)
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        self.assertTrue(hm.is_dirty)
+        hm.mark_clean()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        self.assertFalse(hm.is_dirty)
+        hm.remove_tile(CubeCoord(0, 0, 0))
+        self.assertTrue(hm.is_dirty)
+
+    def test_save_all_creates_tiles(self):
+        """Test new tiles are created with coords, terrain and tag."""
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "forest")
+        hm.add_tile(CubeCoord(2, -1, -1))
+        hm.save_all()
+
+        tile = HexTile.get_by_coords(0, 0, 0)
+        self.assertIsNotNone(tile)
+        self.assertEqual(tile.db.terrain, "forest")
+        self.assertEqual(tile.get_coords(), (0, 0, 0))
+        self.assertEqual(tile.key, "Hex 0,0,0")
+        self.assertTrue(tile.access(self.char1, "get"))
+        self.assertEqual(HexTile.get_by_coords(2, -1, -1).db.terrain, "plain")
+        self.assertFalse(hm.is_dirty)
+
+    def test_save_all_updates_live_tile(self):
+        """Test changed terrain is visible on an already cached tile."""
+        tile, _ = HexTile.get_or_create_by_coords(1, -1, 0, terrain="plain")
+        self.assertEqual(tile.db.terrain, "plain")
+
+        hm = HexMap.load_all()
+        hm.add_tile(CubeCoord(1, -1, 0), "swamp")
+        hm.save_all()
+
+        self.assertEqual(tile.db.terrain, "swamp")
+        self.assertEqual(HexMap.load_all().get_tile(CubeCoord(1, -1, 0)), "swamp")
+
+    def test_save_all_keeps_terrain_for_none(self):
+        """Test a tile with no data keeps its stored terrain."""
+        HexTile.get_or_create_by_coords(0, 0, 0, terrain="hills")
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0))
+        hm.save_all()
+
+        self.assertEqual(HexTile.get_by_coords(0, 0, 0).db.terrain, "hills")
+
+    def test_save_all_writes_only_changes(self):
+        """Test re-saving a loaded map only writes edited tiles."""
+        hm = HexMap()
+        for q in range(5):
+            hm.add_tile(CubeCoord(q, -q, 0), "plain")
+        hm.save_all()
+
+        hm = HexMap.load_all()
+        hm.add_tile(CubeCoord(2, -2, 0), "desert")
+        hm.add_tile(CubeCoord(4, -4, 0), "plain")
+        with patch("world.hexstore.insert_tiles") as insert, patch("world.hexstore.update_terrain") as update:
+            hm.save_all()
+
+        insert.assert_called_once_with({})
+        updated = update.call_args.args[0]
+        self.assertEqual(list(updated.values()), ["desert"])
+
+    def test_save_all_deletes_removed_tiles(self):
+        """Test tiles removed from a loaded map are deleted."""
+        live, _ = HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        HexTile.get_or_create_by_coords(1, -1, 0, terrain="plain")
+        HexTile.get_or_create_by_coords(2, -2, 0, terrain="plain")
+
+        hm = HexMap.load_all()
+        hm.remove_tile(CubeCoord(0, 0, 0))
+        hm.remove_tile(CubeCoord(1, -1, 0))
+        hm.save_all()
+
+        self.assertIsNone(live.pk)
+        self.assertIsNone(HexTile.get_by_coords(0, 0, 0))
+        self.assertIsNone(HexTile.get_by_coords(1, -1, 0))
+        self.assertIsNotNone(HexTile.get_by_coords(2, -2, 0))
+
+    def test_save_all_overwrite_unloaded_map(self):
+        """Test overwrite deletes stored tiles missing from a fresh map."""
+        HexTile.get_or_create_by_coords(5, -5, 0, terrain="plain")
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        hm.save_all()
+
+        self.assertIsNone(HexTile.get_by_coords(5, -5, 0))
+        self.assertIsNotNone(HexTile.get_by_coords(0, 0, 0))
+
+    def test_save_all_without_overwrite(self):
+        """Test upsert-only saves keep tiles missing from the map."""
+        HexTile.get_or_create_by_coords(5, -5, 0, terrain="plain")
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        hm.save_all(overwrite=False)
+
+        self.assertIsNotNone(HexTile.get_by_coords(5, -5, 0))
+        self.assertIsNotNone(HexTile.get_by_coords(0, 0, 0))
+
+
+class TestCoordIndex(HexTestCase):
+    """Test suite for the process-wide coord index."""
+
+    def test_lookup_builds_lazily(self):
+        """Test the index is built on first lookup and finds existing tiles."""
+        tile, _ = HexTile.get_or_create_by_coords(3, -1, -2, terrain="plain")
+        coord_index.reset()
+        self.assertFalse(coord_index.is_built)
+
+        self.assertEqual(HexTile.get_id_by_coords(3, -1, -2), tile.id)
+        self.assertTrue(coord_index.is_built)
+
+    def test_lookup_without_queries(self):
+        """Test index lookups do not hit the database once built."""
+        HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        coord_index.build()
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(HexTile.get_id_by_coords(0, 0, 0))
+            self.assertIsNone(HexTile.get_id_by_coords(9, -9, 0))
+            self.assertIsNone(HexTile.get_id_by_coords(1, 1, 1))
+
+    def test_create_and_delete_keep_index_current(self):
+        """Test created and deleted tiles are reflected in the index."""
+        coord_index.build()
+        tile, created = HexTile.get_or_create_by_coords(2, -2, 0, terrain="plain")
+        self.assertTrue(created)
+        self.assertEqual(coord_index.get(2, -2, 0), tile.id)
+        self.assertEqual(HexTile.get_by_coords(2, -2, 0), tile)
+
+        tile.delete()
+        self.assertIsNone(coord_index.get(2, -2, 0))
+        self.assertIsNone(HexTile.get_by_coords(2, -2, 0))
+
+    def test_bulk_save_keeps_index_current(self):
+        """Test bulk inserts and deletes from save_all update the index."""
+        coord_index.build()
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        hm.add_tile(CubeCoord(1, 0, -1), "plain")
+        hm.save_all()
+        self.assertEqual(len(coord_index), 2)
+
+        hm.remove_tile(CubeCoord(1, 0, -1))
+        hm.save_all()
+        self.assertIsNone(coord_index.get(1, 0, -1))
+        self.assertIsNotNone(coord_index.get(0, 0, 0))
+
+    def test_rolled_back_tiles_are_not_indexed(self):
+        """Test tiles created in a savepoint that rolls back are not indexed at commit."""
+        coord_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            kept, _ = HexTile.get_or_create_by_coords(4, -4, 0, terrain="plain")
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    insert_tiles({(5, -5, 0): "plain"})
+                    self.assertIsNotNone(coord_index.get(5, -5, 0))
+                    raise RuntimeError
+        self.assertEqual(coord_index.get(4, -4, 0), kept.id)
+        self.assertIsNone(coord_index.get(5, -5, 0))
+        self.assertEqual(len(coord_index), 1)
+
+    def test_stale_entry_is_dropped(self):
+        """Test an id that no longer belongs to a tile is discarded on lookup."""
+        coord_index.build()
+        coord_index.add(4, -4, 0, self.obj1.id)
+        self.assertIsNone(HexTile.get_by_coords(4, -4, 0))
+        self.assertIsNone(coord_index.get(4, -4, 0))
+
+
+class TestHexMapLayers(HexTestCase):
+    """Test suite for numeric per-tile layers."""
+
+    def test_set_and_get_values(self):
+        """Test values are per tile and per layer, and need a tile."""
+        hm = HexMap.compact()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        hm.add_tile(CubeCoord(1, -1, 0), "hills")
+        hm.set_value(CubeCoord(0, 0, 0), "elevation", 3.5)
+        hm.set_value(CubeCoord(1, -1, 0), "moisture", 0.25)
+
+        self.assertEqual(hm.get_value(CubeCoord(0, 0, 0), "elevation"), 3.5)
+        self.assertIsNone(hm.get_value(CubeCoord(0, 0, 0), "moisture"))
+        self.assertEqual(hm.values("elevation", [CubeCoord(1, -1, 0), CubeCoord(0, 0, 0)]), [None, 3.5])
+        self.assertEqual(list(hm.values_in_box("moisture", 0, -1, 1, 0)), [(CubeCoord(1, -1, 0), 0.25)])
+        self.assertEqual(hm.layer_names, ["elevation", "moisture"])
+        with self.assertRaises(KeyError):
+            hm.set_value(CubeCoord(5, -5, 0), "elevation", 1.0)
+
+    def test_values_follow_tiles(self):
+        """Test edits bump the revision and removing a tile clears its values."""
+        hm = HexMap()
+        coord = CubeCoord(0, 0, 0)
+        hm.add_tile(coord)
+        revision = hm.revision
+        hm.set_value(coord, "elevation", 2.0)
+        hm.set_value(coord, "elevation", 2.0)
+        self.assertEqual(hm.revision, revision + 1)
+        hm.remove_tile(coord)
+        hm.add_tile(coord)
+        self.assertIsNone(hm.get_value(coord, "elevation"))
+
+    def test_save_and_load_layers(self):
+        """Test only changed values are written and load_all reads them back."""
+        hm = HexMap()
+        for q in range(20):
+            hm.add_tile(CubeCoord(q, -q, 0), "plain")
+            hm.set_value(CubeCoord(q, -q, 0), "elevation", q * 0.5)
+        hm.save_all()
+        self.assertFalse(hm.is_dirty)
+
+        loaded = HexMap.load_all(layers=("elevation",))
+        self.assertEqual(loaded.get_value(CubeCoord(7, -7, 0), "elevation"), 3.5)
+        self.assertIsNone(HexMap.load_all().get_value(CubeCoord(7, -7, 0), "elevation"))
+
+        loaded.set_value(CubeCoord(7, -7, 0), "elevation", 9.0)
+        self.assertTrue(loaded.is_dirty)
+        with patch("world.hexstore.insert_tiles", wraps=insert_tiles) as inserted:
+            loaded.save_all()
+        inserted.assert_called_once_with({})
+        tile = HexTile.get_by_coords(7, -7, 0)
+        self.assertEqual(tile.attributes.get("elevation"), 9.0)
+        self.assertEqual(tile.db.terrain, "plain")
+        self.assertEqual(HexTile.get_by_coords(8, -8, 0).attributes.get("elevation"), 4.0)
+
+    def test_cleared_value_deletes_attribute(self):
+        """Test clearing a stored value deletes its Attribute."""
+        hm = HexMap()
+        coord = CubeCoord(0, 0, 0)
+        hm.add_tile(coord, "plain")
+        hm.set_value(coord, "elevation", 2.0)
+        hm.save_all()
+        hm.set_value(coord, "elevation", None)
+        hm.save_all()
+        self.assertFalse(HexTile.get_by_coords(0, 0, 0).attributes.has("elevation"))
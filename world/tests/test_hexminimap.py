@@ -0,0 +1,91 @@
+"""
+Tests for the hex minimap renderer.
+"""
+from evennia.utils.ansi import strip_ansi
+from evennia.utils.test_resources import EvenniaTestCase
+from typeclasses.hextile import HexTile
+from world import hexworld
+from world.hexmap import CubeCoord, HexMap
+from world.hexminimap import MinimapRenderer
+from world.hexpaging import CHUNK_OVERHEAD, PagedHexMap
+from world.hexstore import find_tile_ids, insert_tiles, update_terrain
+from world.tests.test_hexmap import HexTestCase
+
+
+def plain_map(side):
+    hm = HexMap.compact()
+    for q in range(side):
+        for r in range(side):
+            hm.add_tile(CubeCoord.from_axial(q, r), "plain")
+    return hm
+
+
+class TestMinimapRenderer(EvenniaTestCase):
+    """Test suite for MinimapRenderer."""
+
+    def test_layout(self):
+        """Test the view is a hexagon of glyphs with the center marked."""
+        hm = plain_map(10)
+        hm.add_tile(CubeCoord.from_axial(6, 4), "mountain")
+        text = strip_ansi(MinimapRenderer(hm, chunk_size=4).render(CubeCoord.from_axial(5, 5), 1))
+        self.assertEqual(text.split("\n"), [" . ^", ". @ .", " . ."])
+
+    def test_unknown_hexes_are_blank(self):
+        """Test hexes off the map are drawn as blanks."""
+        hm = HexMap()
+        hm.add_tile(CubeCoord(0, 0, 0), "ocean")
+        text = strip_ansi(MinimapRenderer(hm).render(CubeCoord(0, 0, 0), 1))
+        self.assertEqual(text.split("\n"), ["", "  @", ""])
+
+    def test_fragments_shared_and_invalidated_per_chunk(self):
+        """Test views reuse fragments and a change only rebuilds its own chunk."""
+        hm = plain_map(32)
+        renderer = MinimapRenderer(hm, chunk_size=8)
+        first = renderer.render(CubeCoord.from_axial(4, 4), 3)
+        renderer.render(CubeCoord.from_axial(5, 4), 3)
+        self.assertEqual(renderer.fragment_builds, 2)
+        self.assertIs(renderer.render(CubeCoord.from_axial(4, 4), 3), first)
+        self.assertEqual(renderer.view_builds, 2)
+
+        hm.add_tile(CubeCoord.from_axial(30, 30), "forest")
+        self.assertIs(renderer.render(CubeCoord.from_axial(4, 4), 3), first)
+        hm.add_tile(CubeCoord.from_axial(3, 3), "forest")
+        self.assertIn("T", renderer.render(CubeCoord.from_axial(4, 4), 3))
+        self.assertEqual(renderer.fragment_builds, 3)
+
+
+class TestWorldMinimap(HexTestCase):
+    """Test suite for the shared world map and its minimap."""
+
+    def setUp(self):
+        super().setUp()
+        hexworld.reset()
+        self.addCleanup(hexworld.reset)
+
+    def test_follows_tile_edits(self):
+        """Test the shared map sees edits made through HexTile and other maps."""
+        tile, _ = HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        HexTile.get_or_create_by_coords(1, 0, -1, terrain="plain")
+        self.assertEqual(strip_ansi(hexworld.minimap().render((0, 0, 0), 1)).split("\n")[1], "  @ .")
+
+        HexTile.get_or_create_by_coords(1, -1, 0, terrain="hills")
+        tile.set_terrain("forest")
+        other = HexMap()
+        other.add_tile(CubeCoord(1, 0, -1), "ocean")
+        other.save_all(overwrite=False)
+        self.assertEqual(hexworld.world_map().get_tile(CubeCoord(0, 0, 0)), "forest")
+        text = strip_ansi(hexworld.minimap().render((1, 0, -1), 1))
+        self.assertEqual(text.split("\n")[:2], [" n", "T @"])
+
+    def test_follows_edits_in_evicted_chunks(self):
+        """Test a change in a chunk no longer resident still rebuilds its fragment."""
+        insert_tiles({(q, r, -q - r): "plain" for q in range(8) for r in range(4)})
+        hm = PagedHexMap(chunk_size=4, max_bytes=16 + CHUNK_OVERHEAD)
+        renderer = MinimapRenderer(hm, chunk_size=4)
+        renderer.render(CubeCoord.from_axial(1, 1), 1)
+        hm.get_tile(CubeCoord.from_axial(5, 0))
+        self.assertEqual(hm.storage.resident_chunks(), [(1, 0)])
+
+        update_terrain({find_tile_ids([(2, 1, -3)])[(2, 1, -3)]: "forest"})
+        hm.refresh_tile(CubeCoord.from_axial(2, 1), "forest")
+        self.assertIn("T", strip_ansi(renderer.render(CubeCoord.from_axial(1, 1), 1)))
@@ -0,0 +1,114 @@
+"""
+Tests for the region-paged HexMap.
+"""
+from typeclasses.hextile import HexTile
+from world.hexedges import ROAD
+from world.hexmap import CubeCoord
+from world.hexpaging import CHUNK_OVERHEAD, PagedHexMap
+from world.hexstore import find_tile_ids, insert_tiles, load_attribute
+from world.tests.test_hexmap import HexTestCase
+
+SIZE = 4
+
+
+def paged(chunks):
+    """Return a map with 4x4 chunks and room for `chunks` of them."""
+    return PagedHexMap(chunk_size=SIZE, max_bytes=chunks * (SIZE * SIZE + CHUNK_OVERHEAD))
+
+
+def stored_terrain(q, r):
+    tile_id = find_tile_ids([(q, r, -q - r)]).get((q, r, -q - r))
+    if tile_id is None:
+        return None
+    return load_attribute("terrain", tile_ids=[tile_id]).get(tile_id)
+
+
+class TestPagedHexMap(HexTestCase):
+    """Test suite for PagedHexMap."""
+
+    def setUp(self):
+        super().setUp()
+        # Three chunks along q: (0, 0), (1, 0) and (2, 0).
+        insert_tiles({(q, r, -q - r): "plain" if q < 8 else "forest" for q in range(12) for r in range(SIZE)})
+
+    def test_loads_chunks_on_demand(self):
+        """Test only touched chunks are read from the store."""
+        hm = paged(3)
+        self.assertEqual(hm.get_tile(CubeCoord.from_axial(1, 1)), "plain")
+        self.assertEqual(hm.storage.resident_chunks(), [(0, 0)])
+        self.assertEqual(len(hm), SIZE * SIZE)
+        self.assertEqual(hm.get_tile(CubeCoord.from_axial(9, 2)), "forest")
+        self.assertNotIn(CubeCoord.from_axial(20, 0), hm)
+        self.assertEqual(hm.storage.loads, 3)
+
+    def test_lru_eviction(self):
+        """Test the least recently used chunk is evicted past the budget."""
+        hm = paged(2)
+        hm.get_tile(CubeCoord.from_axial(0, 0))
+        hm.get_tile(CubeCoord.from_axial(4, 0))
+        hm.get_tile(CubeCoord.from_axial(0, 1))
+        hm.get_tile(CubeCoord.from_axial(8, 0))
+        self.assertEqual(hm.storage.resident_chunks(), [(0, 0), (2, 0)])
+        self.assertEqual(hm.storage.evictions, 1)
+
+    def test_dirty_chunk_written_on_eviction(self):
+        """Test evicting a chunk writes its changes back to the store."""
+        hm = paged(2)
+        hm.add_tile(CubeCoord.from_axial(1, 1), "swamp")
+        hm.remove_tile(CubeCoord.from_axial(2, 2))
+        hm.get_tile(CubeCoord.from_axial(5, 0))
+        self.assertEqual(stored_terrain(1, 1), "plain")
+        self.assertTrue(hm.is_dirty)
+
+        hm.get_tile(CubeCoord.from_axial(9, 0))
+
+        self.assertEqual(stored_terrain(1, 1), "swamp")
+        self.assertNotIn((2, 2, -4), find_tile_ids([(2, 2, -4)]))
+        self.assertFalse(hm.is_dirty)
+        self.assertEqual(hm.get_tile(CubeCoord.from_axial(1, 1)), "swamp")
+
+    def test_save_all_keeps_unloaded_tiles(self):
+        """Test saving writes resident changes and never deletes unloaded tiles."""
+        hm = paged(3)
+        hm.add_tile(CubeCoord.from_axial(9, 1), "mountain")
+        hm.save_all()
+
+        self.assertEqual(stored_terrain(9, 1), "mountain")
+        self.assertEqual(HexTile.objects.all_family().count(), 12 * SIZE)
+
+    def test_queries_across_chunks(self):
+        """Test spatial queries page in neighbouring chunks."""
+        hm = paged(4)
+        found = hm.within_radius(CubeCoord.from_axial(4, 1), 1)
+        self.assertEqual(len(found), 7)
+        self.assertEqual(len(list(hm.in_box(2, 0, 9, 1))), 16)
+
+    def test_layers_paged_with_chunks(self):
+        """Test layer values are read with their chunk and written back on eviction."""
+        hm = paged(1)
+        hm.set_value(CubeCoord.from_axial(1, 1), "elevation", 4.0)
+        hm.get_tile(CubeCoord.from_axial(5, 0))
+        self.assertEqual(load_attribute("elevation"), {find_tile_ids([(1, 1, -2)])[(1, 1, -2)]: 4.0})
+        self.assertFalse(hm.is_dirty)
+
+        fresh = paged(1)
+        self.assertEqual(fresh.get_value(CubeCoord.from_axial(1, 1), "elevation"), 4.0)
+        self.assertEqual(fresh.storage.resident_chunks(), [(0, 0)])
+        self.assertEqual(list(fresh.values_in_box("elevation", 0, 0, 5, 1)), [(CubeCoord.from_axial(1, 1), 4.0)])
+
+    def test_edges_paged_with_chunks(self):
+        """Test edge features across a chunk border are written back and read again."""
+        a, b = CubeCoord.from_axial(3, 1), CubeCoord.from_axial(4, 1)
+        hm = paged(1)
+        hm.add_edge_feature(a, b, ROAD)
+        hm.get_tile(CubeCoord.from_axial(9, 0))
+        self.assertFalse(hm.is_dirty)
+
+        fresh = paged(1)
+        self.assertEqual(fresh.edge_flags(b, a), ROAD)
+        self.assertEqual(list(fresh.edges_in_box(3, 1, 3, 1)), [(a, b, ROAD)])
+
+    def test_load_all_rejected(self):
+        """Test paged maps cannot be bulk loaded."""
+        with self.assertRaises(TypeError):
+            PagedHexMap.load_all()
@@ -0,0 +1,156 @@
+"""
+Tests for terrain-cost pathfinding.
+"""
+from unittest.mock import patch
+
+from django.test import override_settings
+from twisted.internet import task
+from evennia.utils.test_resources import EvenniaTestCase
+from world.hexedges import CLIFF, FORD, RIVER, ROAD
+from world.hexmap import CubeCoord, HexMap
+from world.hexpath import HexPathfinder
+
+
+def strip_map(rows):
+    """Build a map from rows of terrain initials, row index = r, column = q."""
+    names = {"p": "plain", "f": "forest", "m": "mountain", "o": "ocean", "s": "swamp"}
+    hm = HexMap()
+    for r, row in enumerate(rows):
+        for q, char in enumerate(row):
+            if char != " ":
+                hm.add_tile(CubeCoord.from_axial(q, r), names[char])
+    return hm
+
+
+class TestHexPathfinder(EvenniaTestCase):
+    """Test suite for HexPathfinder."""
+
+    def setUp(self):
+        super().setUp()
+        self.hm = strip_map([
+            "ppppp",
+            "pmmmp",
+            "ppppp",
+        ])
+        self.finder = HexPathfinder(self.hm)
+
+    def test_straight_path(self):
+        """Test a path on open plain takes the direct route."""
+        result = self.finder.find_path(CubeCoord(0, 0, 0), CubeCoord(4, 0, -4))
+        self.assertEqual(result.cost, 4)
+        self.assertEqual(result.coords[0], CubeCoord(0, 0, 0))
+        self.assertEqual(result.coords[-1], CubeCoord(4, 0, -4))
+        self.assertEqual(len(result.coords), 5)
+
+    def test_avoids_expensive_terrain(self):
+        """Test the path goes around mountains when that is cheaper."""
+        result = self.finder.find_path(CubeCoord.from_axial(0, 1), CubeCoord.from_axial(4, 1))
+        self.assertEqual(result.cost, 5)
+        for coord in result.coords:
+            self.assertNotEqual(self.hm.get_tile(coord), "mountain")
+
+    def test_unreachable_and_budget(self):
+        """Test missing or out-of-budget goals return None."""
+        self.assertIsNone(self.finder.find_path(CubeCoord(0, 0, 0), CubeCoord(9, 0, -9)))
+        self.assertIsNone(self.finder.find_path(CubeCoord(0, 0, 0), CubeCoord(4, 0, -4), max_cost=3))
+        self.assertIsNone(self.finder.find_path(CubeCoord(0, 0, 0), CubeCoord(4, 0, -4), max_nodes=2))
+
+    def test_impassable_terrain(self):
+        """Test terrains with no cost block movement."""
+        hm = strip_map(["pop"])
+        finder = HexPathfinder(hm)
+        self.assertIsNone(finder.find_path(CubeCoord(0, 0, 0), CubeCoord(2, 0, -2)))
+
+    @override_settings(HEX_TERRAIN_COSTS={"mountain": 1})
+    def test_settings_override(self):
+        """Test builders can change costs through settings."""
+        finder = HexPathfinder(self.hm)
+        self.assertEqual(finder.cost_of("mountain"), 1)
+        result = finder.find_path(CubeCoord.from_axial(0, 1), CubeCoord.from_axial(4, 1))
+        self.assertEqual(result.cost, 4)
+
+    def test_cache_hits_and_invalidation(self):
+        """Test repeated queries hit the cache until the map changes."""
+        start, goal = CubeCoord(0, 0, 0), CubeCoord(4, 0, -4)
+        first = self.finder.find_path(start, goal)
+        self.assertIs(self.finder.find_path(start, goal), first)
+        self.assertEqual(self.finder.hits, 1)
+
+        self.hm.add_tile(CubeCoord(2, 0, -2), "swamp")
+        self.hm.add_tile(CubeCoord.from_axial(2, 1), "swamp")
+        result = self.finder.find_path(start, goal)
+        self.assertEqual(self.finder.misses, 2)
+        self.assertEqual(result.cost, 6)
+
+    def test_find_path_async_in_slices(self):
+        """Test the async search runs on the reactor in slices and caches its result."""
+        cooperator = task.Cooperator(scheduler=lambda tick: tick())
+        start, goal = CubeCoord(0, 0, 0), CubeCoord(4, 0, -4)
+        results = []
+        with patch("world.hexpath.task.cooperate", cooperator.cooperate):
+            self.finder.find_path_async(start, goal, slice_nodes=1).addCallback(results.append)
+        self.assertEqual(results[0].cost, 4)
+        self.assertIs(self.finder.find_path(start, goal), results[0])
+
+    def test_cache_is_bounded(self):
+        """Test the least recently used entries are evicted."""
+        finder = HexPathfinder(self.hm, cache_size=2)
+        for q in range(1, 5):
+            finder.find_path(CubeCoord(0, 0, 0), CubeCoord(q, 0, -q))
+        self.assertEqual(len(finder._cache), 2)
+
+    def test_distances_from_many_sources(self):
+        """Test multi-source Dijkstra keeps the cheapest source per hex."""
+        distances = self.finder.distances_from([CubeCoord(0, 0, 0), CubeCoord(4, 0, -4)])
+        self.assertEqual(distances[CubeCoord(2, 0, -2)], 2)
+        self.assertEqual(distances[CubeCoord(0, 0, 0)], 0)
+        self.assertEqual(len(distances), len(self.hm))
+
+    def test_nearest_terrain(self):
+        """Test nearest finds the closest matching hex, even if impassable."""
+        hm = strip_map(["pppo", "pppp"])
+        finder = HexPathfinder(hm)
+        coord, cost = finder.nearest([CubeCoord(0, 0, 0)], {"ocean"})
+        self.assertEqual(coord, CubeCoord(3, 0, -3))
+        self.assertEqual(cost, 2)
+        self.assertIsNone(finder.nearest([CubeCoord(0, 0, 0)], {"desert"}))
+
+
+class TestEdgeFeatures(EvenniaTestCase):
+    """Test suite for roads, rivers and cliffs in pathfinding."""
+
+    def setUp(self):
+        super().setUp()
+        self.hm = strip_map(["ppppp"])
+        self.finder = HexPathfinder(self.hm)
+        self.start, self.goal = CubeCoord(0, 0, 0), CubeCoord(4, 0, -4)
+
+    def test_river_blocks_unless_forded(self):
+        """Test a river cuts the strip in two until a ford or bridge crosses it."""
+        a, b = CubeCoord(1, 0, -1), CubeCoord(2, 0, -2)
+        self.hm.set_edge(b, a, RIVER)
+        self.assertIsNone(self.finder.find_path(self.start, self.goal))
+        self.assertIsNone(self.finder.move_cost(a, b))
+        self.hm.add_edge_feature(a, b, FORD)
+        self.assertEqual(self.finder.find_path(self.start, self.goal).cost, 5)
+        self.hm.set_edge(a, b, RIVER | ROAD)
+        self.assertEqual(self.finder.move_cost(b, a), 0.5)
+
+    def test_road_is_cheaper(self):
+        """Test following a road lowers the cost and draws paths onto it."""
+        hm = strip_map(["ppppp", "ppppp"])
+        for q in range(4):
+            hm.set_edge(CubeCoord.from_axial(q, 1), CubeCoord.from_axial(q + 1, 1), ROAD)
+        finder = HexPathfinder(hm)
+        result = finder.find_path(CubeCoord.from_axial(0, 1), CubeCoord.from_axial(4, 1))
+        self.assertEqual(result.cost, 2)
+        # Dropping onto the road and back beats the 4 plain steps of the top row.
+        result = finder.find_path(CubeCoord.from_axial(0, 0), CubeCoord.from_axial(4, 0))
+        self.assertEqual(result.cost, 3.5)
+        self.assertIn(CubeCoord.from_axial(1, 1), result.coords)
+
+    def test_cliff_blocks(self):
+        """Test cliffs are impassable even on a road."""
+        self.hm.set_edge(CubeCoord(3, 0, -3), CubeCoord(4, 0, -4), CLIFF | ROAD)
+        self.assertIsNone(self.finder.find_path(self.start, self.goal))
+        self.assertNotIn(self.goal, self.finder.distances_from([self.start]))
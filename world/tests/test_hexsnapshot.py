@@ -0,0 +1,96 @@
+"""
+Tests for binary hex snapshots.
+"""
+import os
+import tempfile
+
+from evennia.utils.test_resources import EvenniaTestCase
+from typeclasses.hextile import HexTile
+from world.hexmap import CubeCoord, HexMap
+from world.hexsnapshot import HexSnapshot, SnapshotError, read_snapshot, restore_snapshot, write_snapshot
+from world.tests.test_hexmap import HexTestCase
+
+
+class SnapshotFileMixin:
+    def setUp(self):
+        super().setUp()
+        handle, self.path = tempfile.mkstemp(suffix=".hexsnap")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+
+def sample_map():
+    hm = HexMap()
+    hm.add_tile(CubeCoord(0, 0, 0), "plain")
+    hm.add_tile(CubeCoord(3, -1, -2), "forest")
+    hm.add_tile(CubeCoord(-2, 5, -3), "plain")
+    hm.add_tile(CubeCoord(1, 1, -2))
+    return hm
+
+
+class TestHexSnapshot(SnapshotFileMixin, EvenniaTestCase):
+    """Test suite for writing and mapping snapshots."""
+
+    def test_round_trip(self):
+        """Test a written map reads back identically."""
+        hm = sample_map()
+        self.assertEqual(write_snapshot(hm, self.path), 4)
+        loaded = read_snapshot(self.path)
+        self.assertEqual(dict(loaded.tiles()), dict(hm.tiles()))
+        self.assertFalse(loaded.is_dirty)
+
+    def test_map_layers_by_default(self):
+        """Test the map's numeric layers are written when none are given."""
+        hm = sample_map()
+        hm.set_value(CubeCoord(0, 0, 0), "elevation", 7.0)
+        write_snapshot(hm, self.path)
+        with HexSnapshot(self.path) as snap:
+            self.assertEqual(snap.layers, ["elevation"])
+            self.assertEqual(snap.layer_value(CubeCoord(0, 0, 0), "elevation"), 7.0)
+
+    def test_mapped_lookups(self):
+        """Test the mapped file answers lookups without loading a map."""
+        write_snapshot(sample_map(), self.path, layers={"elevation": {(3, -1, -2): 120.5}})
+        with HexSnapshot(self.path) as snap:
+            self.assertEqual(len(snap), 4)
+            self.assertEqual(snap.get(CubeCoord(3, -1, -2)), "forest")
+            self.assertIn(CubeCoord(1, 1, -2), snap)
+            self.assertIsNone(snap.get(CubeCoord(1, 1, -2)))
+            self.assertNotIn(CubeCoord(9, -9, 0), snap)
+            self.assertEqual(snap.layers, ["elevation"])
+            self.assertEqual(snap.layer_value(CubeCoord(3, -1, -2), "elevation"), 120.5)
+            self.assertIsNone(snap.layer_value(CubeCoord(0, 0, 0), "elevation"))
+            coord, terrain, values = snap.record(0)
+            self.assertEqual(coord, CubeCoord(3, -1, -2))
+            self.assertEqual(terrain, "forest")
+            self.assertEqual(values, (120.5,))
+
+    def test_rejects_invalid_files(self):
+        """Test files that are not snapshots raise SnapshotError."""
+        with open(self.path, "wb") as handle:
+            handle.write(b"not a snapshot at all, definitely not")
+        with self.assertRaises(SnapshotError):
+            HexSnapshot(self.path)
+        write_snapshot(sample_map(), self.path)
+        with open(self.path, "r+b") as handle:
+            handle.truncate(os.path.getsize(self.path) - 4)
+        with self.assertRaises(SnapshotError):
+            HexSnapshot(self.path)
+
+
+class TestRestoreSnapshot(SnapshotFileMixin, HexTestCase):
+    """Test suite for writing snapshots back to the HexTile store."""
+
+    def test_restore_replaces_stored_world(self):
+        """Test restoring creates, updates and deletes tiles to match the file."""
+        HexTile.get_or_create_by_coords(0, 0, 0, terrain="swamp")
+        HexTile.get_or_create_by_coords(7, -7, 0, terrain="hills")
+        write_snapshot(sample_map(), self.path)
+
+        restore_snapshot(self.path)
+
+        stored = HexMap.load_all()
+        self.assertEqual(len(stored), 4)
+        self.assertEqual(stored.get_tile(CubeCoord(0, 0, 0)), "plain")
+        self.assertEqual(stored.get_tile(CubeCoord(3, -1, -2)), "forest")
+        self.assertNotIn(CubeCoord(7, -7, 0), stored)
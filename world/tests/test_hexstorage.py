@@ -0,0 +1,189 @@
+"""
+Tests for the HexMap storage backends.
+"""
+from evennia.utils.test_resources import EvenniaTestCase
+from world.hexmap import CubeCoord, HexMap
+from world.hexstorage import ArrayTileStorage, DictTileStorage, FloatLayer, SparseFloatLayer, TerrainTable
+
+
+class TestCubeCoord(EvenniaTestCase):
+    """Test suite for the tuple-based CubeCoord."""
+
+    def test_validation(self):
+        """Test invalid cube coords are rejected."""
+        with self.assertRaises(ValueError):
+            CubeCoord(1, 1, 1)
+
+    def test_tuple_behaviour(self):
+        """Test coords compare and hash like plain tuples."""
+        coord = CubeCoord(1, -2, 1)
+        self.assertEqual((coord.q, coord.r, coord.s), (1, -2, 1))
+        self.assertEqual(coord, (1, -2, 1))
+        self.assertEqual(hash(coord), hash((1, -2, 1)))
+        self.assertFalse(hasattr(coord, "__dict__"))
+
+    def test_from_axial(self):
+        """Test from_axial derives s."""
+        self.assertEqual(CubeCoord.from_axial(3, -1), CubeCoord(3, -1, -2))
+
+
+class TestTerrainTable(EvenniaTestCase):
+    """Test suite for TerrainTable."""
+
+    def test_codes_round_trip(self):
+        """Test terrains map to stable codes and back."""
+        table = TerrainTable(("plain", "forest"))
+        self.assertEqual(table.code_of("plain"), table.code_of("plain"))
+        self.assertEqual(table.value_of(table.code_of("swamp")), "swamp")
+        self.assertIsNone(table.value_of(table.code_of(None)))
+        self.assertEqual(table.terrains, ["plain", "forest", "swamp"])
+
+    def test_table_full(self):
+        """Test registering too many terrains raises."""
+        table = TerrainTable(tuple(f"t{i}" for i in range(254)))
+        with self.assertRaises(ValueError):
+            table.code_of("one too many")
+
+
+class StorageTestMixin:
+    """Behaviour shared by every storage backend."""
+
+    def make_map(self):
+        raise NotImplementedError
+
+    def test_add_get_remove(self):
+        """Test tiles can be added, read and removed."""
+        hm = self.make_map()
+        hm.add_tile(CubeCoord(0, 0, 0), "plain")
+        hm.add_tile(CubeCoord(-3, 5, -2), "forest")
+        hm.add_tile(CubeCoord(4, -1, -3))
+
+        self.assertEqual(hm.get_tile(CubeCoord(0, 0, 0)), "plain")
+        self.assertEqual(hm.get_tile(CubeCoord(-3, 5, -2)), "forest")
+        self.assertTrue(hm.has_tile(CubeCoord(4, -1, -3)))
+        self.assertIsNone(hm.get_tile(CubeCoord(4, -1, -3)))
+        self.assertNotIn(CubeCoord(1, 0, -1), hm)
+        self.assertEqual(len(hm), 3)
+
+        hm.remove_tile(CubeCoord(-3, 5, -2))
+        self.assertNotIn(CubeCoord(-3, 5, -2), hm)
+        self.assertEqual(len(hm), 2)
+
+    def test_tiles_iteration(self):
+        """Test iterating tiles yields every coord with its data."""
+        hm = self.make_map()
+        expected = {CubeCoord.from_axial(q, r): f"t{q % 3}" for q in range(-4, 5) for r in range(-2, 3)}
+        for coord, terrain in expected.items():
+            hm.add_tile(coord, terrain)
+
+        self.assertEqual(dict(hm.tiles()), expected)
+
+    def test_unchanged_tile_not_dirty(self):
+        """Test re-adding identical data does not mark the map dirty."""
+        hm = self.make_map()
+        hm.add_tile(CubeCoord(2, 2, -4), "hills")
+        hm.mark_clean()
+        hm.add_tile(CubeCoord(2, 2, -4), "hills")
+        self.assertFalse(hm.is_dirty)
+        hm.add_tile(CubeCoord(2, 2, -4), "plain")
+        self.assertTrue(hm.is_dirty)
+
+    def test_neighbors(self):
+        """Test neighbors yields the six adjacent coords."""
+        hm = self.make_map()
+        neighbors = set(hm.neighbors(CubeCoord(0, 0, 0)))
+        self.assertEqual(len(neighbors), 6)
+        self.assertIn(CubeCoord(1, -1, 0), neighbors)
+        self.assertIn(CubeCoord(0, -1, 1), neighbors)
+
+
+class TestDictStorage(StorageTestMixin, EvenniaTestCase):
+    """Test suite for the dict backend."""
+
+    def make_map(self):
+        return HexMap(DictTileStorage())
+
+
+class TestArrayStorage(StorageTestMixin, EvenniaTestCase):
+    """Test suite for the array backend."""
+
+    def make_map(self):
+        return HexMap.compact()
+
+    def test_grows_in_all_directions(self):
+        """Test the array keeps existing cells when growing."""
+        storage = ArrayTileStorage()
+        storage.set(0, 0, "plain")
+        storage.set(-10, 7, "forest")
+        storage.set(25, -30, "swamp")
+
+        self.assertEqual(storage.get(0, 0), "plain")
+        self.assertEqual(storage.get(-10, 7), "forest")
+        self.assertEqual(storage.get(25, -30), "swamp")
+        q_min, r_min, q_max, r_max = storage.bounds
+        self.assertLessEqual(q_min, -10)
+        self.assertGreaterEqual(q_max, 25)
+        self.assertLessEqual(r_min, -30)
+        self.assertGreaterEqual(r_max, 7)
+
+    def test_one_byte_per_cell(self):
+        """Test a filled region costs one byte per cell."""
+        storage = ArrayTileStorage()
+        storage.reserve(0, 0, 99, 99)
+        for q in range(100):
+            for r in range(100):
+                storage.set(q, r, "plain")
+        self.assertEqual(len(storage._cells), 10_000)
+        self.assertEqual(len(storage), 10_000)
+
+    def test_far_apart_tiles_go_sparse(self):
+        """Test a mostly empty bounding box is not allocated."""
+        storage = ArrayTileStorage()
+        storage.set(0, 0, "plain")
+        storage.set(5000, -4000, "swamp")
+        self.assertTrue(storage.is_sparse)
+        self.assertEqual(len(storage._cells), 0)
+        self.assertEqual(len(storage), 2)
+        self.assertEqual(storage.get(5000, -4000), "swamp")
+        self.assertEqual(sorted(storage.items()), [(0, 0, "plain"), (5000, -4000, "swamp")])
+
+
+class TestFloatLayer(EvenniaTestCase):
+    """Test suite for FloatLayer."""
+
+    def test_set_get_clear(self):
+        """Test values round-trip, grow the grid and clear to None."""
+        layer = FloatLayer("elevation")
+        self.assertIsNone(layer.get(0, 0))
+        self.assertTrue(layer.set(0, 0, 12.5))
+        self.assertTrue(layer.set(-20, 9, -3.0))
+        self.assertFalse(layer.set(0, 0, 12.5))
+        self.assertEqual(layer.get(0, 0), 12.5)
+        self.assertEqual(layer.get(-20, 9), -3.0)
+        self.assertIsNone(layer.get(-19, 9))
+        self.assertTrue(layer.set(0, 0, None))
+        self.assertFalse(layer.set(0, 0, None))
+        self.assertEqual(list(layer.items()), [(-20, 9, -3.0)])
+
+    def test_far_apart_values_go_sparse(self):
+        """Test a layer with far apart values keeps them in a dict."""
+        layer = FloatLayer("elevation")
+        layer.set(0, 0, 1.0)
+        layer.set(-9000, 9000, 2.0)
+        self.assertTrue(layer.is_sparse)
+        self.assertEqual(layer.get(-9000, 9000), 2.0)
+        self.assertEqual(len(layer), 2)
+
+    def test_layer_follows_backend(self):
+        """Test layers are dense on array-backed maps and sparse on dict-backed ones."""
+        for hm, kind in ((HexMap.compact(), FloatLayer), (HexMap(), SparseFloatLayer)):
+            hm.add_tile(CubeCoord(0, 0, 0), "plain")
+            hm.set_value(CubeCoord(0, 0, 0), "elevation", 2.5)
+            self.assertIsInstance(hm.layer("elevation"), kind)
+            self.assertEqual(hm.get_value(CubeCoord(0, 0, 0), "elevation"), 2.5)
+
+    def test_four_bytes_per_cell(self):
+        """Test a dense region costs four bytes per cell."""
+        layer = FloatLayer("moisture")
+        layer.reserve(0, 0, 99, 99)
+        self.assertEqual(layer._cells.itemsize * len(layer._cells), 40_000)
@@ -0,0 +1,101 @@
+"""
+Tests for the bulk integrity scanner.
+"""
+from evennia import create_object
+from evennia.objects.models import ObjectDB
+
+from typeclasses.hextile import HexTile
+from world import integrity
+from world.hexmap import HexMap
+from world.hexstore import find_tile_ids, insert_tiles
+from world.tests.test_hexmap import HexTestCase
+
+
+class TestIntegrity(HexTestCase):
+    """Test suite for scanning and repairing broken references."""
+
+    def setUp(self):
+        super().setUp()
+        self.tile, _ = HexTile.get_or_create_by_coords(0, 0, 0, terrain="plain")
+        self.room = create_object("typeclasses.rooms.Room", key="Field")
+        self.room.set_hex(self.tile)
+
+    def test_clean_world(self):
+        """Test a consistent world reports nothing, in a fixed number of queries."""
+        insert_tiles({(q, 0, -q): "plain" for q in range(1, 50)})
+        create_object("typeclasses.resources.Resource", key="bush", location=self.room)
+        with self.assertNumQueries(10):
+            report = integrity.scan()
+        self.assertFalse(report)
+        self.assertEqual(report.tiles, 50)
+
+    def test_broken_room_link(self):
+        """Test rooms linked to a deleted tile are found and unlinked."""
+        dbref = self.tile.dbref
+        ObjectDB.objects.filter(id=self.tile.id).delete()
+        report = integrity.scan()
+        self.assertEqual(report.broken_rooms, {self.room.id: dbref})
+        integrity.repair(report)
+        self.assertIsNone(self.room.attributes.get("hex_dbref", category="environment"))
+        self.assertIsNone(self.room.get_hex_tile())
+        self.assertFalse(integrity.scan())
+
+    def test_coordinate_tags(self):
+        """Test missing and wrong coord tags follow db.q/r/s, or fill them in."""
+        untagged, _ = HexTile.get_or_create_by_coords(1, 0, -1)
+        untagged.tags.clear(category="hexcoord")
+        moved, _ = HexTile.get_or_create_by_coords(2, 0, -2)
+        moved.tags.clear(category="hexcoord")
+        moved.tags.add("2,1,-3", category="hexcoord")
+        broken, _ = HexTile.get_or_create_by_coords(3, 0, -3)
+        broken.db.q = 7
+        report = integrity.scan()
+        self.assertEqual(report.missing_tags, [untagged.id])
+        self.assertEqual(
+            report.mismatched_tags,
+            {moved.id: ((2, 0, -2), [(2, 1, -3)]), broken.id: (None, [(3, 0, -3)])},
+        )
+
+        integrity.repair(report)
+        self.assertFalse(integrity.scan())
+        self.assertEqual(
+            find_tile_ids([(1, 0, -1), (2, 0, -2), (2, 1, -3), (3, 0, -3)]),
+            {(1, 0, -1): untagged.id, (2, 0, -2): moved.id, (3, 0, -3): broken.id},
+        )
+        self.assertEqual(broken.db.q, 3)
+        self.assertEqual(HexTile.get_by_coords(2, 0, -2), moved)
+
+    def test_duplicates_merged(self):
+        """Test duplicate tiles merge into the one rooms link to."""
+        copy = insert_tiles({(0, 0, 0): "forest"})[(0, 0, 0)]
+        other = create_object("typeclasses.rooms.Room", key="Barn")
+        other.attributes.add("hex_dbref", f"#{copy}", category="environment")
+        third = insert_tiles({(0, 0, 0): "ocean"})[(0, 0, 0)]
+        third_room = create_object("typeclasses.rooms.Room", key="Shore")
+        third_room.attributes.add("hex_dbref", f"#{third}", category="environment")
+        second_room = create_object("typeclasses.rooms.Room", key="Hut")
+        second_room.set_hex(self.tile)
+        report = integrity.scan()
+        self.assertEqual(report.duplicates, {(0, 0, 0): [self.tile.id, copy, third]})
+
+        integrity.repair(report)
+        self.assertFalse(integrity.scan())
+        self.assertEqual(ObjectDB.objects.filter(id__in=[copy, third]).count(), 0)
+        for room in (other, third_room, self.room, second_room):
+            self.assertEqual(room.get_hex_tile(), self.tile)
+        self.assertEqual(len(HexMap.load_all()), 1)
+        self.assertEqual(set(self.tile.get_rooms()), {self.room, second_room, other, third_room})
+
+    def test_resource_tags(self):
+        """Test resource kind tags are brought back in line with db.kind."""
+        berries = create_object("typeclasses.resources.Resource", key="bush", location=self.room)
+        ore = create_object("typeclasses.resources.Resource", key="vein", location=self.room)
+        ore.db.kind = "mining"
+        report = integrity.scan()
+        self.assertEqual(report.resource_tags, {ore.id: ("mining", ["resource:foraging"])})
+
+        integrity.repair(report)
+        self.assertFalse(integrity.scan())
+        self.assertTrue(ore.tags.has("resource:mining", category="system"))
+        self.assertFalse(ore.tags.has("resource:foraging", category="system"))
+        self.assertTrue(berries.tags.has("resource:foraging", category="system"))
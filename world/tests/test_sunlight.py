@@ -0,0 +1,86 @@
+"""
+Tests for the shared sunlight clock.
+"""
+from evennia.utils.test_resources import EvenniaTestCase
+from world.sunlight import DEFAULT_SCHEDULE, SunlightClock, sunlight_level
+
+
+class FakeTime:
+    """Game time and a real-time clock the tests move by hand."""
+
+    def __init__(self, hour=12, minute=0, second=0):
+        self.reads = 0
+        self.now = 0.0
+        self.set(hour, minute, second)
+
+    def set(self, hour, minute=0, second=0):
+        self.time = (1, 1, 1, hour, minute, second)
+
+    def game_time(self):
+        self.reads += 1
+        return self.time
+
+    def monotonic(self):
+        return self.now
+
+
+class TestSunlightLevel(EvenniaTestCase):
+    """Test suite for the dawn/dusk ramp."""
+
+    def test_ramps(self):
+        """Test night, dawn, day and dusk levels under the default schedule."""
+        self.assertEqual(sunlight_level(0.0), 0)
+        self.assertEqual(sunlight_level(4.99), 0)
+        self.assertEqual(sunlight_level(6.0), 50)
+        self.assertEqual(sunlight_level(12.0), 100)
+        self.assertEqual(sunlight_level(18.5), 75)
+        self.assertEqual(sunlight_level(20.0), 0)
+
+    def test_custom_schedule(self):
+        """Test another schedule shifts the ramps."""
+        self.assertEqual(sunlight_level(6.0, (6, 8, 17, 19)), 0)
+        self.assertEqual(sunlight_level(18.0, (6, 8, 17, 19)), 50)
+
+
+class TestSunlightClock(EvenniaTestCase):
+    """Test suite for the once-per-minute sunlight clock."""
+
+    def setUp(self):
+        super().setUp()
+        self.clock_time = FakeTime(hour=6, minute=0, second=30)
+        self.clock = SunlightClock(self.clock_time.game_time, self.clock_time.monotonic)
+
+    def test_reads_game_time_once_per_minute(self):
+        """Test many reads within a minute read the game time once."""
+        for _ in range(1000):
+            self.assertEqual(self.clock.level(), 50)
+        self.assertEqual(self.clock_time.reads, 1)
+        self.clock_time.set(6, 30)
+        self.clock_time.now += 30.0
+        self.assertEqual(self.clock.level(), 75)
+        self.assertEqual(self.clock_time.reads, 2)
+
+    def test_levels_per_schedule(self):
+        """Test each schedule gets its own level from the same time."""
+        self.assertEqual(self.clock.level(DEFAULT_SCHEDULE), 50)
+        self.assertEqual(self.clock.level((6, 8, 17, 19)), 0)
+        self.assertEqual(self.clock_time.reads, 1)
+
+    def test_subscribers_hear_changes(self):
+        """Test subscribers are told about changes, not about every refresh."""
+        changes = []
+        self.clock.subscribe(lambda old, new: changes.append((old, new)))
+        self.clock.refresh()
+        self.clock.refresh()
+        self.assertEqual(changes, [])
+        self.clock_time.set(12)
+        self.clock.refresh()
+        self.assertEqual(changes, [(50, 100)])
+
+    def test_reset(self):
+        """Test reset makes the next read fetch the game time again."""
+        self.clock.level()
+        self.clock.reset()
+        self.clock_time.set(21)
+        self.assertEqual(self.clock.level(), 0)
+        self.assertEqual(self.clock_time.reads, 2)